@@ -3,7 +3,6 @@
 # 优化数据: 173 天 15m 数据
 
 import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional
@@ -11,6 +10,7 @@ from functools import reduce
 
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 import talib.abstract as ta
+import quantkit.indicators as qi
 
 
 class SupertrendFuturesStrategyV4(IStrategy):
@@ -49,22 +49,7 @@ class SupertrendFuturesStrategyV4(IStrategy):
     leverage_default = 2
 
     def supertrend(self, dataframe, period=14, multiplier=3):
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
 
     def leverage(self, pair, current_time, current_rate, proposed_leverage, max_leverage, entry_tag, side, **kwargs):
         return min(self.leverage_default, max_leverage)
@@ -2,15 +2,17 @@
 # 在V8基础上，只放宽最关键的指标
 
 import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional
-from functools import reduce
 import logging
 
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 import talib.abstract as ta
+import quantkit.indicators as qi
+import quantkit.streaming as qs
+import quantkit.batch as qb
+import quantkit.signals as qsig
 
 logger = logging.getLogger(__name__)
 
@@ -68,23 +70,18 @@ class SupertrendFuturesStrategyV8_2(IStrategy):
     can_short: bool = True
     leverage_default = 2
 
-    def supertrend(self, dataframe, period=14, multiplier=3):
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+    def bot_start(self, **kwargs) -> None:
+        """实盘/模拟盘使用增量 Supertrend 和尾部信号求值"""
+        self.st_stream = qs.SupertrendStream()
+        self.signals = qsig.TailSignals()
+
+    def supertrend(self, dataframe, period=14, multiplier=3, pair=None):
+        """Supertrend计算（实盘按新K线增量推进，Hyperopt 按参数查表，回测全量计算）"""
+        if pair is not None and qs.is_live(self.dp):
+            return self.st_stream.supertrend(dataframe, pair, self.timeframe, period, multiplier)
+        if pair is not None and qb.is_hyperopt(self.dp):
+            return qb.supertrend(dataframe, pair, self.timeframe, period, multiplier)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
 
     def leverage(self, pair, current_time, current_rate, proposed_leverage, max_leverage, entry_tag, side, **kwargs):
         return min(self.leverage_default, max_leverage)
@@ -94,7 +91,8 @@ class SupertrendFuturesStrategyV8_2(IStrategy):
         dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=self.ema_fast.value)
         dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=self.ema_slow.value)
         dataframe['supertrend'], dataframe['st_dir'] = self.supertrend(
-            dataframe, period=self.atr_period.value, multiplier=self.atr_multiplier.value
+            dataframe, period=self.atr_period.value, multiplier=self.atr_multiplier.value,
+            pair=metadata['pair']
         )
         dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
         dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
@@ -127,70 +125,64 @@ class SupertrendFuturesStrategyV8_2(IStrategy):
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """做多 - V8.2平衡版"""
-        dataframe.loc[:, 'enter_long'] = 0
+        pair = metadata['pair']
+        df = self.signals.frame(self.dp, dataframe, pair, ('enter_long',))
 
         conditions = [
             # === V4 核心条件 ===
-            dataframe['st_dir'] == 1,
-            dataframe['ema_fast'] > dataframe['ema_slow'],
-            dataframe['adx'] > self.adx_threshold_long.value,
-            dataframe['adx_pos'] > dataframe['adx_neg'],
-            dataframe['close'] > dataframe['supertrend'],
-            dataframe['is_uptrend'],
+            df['st_dir'] == 1,
+            df['ema_fast'] > df['ema_slow'],
+            df['adx'] > self.adx_threshold_long.value,
+            df['adx_pos'] > df['adx_neg'],
+            df['close'] > df['supertrend'],
+            df['is_uptrend'],
             
             # === V8 核心过滤（保持不变）===
-            (dataframe['rsi'] > 40) & (dataframe['rsi'] < 75),  # 保持V8
-            dataframe['volume'] > dataframe['volume_ma'] * 1.2,  # 保持V8
-            dataframe['trend_score'] >= 1,  # 保持V8
-            dataframe['volatility_ratio'] < 0.05,  # 保持V8
+            (df['rsi'] > 40) & (df['rsi'] < 75),  # 保持V8
+            df['volume'] > df['volume_ma'] * 1.2,  # 保持V8
+            df['trend_score'] >= 1,  # 保持V8
+            df['volatility_ratio'] < 0.05,  # 保持V8
             
             # === V8.2 唯一调整 ===
             # Alpha#101阈值: 0.1 → 0.07 (中等宽松)
-            dataframe['alpha_101'] > self.alpha_threshold.value,
+            df['alpha_101'] > self.alpha_threshold.value,
         ]
 
-        if conditions:
-            dataframe.loc[reduce(lambda x, y: x & y, conditions), 'enter_long'] = 1
-
-        return dataframe
+        return self.signals.assign(self.dp, dataframe, pair, 'enter_long', conditions)
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe.loc[:, 'exit_long'] = 0
-        conditions = [dataframe['st_dir'] == -1]
-        if conditions:
-            dataframe.loc[reduce(lambda x, y: x & y, conditions), 'exit_long'] = 1
-        return dataframe
+        pair = metadata['pair']
+        df = self.signals.frame(self.dp, dataframe, pair, ('exit_long',))
+        conditions = [df['st_dir'] == -1]
+        return self.signals.assign(self.dp, dataframe, pair, 'exit_long', conditions)
 
     def populate_entry_trend_short(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """做空 - V8.2平衡版"""
-        dataframe.loc[:, 'enter_short'] = 0
+        pair = metadata['pair']
+        df = self.signals.frame(self.dp, dataframe, pair, ('enter_short',))
 
         conditions = [
-            dataframe['st_dir'] == -1,
-            dataframe['ema_fast'] < dataframe['ema_slow'],
-            dataframe['adx'] > self.adx_threshold_short.value,
-            dataframe['adx_neg'] > dataframe['adx_pos'],
-            dataframe['close'] < dataframe['supertrend'],
-            dataframe['is_downtrend'],
+            df['st_dir'] == -1,
+            df['ema_fast'] < df['ema_slow'],
+            df['adx'] > self.adx_threshold_short.value,
+            df['adx_neg'] > df['adx_pos'],
+            df['close'] < df['supertrend'],
+            df['is_downtrend'],
             
-            (dataframe['rsi'] > 25) & (dataframe['rsi'] < 60),
-            dataframe['volume'] > dataframe['volume_ma'] * 1.2,
-            dataframe['trend_score'] >= 1,
-            dataframe['volatility_ratio'] < 0.05,
-            dataframe['alpha_101'] < -self.alpha_threshold.value,
+            (df['rsi'] > 25) & (df['rsi'] < 60),
+            df['volume'] > df['volume_ma'] * 1.2,
+            df['trend_score'] >= 1,
+            df['volatility_ratio'] < 0.05,
+            df['alpha_101'] < -self.alpha_threshold.value,
         ]
 
-        if conditions:
-            dataframe.loc[reduce(lambda x, y: x & y, conditions), 'enter_short'] = 1
-
-        return dataframe
+        return self.signals.assign(self.dp, dataframe, pair, 'enter_short', conditions)
 
     def populate_exit_trend_short(self, dataframe: DataFrame, metadata: DataFrame) -> DataFrame:
-        dataframe.loc[:, 'exit_short'] = 0
-        conditions = [dataframe['st_dir'] == 1]
-        if conditions:
-            dataframe.loc[reduce(lambda x, y: x & y, conditions), 'exit_short'] = 1
-        return dataframe
+        pair = metadata['pair']
+        df = self.signals.frame(self.dp, dataframe, pair, ('exit_short',))
+        conditions = [df['st_dir'] == 1]
+        return self.signals.assign(self.dp, dataframe, pair, 'exit_short', conditions)
 
 
 # === V8.2 调整说明 ===
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共设置
+
+quantkit 不依赖 freqtrade，但策略文件要 import freqtrade / technical。
+测试环境不装这两个包，这里在 sys.modules 里放最小替身：IStrategy 只保存 config，
+参数对象只提供 value / low / high，technical 的两个指标用简化的向量化实现。
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+STRATEGIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'user_data', 'strategies')
+if STRATEGIES not in sys.path:
+    sys.path.insert(0, STRATEGIES)
+
+
+class IStrategy:
+    timeframe = '5m'
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.dp = None
+        self.wallets = None
+
+
+class _Parameter:
+    def __init__(self, low, high=None, *, default=None, space=None, optimize=True, load=True, **kwargs):
+        if high is None and isinstance(low, (list, tuple)):
+            low, high = low
+        self.low = low
+        self.high = high
+        self.value = default
+        self.space = space
+
+
+class IntParameter(_Parameter):
+    @property
+    def range(self):
+        return range(self.low, self.high + 1)
+
+
+class DecimalParameter(_Parameter):
+    pass
+
+
+class CategoricalParameter:
+    def __init__(self, categories, *, default=None, space=None, optimize=True, load=True, **kwargs):
+        self.categories = list(categories)
+        self.value = categories[0] if default is None else default
+        self.space = space
+
+
+class BooleanParameter(CategoricalParameter):
+    def __init__(self, *, default=None, **kwargs):
+        super().__init__([True, False], default=default, **kwargs)
+
+
+class Trade:
+    pass
+
+
+def vwmacd(dataframe, fastperiod=12, slowperiod=26, signalperiod=9):
+    vp = dataframe['close'] * dataframe['volume']
+    fast = vp.ewm(span=fastperiod).mean() / dataframe['volume'].ewm(span=fastperiod).mean()
+    slow = vp.ewm(span=slowperiod).mean() / dataframe['volume'].ewm(span=slowperiod).mean()
+    macd = fast - slow
+    signal = macd.ewm(span=signalperiod).mean()
+    return pd.DataFrame({'macd': macd, 'signal': signal, 'hist': macd - signal})
+
+
+def SSLChannels(dataframe, length=7):
+    high = dataframe['high'].rolling(length).mean()
+    low = dataframe['low'].rolling(length).mean()
+    hlv = pd.Series(np.where(dataframe['close'] > high, 1, np.where(dataframe['close'] < low, -1, np.nan)),
+                    index=dataframe.index).ffill()
+    down = pd.Series(np.where(hlv < 0, high, low), index=dataframe.index)
+    up = pd.Series(np.where(hlv < 0, low, high), index=dataframe.index)
+    return down, up
+
+
+def _module(name: str, **attrs):
+    module = sys.modules.get(name) or types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def _install_stubs():
+    try:
+        import freqtrade.strategy  # noqa: F401
+    except ImportError:
+        _module('freqtrade', __path__=[])
+        _module('freqtrade.strategy', IStrategy=IStrategy, IntParameter=IntParameter,
+                DecimalParameter=DecimalParameter, CategoricalParameter=CategoricalParameter,
+                BooleanParameter=BooleanParameter)
+        _module('freqtrade.persistence', Trade=Trade)
+        _module('freqtrade.vendor', __path__=[])
+        _module('freqtrade.vendor.qtpylib', __path__=[])
+        _module('freqtrade.vendor.qtpylib.indicators')
+    try:
+        import technical.indicators  # noqa: F401
+    except ImportError:
+        _module('technical', __path__=[])
+        _module('technical.indicators', vwmacd=vwmacd, SSLChannels=SSLChannels)
+        _module('technical.util', resample_to_interval=None, resampled_merge=None)
+
+
+_install_stubs()
+
+
+def ohlcv(rows: int = 5000, timeframe: str = '5m', seed: int = 7) -> pd.DataFrame:
+    """
+    合成 OHLCV：每 200 根K线换一次方向的趋势 + 随机波动 + 约 2% 的K线跳空 5%，
+    高低点围绕开收盘价上下浮动（趋势和跳空让 Supertrend/ADX 类入场条件能触发）
+    """
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.choice([-1, 1], rows // 200 + 1), 200)[:rows] * 0.002
+    jumps = np.where(rng.random(rows) < 0.02, rng.choice([-1, 1], rows) * 0.05, 0.0)
+    close = 0.1 * np.exp(np.cumsum(drift + rng.normal(0, 0.004, rows) + jumps))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.002, rows)) * close
+    return pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=rows, freq=timeframe.replace('m', 'min'), tz='UTC'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1e5, 1e6, rows),
+    })
+
+
+@pytest.fixture
+def candles() -> pd.DataFrame:
+    return ohlcv()
+
+
+def load_strategy(name: str, config: dict = None):
+    """按文件名导入策略类并实例化，执行 bot_start（若有）"""
+    module = __import__(name)
+    strategy = getattr(module, name)(dict({'stake_currency': 'USDT', 'user_data_dir': 'user_data'}, **(config or {})))
+    if hasattr(strategy, 'bot_start'):
+        strategy.bot_start()
+    return strategy
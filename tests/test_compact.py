@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""紧凑类型（float32/int8/bool）与 float64 路径的入场/出场信号一致"""
+
+import numpy as np
+import pytest
+
+import quantkit.compact as qcompact
+from conftest import load_strategy, ohlcv
+
+TOLERANCE = 0.001
+
+
+def _signals(strategy, dataframe, metadata):
+    frame = strategy.populate_indicators(dataframe.copy(), dict(metadata))
+    frame = strategy.populate_entry_trend(frame, dict(metadata))
+    return strategy.populate_exit_trend(frame, dict(metadata))
+
+
+@pytest.mark.parametrize('pair', ['DOGE/USDT:USDT', 'UNI/USDT:USDT', 'SUI/USDT:USDT', 'BONK/USDT:USDT'])
+def test_signal_mismatch_within_tolerance(pair):
+    strategy = load_strategy('MultiPairFuturesStrategy')
+    dataframe = ohlcv(rows=3000, timeframe='30m')
+    metadata = {'pair': pair}
+    # 夹具数据上 float64 路径必须产生信号，否则比较没有意义
+    expected = _signals(strategy, dataframe, metadata)
+    assert expected['enter_long'].fillna(0).sum() > 0
+    assert expected['exit_long'].fillna(0).sum() > 0
+
+    mismatch = qcompact.signal_mismatch(strategy, dataframe, metadata, tolerance=TOLERANCE)
+    assert set(mismatch) == set(qcompact.SIGNAL_COLUMNS)
+    assert all(ratio <= TOLERANCE for ratio in mismatch.values())
+    # 检查结束后恢复策略原来的设置
+    assert strategy.compact_dataframe is False
+
+
+def test_compact_frame_dtypes():
+    strategy = load_strategy('MultiPairFuturesStrategy')
+    frame = strategy.populate_indicators(ohlcv(rows=500, timeframe='30m'), {'pair': 'DOGE/USDT:USDT'})
+    compact = qcompact.compact_frame(frame)
+    for name in qcompact.KEEP_COLUMNS:
+        assert compact[name].dtype == frame[name].dtype
+    assert compact['supertrend'].dtype == np.int8
+    assert all(compact[name].dtype != np.float64 for name in compact.columns
+               if name not in qcompact.KEEP_COLUMNS and frame[name].dtype == np.float64)
+
+
+def test_signal_mismatch_raises_above_tolerance():
+    strategy = load_strategy('MultiPairFuturesStrategy')
+    original = strategy.populate_entry_trend
+
+    def flipped(dataframe, metadata):
+        # 紧凑模式下故意把做多信号全部置 1
+        dataframe = original(dataframe, metadata)
+        if strategy.compact_dataframe:
+            dataframe['enter_long'] = 1
+        return dataframe
+
+    strategy.populate_entry_trend = flipped
+    with pytest.raises(ValueError):
+        qcompact.signal_mismatch(strategy, ohlcv(rows=1000, timeframe='30m'), {'pair': 'DOGE/USDT:USDT'},
+                                 tolerance=TOLERANCE)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""populate_indicators 峰值分配不超过输入 dataframe 的固定倍数"""
+
+import pytest
+
+import quantkit.memory as qmem
+from conftest import load_strategy
+
+MAX_RATIO = 8
+
+STRATEGIES = [
+    'SupertrendFuturesStrategyV3',
+    'SupertrendFuturesStrategyV4',
+    'SupertrendFuturesStrategyV4_1',
+    'SupertrendFuturesStrategyV4_5x',
+    'SupertrendFuturesStrategyV4_10x',
+    'SupertrendFuturesStrategyV5',
+    'SupertrendFuturesStrategyV5_1',
+    'SupertrendFuturesStrategyV5_2',
+    'SupertrendFuturesStrategyV6',
+    'SupertrendFuturesStrategyV7',
+    'SupertrendFuturesStrategyV7_1',
+    'SupertrendFuturesStrategyV8',
+    'SupertrendFuturesStrategyV8_1',
+    'SupertrendFuturesStrategyV8_2',
+    'SupertrendFuturesStrategyV8_3',
+    'CombinedStrategy',
+    'SupertrendStrategy_Smart',
+]
+
+
+@pytest.mark.parametrize('name', STRATEGIES)
+def test_indicator_peak(name, candles, tmp_path):
+    strategy = load_strategy(name, {'user_data_dir': str(tmp_path)})
+    metadata = {'pair': 'DOGE/USDT:USDT'}
+    ratio = qmem.check_peak(strategy, candles, metadata, max_ratio=MAX_RATIO)
+    assert ratio > 0
+
+
+def test_check_peak_raises(candles, tmp_path):
+    strategy = load_strategy('SupertrendFuturesStrategyV8_1', {'user_data_dir': str(tmp_path)})
+    with pytest.raises(MemoryError):
+        qmem.check_peak(strategy, candles, {'pair': 'DOGE/USDT:USDT'}, max_ratio=0.01)
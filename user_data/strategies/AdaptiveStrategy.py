@@ -4,7 +4,8 @@
 from freqtrade.strategy import IStrategy, IntParameter, DecimalParameter
 from pandas import DataFrame
 import talib.abstract as ta
-import numpy as np
+import quantkit.indicators as qi
+import quantkit.regime as qrg
 from functools import reduce
 
 class AdaptiveStrategy(IStrategy):
@@ -47,62 +48,26 @@ class AdaptiveStrategy(IStrategy):
         'stoploss_on_exchange': False
     }
     
-    # 存储市场状态
-    market_state = 'unknown'
+    def bot_start(self, **kwargs) -> None:
+        """市场状态服务：按交易对缓存；检测器随可优化的阈值在 populate_indicators 里构造"""
+        self.regime = qrg.RegimeService(self.regime_detector(), self.timeframe)
     
-    def detect_market_state(self, dataframe: DataFrame) -> str:
-        """检测当前市场状态"""
-        last = dataframe.iloc[-1]
-        
-        adx = last.get('adx', 20)
-        atr_pct = last.get('atr_pct', 2)
-        trend_slope = last.get('trend_slope', 0)
-        
-        # 高波动
-        if atr_pct > self.volatility_threshold.value:
-            return 'volatile'
-        
-        # 趋势市场
-        if adx > self.adx_trend_threshold.value:
-            if trend_slope > 0:
-                return 'trend_up'
-            else:
-                return 'trend_down'
-        
-        # 震荡市场
-        return 'ranging'
+    def regime_detector(self):
+        """高波动优先，其次按 ADX + 趋势斜率区分趋势/震荡（阈值取当前参数值）"""
+        return qrg.Priority(
+            qrg.Volatility(threshold=self.volatility_threshold.value, column='atr_pct'),
+            qrg.SlopeADX(adx_threshold=self.adx_trend_threshold.value, slope_column='trend_slope'),
+        )
+    
+    def detect_market_state(self, pair: str, current_time=None) -> str:
+        """当前市场状态（trend_up / trend_down / volatile / ranging）"""
+        return self.regime.current_label(pair, current_time, default='ranging')
     
     def supertrend(self, dataframe, period=14, multiplier=3):
         """计算 Supertrend"""
-        import pandas as pd
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            
-            if direction[i] == 1:
-                supertrend[i] = lowerband.iloc[i]
-            else:
-                supertrend[i] = upperband.iloc[i]
-        
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
     
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        import pandas as pd
-        
         # === 通用指标 ===
         dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
         dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
@@ -122,11 +87,8 @@ class AdaptiveStrategy(IStrategy):
         dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=9)
         dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=21)
         
-        # 趋势斜率 (线性回归)
-        close_series = dataframe['close'].rolling(20).apply(
-            lambda x: np.polyfit(range(len(x)), x, 1)[0] if len(x) == 20 else 0,
-            raw=False
-        )
+        # 趋势斜率 (线性回归，滑动和 O(n) 计算)
+        close_series = qi.rolling_slope(dataframe['close'], window=20)
         dataframe['trend_slope'] = close_series / dataframe['close'] * 100  # 百分比
         
         # === 震荡指标 ===
@@ -136,16 +98,19 @@ class AdaptiveStrategy(IStrategy):
         dataframe['bb_upper'] = bollinger['upperband']
         dataframe['bb_position'] = (dataframe['close'] - dataframe['bb_lower']) / (dataframe['bb_upper'] - dataframe['bb_lower']) * 100
         
-        # 检测市场状态
-        self.market_state = self.detect_market_state(dataframe)
+        # 检测市场状态（整列算一次，按交易对缓存）
+        dataframe['market_state'] = self.regime.update(dataframe, metadata['pair'], self.regime_detector())
         
         return dataframe
     
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         dataframe.loc[:, 'enter_long'] = 0
+        # Hyperopt 每个 epoch 都会调用这里：阈值变化时按新参数重算，未变时直接复用缓存
+        self.regime.update(dataframe, metadata['pair'], self.regime_detector())
+        market_state = self.detect_market_state(metadata['pair'])
         
         # 根据市场状态使用不同的入场逻辑
-        if self.market_state == 'trend_up':
+        if market_state == 'trend_up':
             # 上涨趋势 - 追涨
             conditions = [
                 dataframe['st_dir'] == 1,
@@ -153,7 +118,7 @@ class AdaptiveStrategy(IStrategy):
                 dataframe['rsi'] < 70,
                 dataframe['volume'] > dataframe['volume_ma'],
             ]
-        elif self.market_state == 'trend_down':
+        elif market_state == 'trend_down':
             # 下跌趋势 - 谨慎
             conditions = [
                 dataframe['st_dir'] == 1,
@@ -162,7 +127,7 @@ class AdaptiveStrategy(IStrategy):
                 dataframe['adx'] > 20,  # 确认趋势
                 dataframe['volume'] > dataframe['volume_ma'] * 1.2,
             ]
-        elif self.market_state == 'volatile':
+        elif market_state == 'volatile':
             # 高波动 - 综合
             conditions = [
                 dataframe['st_dir'] == 1,
@@ -186,12 +151,13 @@ class AdaptiveStrategy(IStrategy):
     
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         dataframe.loc[:, 'exit_long'] = 0
+        market_state = self.detect_market_state(metadata['pair'])
         
         # 根据市场状态使用不同的出场逻辑
-        if self.market_state in ['trend_up', 'trend_down']:
+        if market_state in ['trend_up', 'trend_down']:
             # 趋势市场 - Supertrend 反转
             conditions = [dataframe['st_dir'] == -1]
-        elif self.market_state == 'volatile':
+        elif market_state == 'volatile':
             # 高波动 - 快速止盈
             conditions = [
                 (dataframe['rsi'] > 70) | (dataframe['bb_position'] > 75)
@@ -208,8 +174,6 @@ class AdaptiveStrategy(IStrategy):
     def confirm_trade_entry(self, pair, order_type, amount, rate, time_in_force, 
                            current_time, entry_tag, side, **kwargs):
         """入场确认 - 记录市场状态"""
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-        if len(dataframe) > 0:
-            state = self.detect_market_state(dataframe)
-            # 可以在这里添加日志
+        state = self.detect_market_state(pair, current_time)
+        # 可以在这里添加日志
         return True
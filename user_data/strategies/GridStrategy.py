@@ -4,6 +4,7 @@
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 from pandas import DataFrame
 import talib.abstract as ta
+import quantkit.snapshot as qsnap
 from functools import reduce
 
 class GridStrategy(IStrategy):
@@ -36,6 +37,10 @@ class GridStrategy(IStrategy):
     position_adjustment_enable = True
     max_entry_position_adjustment = 5  # 最多加仓 5 次
     
+    def bot_start(self, **kwargs) -> None:
+        """分批建仓读取的K线快照"""
+        self.snapshots = qsnap.SnapshotCache(('bb_position', 'rsi'))
+    
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         # RSI 用于判断相对位置
         dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
@@ -53,6 +58,8 @@ class GridStrategy(IStrategy):
         # 价格在布林带中的位置 (0-100)
         dataframe['bb_position'] = (dataframe['close'] - dataframe['bb_lower']) / (dataframe['bb_upper'] - dataframe['bb_lower']) * 100
         
+        self.snapshots.capture(self.dp, dataframe, metadata['pair'])
+        
         return dataframe
     
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -95,12 +102,10 @@ class GridStrategy(IStrategy):
         """
         网格策略：分批建仓
         """
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-        if len(dataframe) < 1:
+        last_candle = self.snapshots.last(self.dp, pair, self.timeframe)
+        if last_candle is None:
             return proposed_stake
         
-        last_candle = dataframe.iloc[-1]
-        
         # 根据价格位置调整仓位
         bb_pos = last_candle['bb_position']
         rsi = last_candle['rsi']
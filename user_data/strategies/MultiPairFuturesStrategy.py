@@ -8,6 +8,10 @@
 from freqtrade.strategy import IStrategy, DecimalParameter
 from pandas import DataFrame
 import talib.abstract as ta
+import quantkit.streaming as qs
+import quantkit.snapshot as qsnap
+import quantkit.compact as qcompact
+import quantkit.registry as qreg
 import numpy as np
 from datetime import datetime
 
@@ -29,6 +33,13 @@ class MultiPairFuturesStrategy(IStrategy):
     trailing_stop_positive_offset = 0.03
     trailing_only_offset_is_reached = True
     
+    # 紧凑模式：指标列存为 float32、方向列存为 int8，白名单很大时降低每个交易对的内存
+    # 启用前用 quantkit.compact.signal_mismatch 检查信号与 float64 一致
+    compact_dataframe = False
+    
+    # 返回给框架的指标列（其余中间列如 atr/alpha/rsi/volume_ma 在出场信号后丢弃）
+    exported_columns = ('supertrend', 'ema_fast', 'ema_slow', 'adx')
+    
     # ============ DOGE 专用参数 ============
     # 基于 Hyperopt 优化结果
     doge_adx_threshold_long = 31
@@ -66,6 +77,11 @@ class MultiPairFuturesStrategy(IStrategy):
     uni_ema_fast = DecimalParameter(20, 60, default=48, space='buy', optimize=True)
     uni_ema_slow = DecimalParameter(100, 200, default=167, space='buy', optimize=True)
     
+    def bot_start(self, **kwargs) -> None:
+        """实盘/模拟盘使用增量 Supertrend 和K线快照"""
+        self.st_stream = qs.SupertrendStream()
+        self.snapshots = qsnap.SnapshotCache((), extras={'volatility': self._recent_volatility})
+    
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
         根据交易对加载不同的指标
@@ -78,35 +94,34 @@ class MultiPairFuturesStrategy(IStrategy):
         
         # 根据交易对加载专用指标
         if 'DOGE' in pair:
-            dataframe = self._populate_doge_indicators(dataframe)
+            dataframe = self._populate_doge_indicators(dataframe, pair)
         elif 'UNI' in pair:
-            dataframe = self._populate_uni_indicators(dataframe)
+            dataframe = self._populate_uni_indicators(dataframe, pair)
         elif 'SUI' in pair:
-            dataframe = self._populate_sui_indicators(dataframe)
+            dataframe = self._populate_sui_indicators(dataframe, pair)
         elif 'BONK' in pair:
-            dataframe = self._populate_bonk_indicators(dataframe)
+            dataframe = self._populate_bonk_indicators(dataframe, pair)
         else:
             # 默认指标
-            dataframe = self._populate_default_indicators(dataframe)
+            dataframe = self._populate_default_indicators(dataframe, pair)
+        
+        if self.compact_dataframe:
+            dataframe = qcompact.compact_frame(dataframe)
+        
+        self.snapshots.capture(self.dp, dataframe, pair)
         
         return dataframe
     
-    def _populate_doge_indicators(self, dataframe: DataFrame) -> DataFrame:
+    def _populate_doge_indicators(self, dataframe: DataFrame, pair: str) -> DataFrame:
         """DOGE 专用指标"""
         # EMA
         dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=self.doge_ema_fast)
         dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=self.doge_ema_slow)
         
         # Supertrend
-        hl2 = (dataframe['high'] + dataframe['low']) / 2
-        atr = ta.ATR(dataframe, timeperiod=self.doge_atr_period)
-        
-        upper_band = hl2 + (self.doge_atr_multiplier * atr)
-        lower_band = hl2 - (self.doge_atr_multiplier * atr)
-        
-        dataframe['supertrend'] = 0.0
-        dataframe.loc[dataframe['close'] > upper_band.shift(1), 'supertrend'] = 1
-        dataframe.loc[dataframe['close'] < lower_band.shift(1), 'supertrend'] = -1
+        dataframe['supertrend'] = self._supertrend_signal(
+            dataframe, pair, self.doge_atr_period, self.doge_atr_multiplier
+        )
         
         # Alpha 指标
         dataframe['alpha'] = (
@@ -116,28 +131,42 @@ class MultiPairFuturesStrategy(IStrategy):
         
         return dataframe
     
+    def _supertrend_signal(self, dataframe: DataFrame, pair: str, period: int, multiplier: float):
+        """
+        Supertrend 突破信号（1=上破上轨, -1=下破下轨, 0=无）
+        实盘/模拟盘按新K线增量推进，回测全量计算
+        """
+        if qs.is_live(self.dp):
+            state = self.st_stream.update(dataframe, pair, self.timeframe, period, multiplier)
+            return state.signal.astype(np.float64)
+
+        hl2 = (dataframe['high'] + dataframe['low']) / 2
+        atr = ta.ATR(dataframe, timeperiod=period)
+        
+        upper_band = hl2 + (multiplier * atr)
+        lower_band = hl2 - (multiplier * atr)
+        
+        signal = np.zeros(len(dataframe))
+        signal[(dataframe['close'] > upper_band.shift(1)).to_numpy()] = 1
+        signal[(dataframe['close'] < lower_band.shift(1)).to_numpy()] = -1
+        return signal
+    
     def _get_param_value(self, param):
         """获取参数值，兼容 DecimalParameter 和普通数值"""
         if hasattr(param, 'value'):
             return param.value
         return param
     
-    def _populate_uni_indicators(self, dataframe: DataFrame) -> DataFrame:
+    def _populate_uni_indicators(self, dataframe: DataFrame, pair: str) -> DataFrame:
         """UNI 专用指标"""
         # EMA
         dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=int(self._get_param_value(self.uni_ema_fast)))
         dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=int(self._get_param_value(self.uni_ema_slow)))
         
         # Supertrend
-        hl2 = (dataframe['high'] + dataframe['low']) / 2
-        atr = ta.ATR(dataframe, timeperiod=self.uni_atr_period)
-        
-        upper_band = hl2 + (self._get_param_value(self.uni_atr_multiplier) * atr)
-        lower_band = hl2 - (self._get_param_value(self.uni_atr_multiplier) * atr)
-        
-        dataframe['supertrend'] = 0.0
-        dataframe.loc[dataframe['close'] > upper_band.shift(1), 'supertrend'] = 1
-        dataframe.loc[dataframe['close'] < lower_band.shift(1), 'supertrend'] = -1
+        dataframe['supertrend'] = self._supertrend_signal(
+            dataframe, pair, self.uni_atr_period, self._get_param_value(self.uni_atr_multiplier)
+        )
         
         # Alpha 指标
         dataframe['alpha'] = (
@@ -150,22 +179,16 @@ class MultiPairFuturesStrategy(IStrategy):
         
         return dataframe
     
-    def _populate_sui_indicators(self, dataframe: DataFrame) -> DataFrame:
+    def _populate_sui_indicators(self, dataframe: DataFrame, pair: str) -> DataFrame:
         """SUI 专用指标"""
         # EMA
         dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=int(self._get_param_value(self.sui_ema_fast)))
         dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=int(self._get_param_value(self.sui_ema_slow)))
         
         # Supertrend
-        hl2 = (dataframe['high'] + dataframe['low']) / 2
-        atr = ta.ATR(dataframe, timeperiod=self.sui_atr_period)
-        
-        upper_band = hl2 + (self._get_param_value(self.sui_atr_multiplier) * atr)
-        lower_band = hl2 - (self._get_param_value(self.sui_atr_multiplier) * atr)
-        
-        dataframe['supertrend'] = 0.0
-        dataframe.loc[dataframe['close'] > upper_band.shift(1), 'supertrend'] = 1
-        dataframe.loc[dataframe['close'] < lower_band.shift(1), 'supertrend'] = -1
+        dataframe['supertrend'] = self._supertrend_signal(
+            dataframe, pair, self.sui_atr_period, self._get_param_value(self.sui_atr_multiplier)
+        )
         
         # Alpha 指标
         dataframe['alpha'] = (
@@ -175,22 +198,16 @@ class MultiPairFuturesStrategy(IStrategy):
         
         return dataframe
     
-    def _populate_bonk_indicators(self, dataframe: DataFrame) -> DataFrame:
+    def _populate_bonk_indicators(self, dataframe: DataFrame, pair: str) -> DataFrame:
         """BONK 专用指标 (Meme币特性)"""
         # EMA
         dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=int(self._get_param_value(self.bonk_ema_fast)))
         dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=int(self._get_param_value(self.bonk_ema_slow)))
         
         # Supertrend
-        hl2 = (dataframe['high'] + dataframe['low']) / 2
-        atr = ta.ATR(dataframe, timeperiod=self.bonk_atr_period)
-        
-        upper_band = hl2 + (self._get_param_value(self.bonk_atr_multiplier) * atr)
-        lower_band = hl2 - (self._get_param_value(self.bonk_atr_multiplier) * atr)
-        
-        dataframe['supertrend'] = 0.0
-        dataframe.loc[dataframe['close'] > upper_band.shift(1), 'supertrend'] = 1
-        dataframe.loc[dataframe['close'] < lower_band.shift(1), 'supertrend'] = -1
+        dataframe['supertrend'] = self._supertrend_signal(
+            dataframe, pair, self.bonk_atr_period, self._get_param_value(self.bonk_atr_multiplier)
+        )
         
         # Alpha 指标 - Meme币用更短周期
         dataframe['alpha'] = (
@@ -203,10 +220,10 @@ class MultiPairFuturesStrategy(IStrategy):
         
         return dataframe
     
-    def _populate_default_indicators(self, dataframe: DataFrame) -> DataFrame:
+    def _populate_default_indicators(self, dataframe: DataFrame, pair: str) -> DataFrame:
         """默认指标（未识别的交易对）"""
         # 使用 DOGE 参数作为默认
-        return self._populate_doge_indicators(dataframe)
+        return self._populate_doge_indicators(dataframe, pair)
     
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """入场信号"""
@@ -350,7 +367,7 @@ class MultiPairFuturesStrategy(IStrategy):
             'exit_short'
         ] = 1
         
-        return dataframe
+        return qreg.prune_columns(self, dataframe)
     
     def leverage(self, pair: str, current_time: datetime, current_rate: float,
                  proposed_leverage: float, max_leverage: float, entry_tag: str,
@@ -358,6 +375,15 @@ class MultiPairFuturesStrategy(IStrategy):
         """固定杠杆"""
         return 2.0
     
+    @staticmethod
+    def _recent_volatility(dataframe: DataFrame):
+        """相对波动率（最近24根K线的价格变动标准差，百分比），数据不足返回 None"""
+        if len(dataframe) < 24:
+            return None
+        recent_closes = dataframe['close'].tail(24)
+        returns = recent_closes.pct_change().dropna()
+        return returns.std() * 100  # 转为百分比
+    
     def custom_stake_amount(self, pair: str, current_time: datetime, current_rate: float,
                             proposed_stake: float, min_stake: float, max_stake: float,
                             leverage: float, entry_tag: str, side: str,
@@ -373,17 +399,14 @@ class MultiPairFuturesStrategy(IStrategy):
         # 基础仓位
         base_stake = 150.0
         
-        # 从 dataframe 获取波动率数据
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+        # 从K线快照获取波动率数据
+        last_candle = self.snapshots.last(self.dp, pair, self.timeframe)
         
-        if len(dataframe) < 24:
+        if last_candle is None or last_candle.volatility is None:
             # 数据不足，使用基础仓位
             return base_stake
         
-        # 计算相对波动率（使用最近24根K线的价格变动标准差）
-        recent_closes = dataframe['close'].tail(24)
-        returns = recent_closes.pct_change().dropna()
-        volatility = returns.std() * 100  # 转为百分比
+        volatility = last_candle.volatility
         
         # 根据波动率调整仓位
         if volatility < 2.0:
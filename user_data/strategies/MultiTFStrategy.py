@@ -6,6 +6,8 @@ from pandas import DataFrame
 import talib.abstract as ta
 from functools import reduce
 
+import quantkit.informative as qinf
+
 class MultiTFStrategy(IStrategy):
     INTERFACE_VERSION = 3
     
@@ -31,6 +33,18 @@ class MultiTFStrategy(IStrategy):
         'stoploss_on_exchange': False
     }
     
+    def bot_start(self, **kwargs) -> None:
+        # 1h 指标缓存：每根新的 1h K线只算一次，按 as-of 对齐合并到 15m
+        self.htf = qinf.InformativeCache('1h', self.informative_indicators, self.timeframe)
+
+    @staticmethod
+    def informative_indicators(informative: DataFrame) -> dict:
+        # 1h 趋势
+        return {
+            'ema_50': ta.EMA(informative, timeperiod=50),
+            'ema_200': ta.EMA(informative, timeperiod=200),
+        }
+
     def informative_pairs(self):
         # 1小时时间框架用于趋势确认
         return [
@@ -48,20 +62,17 @@ class MultiTFStrategy(IStrategy):
         dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
         dataframe['volume_ma'] = dataframe['volume'].rolling(20).mean()
         
+        # 1h 指标（ema_50_1h / ema_200_1h），每根 15m K线只用已收盘的 1h K线
+        dataframe = self.htf.merge(self.dp, dataframe, metadata['pair'])
+        
         return dataframe
     
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         dataframe.loc[:, 'enter_long'] = 0
         
-        # 获取 1h 数据
-        informative = self.dp.get_pair_dataframe(pair=metadata['pair'], timeframe='1h')
-        
-        if informative is not None and len(informative) > 0:
-            # 1h 趋势
-            informative['ema_50'] = ta.EMA(informative, timeperiod=50)
-            informative['ema_200'] = ta.EMA(informative, timeperiod=200)
-            last_1h = informative.iloc[-1]
-            trend_up = last_1h['ema_50'] > last_1h['ema_200']
+        # 1h 趋势
+        if 'ema_50_1h' in dataframe:
+            trend_up = dataframe['ema_50_1h'] > dataframe['ema_200_1h']
         else:
             trend_up = True  # 默认允许
         
@@ -74,9 +85,11 @@ class MultiTFStrategy(IStrategy):
             dataframe['adx'] > 20,
             # 成交量
             dataframe['volume'] > dataframe['volume_ma'],
+            # 1h 趋势向上
+            trend_up,
         ]
         
-        if conditions and trend_up:
+        if conditions:
             dataframe.loc[reduce(lambda x, y: x & y, conditions), 'enter_long'] = 1
         
         return dataframe
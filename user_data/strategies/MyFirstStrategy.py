@@ -35,6 +35,7 @@ from freqtrade.strategy import (
 # Add your lib to import here
 import talib.abstract as ta
 from technical import qtpylib
+import quantkit.registry as qreg
 
 
 class MyFirstStrategy(IStrategy):
@@ -95,7 +96,13 @@ class MyFirstStrategy(IStrategy):
 
     # Strategy parameters
     buy_rsi = IntParameter(10, 40, default=30, space="buy")
-    sell_rsi = IntParameter(60, 90, default=70, space="sell")# Optional order type mapping.
+    sell_rsi = IntParameter(60, 90, default=70, space="sell")
+
+    # Columns read by populate_entry_trend / populate_exit_trend.
+    # Only these (plus plot_config columns outside backtest/hyperopt) are computed.
+    signal_columns = ("rsi", "tema", "bb_middleband")
+
+    # Optional order type mapping.
     order_types = {
         "entry": "limit",
         "exit": "limit",
@@ -152,11 +159,36 @@ class MyFirstStrategy(IStrategy):
         :param metadata: Additional information, like the currently traded pair
         :return: a Dataframe with all mandatory indicators for the strategies
         """
+        columns = qreg.required_columns(self, self.signal_columns)
+        dataframe = self.indicator_registry().compute(dataframe, columns)
+
+        # Retrieve best bid and best ask from the orderbook
+        # ------------------------------------
+        """
+        # first check if dataprovider is available
+        if self.dp:
+            if self.dp.runmode.value in ("live", "dry_run"):
+                ob = self.dp.orderbook(metadata["pair"], 1)
+                dataframe["best_bid"] = ob["bids"][0][0]
+                dataframe["best_ask"] = ob["asks"][0][0]
+        """
+
+        return dataframe
+
+    def indicator_registry(self) -> qreg.IndicatorRegistry:
+        """
+        Declare all indicators this strategy may use.
+        Nothing is computed here - populate_indicators() only computes the columns
+        referenced by signals (and plots), identical declarations are computed once.
+        :return: IndicatorRegistry with the declared indicators
+        """
+        reg = qreg.IndicatorRegistry()
+
         # Momentum Indicators
         # ------------------------------------
 
         # ADX
-        dataframe["adx"] = ta.ADX(dataframe)
+        reg.talib("adx", "ADX")
 
         # # Plus Directional Indicator / Movement
         # dataframe["plus_dm"] = ta.PLUS_DM(dataframe)
@@ -195,7 +227,7 @@ class MyFirstStrategy(IStrategy):
         # dataframe["cci"] = ta.CCI(dataframe)
 
         # RSI
-        dataframe["rsi"] = ta.RSI(dataframe)
+        reg.talib("rsi", "RSI")
 
         # # Inverse Fisher transform on RSI: values [-1.0, 1.0] (https://goo.gl/2JGGoy)
         # rsi = 0.1 * (dataframe["rsi"] - 50)
@@ -210,9 +242,7 @@ class MyFirstStrategy(IStrategy):
         # dataframe["slowk"] = stoch["slowk"]
 
         # Stochastic Fast
-        stoch_fast = ta.STOCHF(dataframe)
-        dataframe["fastd"] = stoch_fast["fastd"]
-        dataframe["fastk"] = stoch_fast["fastk"]
+        reg.talib({"fastd": "fastd", "fastk": "fastk"}, "STOCHF")
 
         # # Stochastic RSI
         # Please read https://github.com/freqtrade/freqtrade/issues/2961 before using this.
@@ -222,13 +252,10 @@ class MyFirstStrategy(IStrategy):
         # dataframe["fastk_rsi"] = stoch_rsi["fastk"]
 
         # MACD
-        macd = ta.MACD(dataframe)
-        dataframe["macd"] = macd["macd"]
-        dataframe["macdsignal"] = macd["macdsignal"]
-        dataframe["macdhist"] = macd["macdhist"]
+        reg.talib({"macd": "macd", "macdsignal": "macdsignal", "macdhist": "macdhist"}, "MACD")
 
         # MFI
-        dataframe["mfi"] = ta.MFI(dataframe)
+        reg.talib("mfi", "MFI")
 
         # # ROC
         # dataframe["roc"] = ta.ROC(dataframe)
@@ -237,16 +264,22 @@ class MyFirstStrategy(IStrategy):
         # ------------------------------------
 
         # Bollinger Bands
-        bollinger = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=2)
-        dataframe["bb_lowerband"] = bollinger["lower"]
-        dataframe["bb_middleband"] = bollinger["mid"]
-        dataframe["bb_upperband"] = bollinger["upper"]
-        dataframe["bb_percent"] = (
-            (dataframe["close"] - dataframe["bb_lowerband"]) /
-            (dataframe["bb_upperband"] - dataframe["bb_lowerband"])
+        reg.add(
+            {"lower": "bb_lowerband", "mid": "bb_middleband", "upper": "bb_upperband"},
+            lambda v, window, stds: qtpylib.bollinger_bands(
+                qtpylib.typical_price(v.dataframe), window=window, stds=stds
+            ),
+            window=20, stds=2,
+        )
+        reg.add(
+            "bb_percent",
+            lambda v: (v["close"] - v["bb_lowerband"]) / (v["bb_upperband"] - v["bb_lowerband"]),
+            depends=("bb_lowerband", "bb_upperband"),
         )
-        dataframe["bb_width"] = (
-            (dataframe["bb_upperband"] - dataframe["bb_lowerband"]) / dataframe["bb_middleband"]
+        reg.add(
+            "bb_width",
+            lambda v: (v["bb_upperband"] - v["bb_lowerband"]) / v["bb_middleband"],
+            depends=("bb_lowerband", "bb_middleband", "bb_upperband"),
         )
 
         # Bollinger Bands - Weighted (EMA based instead of SMA)
@@ -281,17 +314,15 @@ class MyFirstStrategy(IStrategy):
         # dataframe["sma100"] = ta.SMA(dataframe, timeperiod=100)
 
         # Parabolic SAR
-        dataframe["sar"] = ta.SAR(dataframe)
+        reg.talib("sar", "SAR")
 
         # TEMA - Triple Exponential Moving Average
-        dataframe["tema"] = ta.TEMA(dataframe, timeperiod=9)
+        reg.talib("tema", "TEMA", timeperiod=9)
 
         # Cycle Indicator
         # ------------------------------------
         # Hilbert Transform Indicator - SineWave
-        hilbert = ta.HT_SINE(dataframe)
-        dataframe["htsine"] = hilbert["sine"]
-        dataframe["htleadsine"] = hilbert["leadsine"]
+        reg.talib({"sine": "htsine", "leadsine": "htleadsine"}, "HT_SINE")
 
         # Pattern Recognition - Bullish candlestick patterns
         # ------------------------------------
@@ -347,18 +378,7 @@ class MyFirstStrategy(IStrategy):
         # dataframe["ha_high"] = heikinashi["high"]
         # dataframe["ha_low"] = heikinashi["low"]
 
-        # Retrieve best bid and best ask from the orderbook
-        # ------------------------------------
-        """
-        # first check if dataprovider is available
-        if self.dp:
-            if self.dp.runmode.value in ("live", "dry_run"):
-                ob = self.dp.orderbook(metadata["pair"], 1)
-                dataframe["best_bid"] = ob["bids"][0][0]
-                dataframe["best_ask"] = ob["asks"][0][0]
-        """
-
-        return dataframe
+        return reg
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
@@ -9,7 +9,6 @@ Supertrend Futures V2 策略 - 优化版
 4. 动态杠杆管理
 """
 import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional, Union
@@ -17,6 +16,7 @@ from functools import reduce
 
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 import talib.abstract as ta
+import quantkit.indicators as qi
 
 
 class SupertrendFuturesStrategyV2(IStrategy):
@@ -76,30 +76,7 @@ class SupertrendFuturesStrategyV2(IStrategy):
     
     def supertrend(self, dataframe, period=14, multiplier=3):
         """计算 Supertrend 指标"""
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            
-            if direction[i] == 1:
-                supertrend[i] = lowerband.iloc[i]
-            else:
-                supertrend[i] = upperband.iloc[i]
-        
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
     
     def leverage(self, pair: str, current_time: datetime, current_rate: float,
                  proposed_leverage: float, max_leverage: float, entry_tag: Optional[str],
@@ -1,7 +1,6 @@
 # SupertrendFuturesStrategyV3 - 合约优化版
 # 改进：降低做空门槛，让多空更平衡
 import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional
@@ -9,6 +8,7 @@ from functools import reduce
 
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 import talib.abstract as ta
+import quantkit.indicators as qi
 
 
 class SupertrendFuturesStrategyV3(IStrategy):
@@ -51,27 +51,7 @@ class SupertrendFuturesStrategyV3(IStrategy):
     leverage_default = 2
     
     def supertrend(self, dataframe, period=14, multiplier=3):
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
     
     def leverage(self, pair, current_time, current_rate, proposed_leverage, max_leverage, entry_tag, side, **kwargs):
         return min(self.leverage_default, max_leverage)
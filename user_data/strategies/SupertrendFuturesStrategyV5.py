@@ -4,7 +4,6 @@
 # 改进: 分批止盈、RSI过滤加强、动态仓位
 
 import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional
@@ -14,6 +13,8 @@ import logging
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 from freqtrade.persistence import Trade
 import talib.abstract as ta
+import quantkit.indicators as qi
+import quantkit.snapshot as qsnap
 
 logger = logging.getLogger(__name__)
 
@@ -80,24 +81,13 @@ class SupertrendFuturesStrategyV5(IStrategy):
     # 记录止盈状态
     custom_info_trail = {}
 
+    def bot_start(self, **kwargs) -> None:
+        """动态仓位和分批止盈读取的K线快照"""
+        self.snapshots = qsnap.SnapshotCache(('atr_ratio', 'rsi'))
+
     def supertrend(self, dataframe, period=14, multiplier=3):
         """计算 Supertrend 指标"""
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
 
     def leverage(self, pair, current_time, current_rate, proposed_leverage, max_leverage, entry_tag, side, **kwargs):
         return min(self.leverage_default, max_leverage)
@@ -124,6 +114,8 @@ class SupertrendFuturesStrategyV5(IStrategy):
         # ATR 占比 (用于动态仓位)
         dataframe['atr_ratio'] = dataframe['atr'] / dataframe['close']
 
+        self.snapshots.capture(self.dp, dataframe, metadata['pair'])
+
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -225,12 +217,12 @@ class SupertrendFuturesStrategyV5(IStrategy):
         - 中波动 (ATR 3-5%) → 中仓位 (75%)
         - 低波动 (ATR < 3%) → 正常仓位 (100%)
         """
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+        last_candle = self.snapshots.last(self.dp, pair, self.timeframe)
         
-        if len(dataframe) < 1:
+        if last_candle is None:
             return proposed_stake
         
-        atr_ratio = dataframe['atr_ratio'].iloc[-1]
+        atr_ratio = last_candle.atr_ratio
         
         # 根据波动率调整仓位
         if atr_ratio > self.atr_high_threshold.value:
@@ -262,9 +254,9 @@ class SupertrendFuturesStrategyV5(IStrategy):
         - 5% 利润 → 加速止盈
         - 10% 利润 → 全部平仓
         """
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+        last_candle = self.snapshots.last(self.dp, pair, self.timeframe)
         
-        if len(dataframe) < 1:
+        if last_candle is None:
             return None
         
         # 获取当前利润百分比
@@ -284,7 +276,6 @@ class SupertrendFuturesStrategyV5(IStrategy):
             return f'profit_{int(self.tp_level_1.value*100)}pct'
         
         # RSI 反转信号
-        last_candle = dataframe.iloc[-1]
         if trade.is_short:
             # 做空时 RSI 超卖
             if last_candle['rsi'] < 30:
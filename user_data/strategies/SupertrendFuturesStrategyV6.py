@@ -4,7 +4,6 @@
 # 新增: 动态止损、Max Drawdown 保护
 
 import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional
@@ -14,6 +13,8 @@ import logging
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 from freqtrade.persistence import Trade
 import talib.abstract as ta
+import quantkit.indicators as qi
+import quantkit.snapshot as qsnap
 
 logger = logging.getLogger(__name__)
 
@@ -81,23 +82,12 @@ class SupertrendFuturesStrategyV6(IStrategy):
     # 记录账户历史
     account_history = []
 
+    def bot_start(self, **kwargs) -> None:
+        """动态止损读取的K线快照"""
+        self.snapshots = qsnap.SnapshotCache(('atr_ratio',))
+
     def supertrend(self, dataframe, period=14, multiplier=3):
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
 
     def leverage(self, pair, current_time, current_rate, proposed_leverage, max_leverage, entry_tag, side, **kwargs):
         return min(self.leverage_default, max_leverage)
@@ -119,6 +109,8 @@ class SupertrendFuturesStrategyV6(IStrategy):
         dataframe['is_downtrend'] = dataframe['close'] < dataframe['ema_200']
         dataframe['atr_ratio'] = dataframe['atr'] / dataframe['close']
 
+        self.snapshots.capture(self.dp, dataframe, metadata['pair'])
+
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -186,13 +178,13 @@ class SupertrendFuturesStrategyV6(IStrategy):
         
         论文依据: 动态风控收益提升 3-5%
         """
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+        last_candle = self.snapshots.last(self.dp, pair, self.timeframe)
         
-        if len(dataframe) < 1:
+        if last_candle is None:
             return self.stoploss
         
         # 获取当前 ATR 占比
-        atr_ratio = dataframe['atr_ratio'].iloc[-1]
+        atr_ratio = last_candle.atr_ratio
         
         # 动态止损
         if atr_ratio > self.atr_high_threshold.value:
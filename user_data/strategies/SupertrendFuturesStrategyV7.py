@@ -4,7 +4,6 @@
 # 新增: WorldQuant Alpha 因子确认、市场环境识别
 
 import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional
@@ -14,6 +13,9 @@ import logging
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 from freqtrade.persistence import Trade
 import talib.abstract as ta
+import quantkit.indicators as qi
+import quantkit.streaming as qs
+import quantkit.factors as qf
 
 logger = logging.getLogger(__name__)
 
@@ -85,23 +87,12 @@ class SupertrendFuturesStrategyV7(IStrategy):
     can_short: bool = True
     leverage_default = 2
 
+    def bot_start(self, **kwargs) -> None:
+        """实盘/模拟盘使用增量 Alpha 因子"""
+        self.factor_stream = qf.FactorStream()
+
     def supertrend(self, dataframe, period=14, multiplier=3):
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
 
     def leverage(self, pair, current_time, current_rate, proposed_leverage, max_leverage, entry_tag, side, **kwargs):
         return min(self.leverage_default, max_leverage)
@@ -124,14 +115,24 @@ class SupertrendFuturesStrategyV7(IStrategy):
         dataframe['is_downtrend'] = dataframe['close'] < dataframe['ema_200']
         
         # === WorldQuant Alpha 因子 ===
+        # 实盘按新K线增量推进，回测/Hyperopt 批量计算
+        if qs.is_live(self.dp):
+            pair = metadata['pair']
+            low_rank = self.factor_stream.ts_rank(dataframe, pair, self.timeframe, 'low', 9)
+            open_volume_corr = self.factor_stream.correlation(
+                dataframe, pair, self.timeframe, 'open', 'volume', 10
+            )
+        else:
+            low_rank = qf.ts_rank(dataframe, 'low', 9)
+            open_volume_corr = qf.correlation(dataframe, 'open', 'volume', 10)
         
         # Alpha#4: (-1 * Ts_Rank(rank(low), 9))
         # 低价股反转信号
-        dataframe['alpha_4'] = -1 * dataframe['low'].rolling(9).rank(pct=True)
+        dataframe['alpha_4'] = -1 * low_rank
         
         # Alpha#6: (-1 * correlation(open, volume, 10))
         # 开盘价与成交量的负相关性
-        dataframe['alpha_6'] = -1 * dataframe['open'].rolling(10).corr(dataframe['volume'])
+        dataframe['alpha_6'] = -1 * open_volume_corr
         
         # Alpha#101: ((close - open) / ((high - low) + .001))
         # 日内趋势强度
@@ -2,7 +2,6 @@
 # 基于V8，适度放宽过滤条件
 
 import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional
@@ -11,6 +10,8 @@ import logging
 
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 import talib.abstract as ta
+import quantkit.indicators as qi
+import quantkit.batch as qb
 
 logger = logging.getLogger(__name__)
 
@@ -70,33 +71,31 @@ class SupertrendFuturesStrategyV8_1(IStrategy):
     can_short: bool = True
     leverage_default = 2
 
-    def supertrend(self, dataframe, period=14, multiplier=3):
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+    def supertrend(self, dataframe, period=14, multiplier=3, pair=None):
+        """Supertrend计算（Hyperopt 时按参数查表，ATR 每个周期只算一次）"""
+        if pair is not None and qb.is_hyperopt(self.dp):
+            return qb.supertrend(dataframe, pair, self.timeframe, period, multiplier)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
+
+    def ema(self, dataframe, period, pair=None):
+        """EMA（Hyperopt 时从 ema_fast/ema_slow 参数范围内全部周期的预计算表中取）"""
+        if pair is not None and qb.is_hyperopt(self.dp):
+            low = min(self.ema_fast.low, self.ema_slow.low)
+            high = max(self.ema_fast.high, self.ema_slow.high)
+            if low <= period <= high:
+                return qb.period_indicator(dataframe, pair, self.timeframe, 'EMA', period, low, high)
+        return ta.EMA(dataframe, timeperiod=period)
 
     def leverage(self, pair, current_time, current_rate, proposed_leverage, max_leverage, entry_tag, side, **kwargs):
         return min(self.leverage_default, max_leverage)
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         # === V4 核心指标 ===
-        dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=self.ema_fast.value)
-        dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=self.ema_slow.value)
+        dataframe['ema_fast'] = self.ema(dataframe, self.ema_fast.value, metadata['pair'])
+        dataframe['ema_slow'] = self.ema(dataframe, self.ema_slow.value, metadata['pair'])
         dataframe['supertrend'], dataframe['st_dir'] = self.supertrend(
-            dataframe, period=self.atr_period.value, multiplier=self.atr_multiplier.value
+            dataframe, period=self.atr_period.value, multiplier=self.atr_multiplier.value,
+            pair=metadata['pair']
         )
         dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
         dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
@@ -104,7 +103,7 @@ class SupertrendFuturesStrategyV8_1(IStrategy):
         dataframe['adx_neg'] = ta.MINUS_DI(dataframe, timeperiod=14)
         dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
         dataframe['volume_ma'] = dataframe['volume'].rolling(20).mean()
-        dataframe['ema_200'] = ta.EMA(dataframe, timeperiod=200)
+        dataframe['ema_200'] = self.ema(dataframe, 200, metadata['pair'])
         dataframe['is_uptrend'] = dataframe['close'] > dataframe['ema_200']
         dataframe['is_downtrend'] = dataframe['close'] < dataframe['ema_200']
         
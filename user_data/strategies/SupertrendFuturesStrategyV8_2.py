@@ -1,16 +1,25 @@
 # SupertrendFuturesStrategyV8_2 - 市场环境自适应版
 # 基于V8.1，添加牛熊市识别和动态调整
 
-import numpy as np
-import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from typing import Optional
-from functools import reduce
 import logging
 
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 import talib.abstract as ta
+import quantkit.indicators as qi
+import quantkit.streaming as qs
+import quantkit.batch as qb
+import quantkit.snapshot as qsnap
+import quantkit.registry as qreg
+import quantkit.incremental as qinc
+import quantkit.signals as qsig
+import quantkit.conditions as qc
+import quantkit.informative as qinf
+import quantkit.resample as qrs
+import quantkit.regime as qrg
+import quantkit.features as qfeat
 
 logger = logging.getLogger(__name__)
 
@@ -72,60 +81,83 @@ class SupertrendFuturesStrategyV8_2(IStrategy):
     can_short: bool = True
     leverage_default = 2
 
-    def supertrend(self, dataframe, period=14, multiplier=3):
-        """Supertrend计算"""
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
-
-    def detect_market_regime(self, dataframe: DataFrame) -> DataFrame:
+    # 市场环境判断周期：None 为本周期 EMA(trend_lookback)；
+    # 设为 '1d' 等则在本地重采样的高周期K线上计算（不额外请求交易所，
+    # startup_candle_count 需覆盖 trend_lookback 根高周期K线）
+    regime_timeframe = None
+
+    # 信号和回调用到的列（只计算这些列及其依赖）
+    signal_columns = (
+        'supertrend', 'st_dir', 'ema_fast', 'ema_slow', 'adx', 'adx_pos', 'adx_neg',
+        'rsi', 'volume_ma', 'alpha_101', 'is_uptrend', 'is_downtrend', 'volatility_ratio',
+    )
+
+    # 返回给框架的列（其余指标在出场信号后丢弃）；confirm_trade_entry 回测时从分析后的
+    # dataframe 读 volatility_ratio，必须保留
+    exported_columns = ('supertrend', 'st_dir', 'ema_fast', 'ema_slow', 'adx', 'market_regime',
+                        'volatility_ratio')
+
+    def bot_start(self, **kwargs) -> None:
+        """实盘/模拟盘使用增量 Supertrend、增量 TA 指标、尾部信号求值和K线快照"""
+        self.st_stream = qs.SupertrendStream()
+        self.signals = qsig.TailSignals()
+        self.ta_stream = qinc.TAStream()
+        self.snapshots = qsnap.SnapshotCache(('volatility_ratio',))
+        self.resampler = qrs.Resampler(self.timeframe)
+        # Hyperopt：EMA 参数范围内全部周期每个交易对只算一次，epoch 按周期取行
+        self.period_banks = qb.PeriodBanks({'EMA': (
+            min(self.ema_fast.low, self.ema_slow.low, self.trend_lookback.low),
+            max(self.ema_fast.high, self.ema_slow.high, self.trend_lookback.high),
+        )})
+        # 回测/Hyperopt：TA-Lib 指标先查磁盘特征库（user_data/feature_store），同一段数据只算一次
+        self.features = qfeat.FeatureStore.from_config(self.config)
+        # 市场环境：价格偏离 ema_trend 2% 且 ADX > 20，按交易对缓存，回调直接取值
+        self.regime = qrg.shared_service(
+            qrg.EMADistanceADX(distance=2.0, adx_threshold=20, ema_column='ema_trend'), self.timeframe)
+
+    def supertrend(self, dataframe, period=14, multiplier=3, pair=None):
+        """Supertrend计算（实盘按新K线增量推进，Hyperopt 按参数查表，回测全量计算）"""
+        if pair is not None and qs.is_live(self.dp):
+            return self.st_stream.supertrend(dataframe, pair, self.timeframe, period, multiplier)
+        if pair is not None and qb.is_hyperopt(self.dp):
+            return qb.supertrend(dataframe, pair, self.timeframe, period, multiplier)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
+
+    def detect_market_regime(self, dataframe: DataFrame, pair: str = None) -> DataFrame:
         """
         检测市场环境
         返回: 1=牛市, -1=熊市, 0=震荡
         """
         # 使用长期EMA判断趋势
-        dataframe['ema_trend'] = ta.EMA(dataframe['close'], timeperiod=self.trend_lookback.value)
+        if self.regime_timeframe and pair is not None:
+            # 高周期 EMA：本地重采样，新K线只更新当前高周期K线
+            htf = self.resampler.resample(dataframe, pair, self.regime_timeframe)
+            trend = DataFrame({
+                'date': htf['date'],
+                'ema_trend': ta.EMA(htf['close'], timeperiod=self.trend_lookback.value),
+            })
+            dataframe = qinf.merge_asof(dataframe, trend, self.timeframe, self.regime_timeframe, suffix='')
+        elif pair is not None and qb.is_hyperopt(self.dp):
+            dataframe['ema_trend'] = self.period_banks.talib(
+                dataframe, pair, self.timeframe, 'EMA', self.trend_lookback.value)
+        else:
+            dataframe['ema_trend'] = ta.EMA(dataframe['close'], timeperiod=self.trend_lookback.value)
         
-        # 价格相对位置
-        price_position = (dataframe['close'] - dataframe['ema_trend']) / dataframe['ema_trend'] * 100
-        
-        # 趋势强度（ADX）
-        adx = ta.ADX(dataframe, timeperiod=14)
-        
-        # 市场环境判断 - 放宽条件
-        conditions = [
-            (price_position > 2) & (adx > 20),   # 牛市：放宽
-            (price_position < -2) & (adx > 20),  # 熊市：放宽
-        ]
-        choices = [1, -1]  # 牛市=1, 熊市=-1
-        
-        dataframe['market_regime'] = np.select(conditions, choices, default=0)
+        # 市场环境判断 - 放宽条件（价格偏离 ±2% 且 ADX > 20）
+        if pair is not None:
+            dataframe['market_regime'] = self.regime.update(dataframe, pair)
+        else:
+            dataframe['market_regime'] = self.regime.detector.detect(dataframe)
         
         return dataframe
 
     def leverage(self, pair, current_time, current_rate, proposed_leverage, max_leverage, entry_tag, side, **kwargs):
         """动态杠杆 - 顺势加仓，逆势减仓"""
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+        regime = self.regime.current_regime(pair, current_time)
         
-        if len(dataframe) < 1:
+        if regime is None:
             return min(self.leverage_default, max_leverage)
         
-        last_candle = dataframe.iloc[-1]
-        regime = last_candle.get('market_regime', 0)
-        
         # 顺势交易：2x杠杆
         # 逆势交易：1x杠杆
         # 震荡市：1.5x杠杆
@@ -142,51 +174,73 @@ class SupertrendFuturesStrategyV8_2(IStrategy):
         
         return min(leverage, max_leverage)
 
-    def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        """计算技术指标"""
-        
+    def indicator_registry(self, pair: str) -> qreg.IndicatorRegistry:
+        """声明指标（ADX/ATR 等相同函数+参数只算一次；实盘 EMA/ADX/DI/RSI/ATR 按新K线增量推进，Hyperopt EMA 查表，回测先查特征库）"""
+        if qs.is_live(self.dp):
+            stream = self.ta_stream
+        elif qb.is_hyperopt(self.dp):
+            stream = (self.period_banks, self.features)
+        else:
+            stream = self.features
+        reg = qreg.IndicatorRegistry(stream=stream, pair=pair, timeframe=self.timeframe)
+
         # === V8.1 核心指标 ===
-        dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=self.ema_fast.value)
-        dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=self.ema_slow.value)
-        dataframe['supertrend'], dataframe['st_dir'] = self.supertrend(
-            dataframe, period=self.atr_period.value, multiplier=self.atr_multiplier.value
+        reg.talib('ema_fast', 'EMA', timeperiod=self.ema_fast.value)
+        reg.talib('ema_slow', 'EMA', timeperiod=self.ema_slow.value)
+        reg.add(
+            ('supertrend', 'st_dir'),
+            lambda v, period, multiplier: self.supertrend(
+                v.dataframe, period=period, multiplier=multiplier, pair=pair
+            ),
+            period=self.atr_period.value, multiplier=self.atr_multiplier.value,
         )
-        
+
         # ADX
-        dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
-        dataframe['adx_pos'] = ta.PLUS_DI(dataframe, timeperiod=14)
-        dataframe['adx_neg'] = ta.MINUS_DI(dataframe, timeperiod=14)
-        
+        reg.talib('adx', 'ADX', timeperiod=14)
+        reg.talib('adx_pos', 'PLUS_DI', timeperiod=14)
+        reg.talib('adx_neg', 'MINUS_DI', timeperiod=14)
+
         # RSI
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
-        
+        reg.talib('rsi', 'RSI', timeperiod=14)
+
         # 成交量
-        dataframe['volume_ma'] = dataframe['volume'].rolling(window=20).mean()
-        
+        reg.add('volume_ma', lambda v: v['volume'].rolling(window=20).mean())
+
         # Alpha#101 (简化版)
-        dataframe['alpha_101'] = (
-            (dataframe['close'] - dataframe['close'].shift(5)) / dataframe['close'].shift(5) * 100 -
-            (dataframe['volume'] - dataframe['volume'].shift(5)) / dataframe['volume'].shift(5) * 10
-        )
-        
+        reg.add('alpha_101', lambda v: (
+            (v['close'] - v['close'].shift(5)) / v['close'].shift(5) * 100 -
+            (v['volume'] - v['volume'].shift(5)) / v['volume'].shift(5) * 10
+        ))
+
         # 趋势判断
-        dataframe['is_uptrend'] = dataframe['close'] > dataframe['supertrend']
-        dataframe['is_downtrend'] = dataframe['close'] < dataframe['supertrend']
-        
-        # 波动率
-        dataframe['volatility_ratio'] = ta.ATR(dataframe, timeperiod=14) / dataframe['close']
-        
+        reg.add('is_uptrend', lambda v: v['close'] > v['supertrend'], depends=('supertrend',))
+        reg.add('is_downtrend', lambda v: v['close'] < v['supertrend'], depends=('supertrend',))
+
+        # 波动率（ATR 只作中间结果，不写入 dataframe）
+        reg.talib('atr_14', 'ATR', timeperiod=14, export=False)
+        reg.add('volatility_ratio', lambda v: v['atr_14'] / v['close'], depends=('atr_14',))
+
+        return reg
+
+    def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """计算技术指标"""
+        columns = qreg.required_columns(self, self.signal_columns)
+        dataframe = self.indicator_registry(metadata['pair']).compute(dataframe, columns)
+
         # === V8.2 新增：市场环境判断 ===
-        dataframe = self.detect_market_regime(dataframe)
+        dataframe = self.detect_market_regime(dataframe, metadata['pair'])
+        
+        self.snapshots.capture(self.dp, dataframe, metadata['pair'])
         
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """做多 - 根据市场环境调整条件"""
-        dataframe.loc[:, 'enter_long'] = 0
+        pair = metadata['pair']
+        df = self.signals.frame(self.dp, dataframe, pair, ('enter_long',))
         
         # 获取当前市场环境
-        regime = dataframe['market_regime'].iloc[-1] if len(dataframe) > 0 else 0
+        regime = self.regime.current_regime(pair, default=0)
         
         # 根据市场环境调整ADX阈值
         if regime == 1:  # 牛市：放宽做多
@@ -196,33 +250,32 @@ class SupertrendFuturesStrategyV8_2(IStrategy):
         else:  # 震荡：标准
             adx_threshold = self.adx_threshold_long.value
         
-        conditions = [
+        c = qc.col
+        conditions = qc.ConditionSet([
             # V8.1 核心条件
-            dataframe['st_dir'] == 1,
-            dataframe['ema_fast'] > dataframe['ema_slow'],
-            dataframe['adx'] > adx_threshold,
-            dataframe['adx_pos'] > dataframe['adx_neg'],
-            dataframe['close'] > dataframe['supertrend'],
-            dataframe['is_uptrend'],
+            c('st_dir') == 1,
+            c('ema_fast') > c('ema_slow'),
+            c('adx') > adx_threshold,
+            c('adx_pos') > c('adx_neg'),
+            c('close') > c('supertrend'),
+            c('is_uptrend'),
             
             # V8.1 多因子
-            (dataframe['rsi'] > 35) & (dataframe['rsi'] < 80),
-            dataframe['alpha_101'] > self.alpha_threshold.value,
-            dataframe['volume'] > dataframe['volume_ma'] * 1.1,
-            dataframe['volatility_ratio'] < 0.06,
-        ]
+            (c('rsi') > 35) & (c('rsi') < 80),
+            c('alpha_101') > self.alpha_threshold.value,
+            c('volume') > c('volume_ma') * 1.1,
+            c('volatility_ratio') < 0.06,
+        ])
 
-        if conditions:
-            dataframe.loc[reduce(lambda x, y: x & y, conditions), 'enter_long'] = 1
-
-        return dataframe
+        return self.signals.assign(self.dp, dataframe, pair, 'enter_long', conditions.evaluate(df))
 
     def populate_entry_trend_short(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """做空 - 根据市场环境调整条件"""
-        dataframe.loc[:, 'enter_short'] = 0
+        pair = metadata['pair']
+        df = self.signals.frame(self.dp, dataframe, pair, ('enter_short',))
         
         # 获取当前市场环境
-        regime = dataframe['market_regime'].iloc[-1] if len(dataframe) > 0 else 0
+        regime = self.regime.current_regime(pair, default=0)
         
         # 根据市场环境调整ADX阈值
         if regime == -1:  # 熊市：放宽做空
@@ -232,54 +285,49 @@ class SupertrendFuturesStrategyV8_2(IStrategy):
         else:  # 震荡：标准
             adx_threshold = self.adx_threshold_short.value
         
-        conditions = [
+        c = qc.col
+        conditions = qc.ConditionSet([
             # V8.1 核心条件
-            dataframe['st_dir'] == -1,
-            dataframe['ema_fast'] < dataframe['ema_slow'],
-            dataframe['adx'] > adx_threshold,
-            dataframe['adx_neg'] > dataframe['adx_pos'],
-            dataframe['close'] < dataframe['supertrend'],
-            dataframe['is_downtrend'],
+            c('st_dir') == -1,
+            c('ema_fast') < c('ema_slow'),
+            c('adx') > adx_threshold,
+            c('adx_neg') > c('adx_pos'),
+            c('close') < c('supertrend'),
+            c('is_downtrend'),
             
             # V8.1 多因子
-            (dataframe['rsi'] > 20) & (dataframe['rsi'] < 65),
-            dataframe['alpha_101'] < -self.alpha_threshold.value,
-            dataframe['volume'] > dataframe['volume_ma'] * 1.1,
-            dataframe['volatility_ratio'] < 0.06,
-        ]
+            (c('rsi') > 20) & (c('rsi') < 65),
+            c('alpha_101') < -self.alpha_threshold.value,
+            c('volume') > c('volume_ma') * 1.1,
+            c('volatility_ratio') < 0.06,
+        ])
 
-        if conditions:
-            dataframe.loc[reduce(lambda x, y: x & y, conditions), 'enter_short'] = 1
-
-        return dataframe
+        return self.signals.assign(self.dp, dataframe, pair, 'enter_short', conditions.evaluate(df))
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """做多平仓"""
-        dataframe.loc[:, 'exit_long'] = 0
-        conditions = [dataframe['st_dir'] == -1]
-        if conditions:
-            dataframe.loc[reduce(lambda x, y: x & y, conditions), 'exit_long'] = 1
-        return dataframe
+        pair = metadata['pair']
+        df = self.signals.frame(self.dp, dataframe, pair, ('exit_long',))
+        conditions = [df['st_dir'] == -1]
+        dataframe = self.signals.assign(self.dp, dataframe, pair, 'exit_long', conditions)
+        return qreg.prune_columns(self, dataframe)
 
     def populate_exit_trend_short(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """做空平仓"""
-        dataframe.loc[:, 'exit_short'] = 0
-        conditions = [dataframe['st_dir'] == 1]
-        if conditions:
-            dataframe.loc[reduce(lambda x, y: x & y, conditions), 'exit_short'] = 1
-        return dataframe
+        pair = metadata['pair']
+        df = self.signals.frame(self.dp, dataframe, pair, ('exit_short',))
+        conditions = [df['st_dir'] == 1]
+        return self.signals.assign(self.dp, dataframe, pair, 'exit_short', conditions)
 
     def confirm_trade_entry(self, pair: str, order_type: str, amount: float, 
                            rate: float, time_in_force: str, current_time: datetime,
                            entry_tag: Optional[str], side: str, **kwargs) -> bool:
         """入场确认"""
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+        last_candle = self.snapshots.last(self.dp, pair, self.timeframe)
         
-        if len(dataframe) < 1:
+        if last_candle is None:
             return False
         
-        last_candle = dataframe.iloc[-1]
-        
         # 避免极端波动
         if last_candle['volatility_ratio'] > 0.08:
             logger.info(f"波动率过高，跳过 {pair}")
@@ -2,8 +2,8 @@
 # 保持V2简洁，只加入动态止损锁定利润
 from freqtrade.strategy import IStrategy, IntParameter, DecimalParameter
 from pandas import DataFrame
-import pandas as pd
 import talib.abstract as ta
+import quantkit.indicators as qi
 from functools import reduce
 
 class SupertrendStrategyV2_5(IStrategy):
@@ -38,19 +38,7 @@ class SupertrendStrategyV2_5(IStrategy):
     order_types = {'entry': 'limit', 'exit': 'limit', 'stoploss': 'market', 'stoploss_on_exchange': False}
     
     def supertrend(self, dataframe, period=14, multiplier=3):
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]: direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]: direction[i] = -1
-            else: direction[i] = direction[i-1]
-            supertrend[i] = lowerband.iloc[i] if direction[i] == 1 else upperband.iloc[i]
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
     
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=self.ema_fast.value)
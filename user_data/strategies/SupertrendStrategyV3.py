@@ -5,8 +5,8 @@
 # 3. 保持4个交易对
 from freqtrade.strategy import IStrategy, IntParameter, DecimalParameter
 from pandas import DataFrame
-import pandas as pd
 import talib.abstract as ta
+import quantkit.indicators as qi
 from functools import reduce
 from datetime import datetime
 
@@ -61,30 +61,7 @@ class SupertrendStrategyV3(IStrategy):
     custom_info_trail = {}
     
     def supertrend(self, dataframe, period=14, multiplier=3):
-        df = dataframe.copy()
-        hl2 = (df['high'] + df['low']) / 2
-        atr = ta.ATR(df, timeperiod=period)
-        
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        
-        supertrend = [0] * len(df)
-        direction = [1] * len(df)
-        
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > upperband.iloc[i-1]:
-                direction[i] = 1
-            elif df['close'].iloc[i] < lowerband.iloc[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            
-            if direction[i] == 1:
-                supertrend[i] = lowerband.iloc[i]
-            else:
-                supertrend[i] = upperband.iloc[i]
-        
-        return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier)
     
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         # Supertrend
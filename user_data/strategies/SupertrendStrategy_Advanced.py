@@ -11,6 +11,9 @@ from freqtrade.strategy import IStrategy, CategoricalParameter, DecimalParameter
 from technical.util import resample_to_interval, resampled_merge
 from technical.indicators import SSLChannels, vwmacd
 import talib.abstract as ta
+import quantkit.indicators as qi
+import quantkit.informative as qinf
+import quantkit.resample as qrs
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
 
@@ -78,50 +81,42 @@ class SupertrendStrategy_Advanced(IStrategy):
         'exit': 'GTC'
     }
     
+    # 信号用到的高周期列（按需获取）。为空时不请求任何信息对，
+    # trend_1h / trend_4h 用本周期数据近似；加入后改用真实的 1h/4h K线
+    informative_columns = ()
+    # 高周期K线来源：'resample' 由本周期K线本地重采样（不额外请求交易所），'exchange' 下载信息对
+    informative_source = 'resample'
+    
+    def bot_start(self, **kwargs) -> None:
+        """声明可用的高周期列"""
+        self.informative = qinf.InformativeSet(self.timeframe)
+        self.informative.add('1h', 'trend', self.informative_trend_1h, fill=0)
+        self.informative.add('4h', 'trend', self.informative_trend_4h, fill=0)
+        self.resampler = qrs.Resampler(self.timeframe)
+    
+    @staticmethod
+    def informative_trend_1h(informative: DataFrame):
+        """1h 趋势：EMA 斜率为正"""
+        slope = ta.LINEARREG_SLOPE(ta.EMA(informative, timeperiod=21), timeperiod=5)
+        return np.where(slope > 0, 1, 0)
+    
+    @staticmethod
+    def informative_trend_4h(informative: DataFrame):
+        """4h 趋势：EMA50 高于 10 根前"""
+        ema = ta.EMA(informative, timeperiod=50)
+        return np.where(ema > ema.shift(10), 1, 0)
+    
     def informative_pairs(self):
-        """定义信息对 - 多时间框架"""
-        return [
-            ("BTC/USDT", "1h"),
-            ("BTC/USDT", "4h"),
-            ("ETH/USDT", "1h"),
-            ("ETH/USDT", "4h"),
-            ("SOL/USDT", "1h"),
-            ("SOL/USDT", "4h"),
-            ("DOGE/USDT", "1h"),
-            ("DOGE/USDT", "4h"),
-        ]
+        """定义信息对 - 只包含 informative_columns 用到的 (pair, 高周期)"""
+        if not self.informative_columns or self.informative_source != 'exchange' or self.dp is None:
+            return []
+        return self.informative.pairs(self.dp.current_whitelist(), self.informative_columns)
     
     def supertrend(self, dataframe, period=10, multiplier=3):
         """
         计算 Supertrend 指标
         """
-        hl2 = (dataframe['high'] + dataframe['low']) / 2
-        
-        # ATR
-        atr = ta.ATR(dataframe, timeperiod=period)
-        
-        # 基本带
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        
-        # 初始化
-        supertrend = np.zeros(len(dataframe))
-        direction = np.zeros(len(dataframe))
-        
-        for i in range(1, len(dataframe)):
-            if dataframe['close'][i] > upperband[i-1]:
-                direction[i] = 1
-            elif dataframe['close'][i] < lowerband[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            
-            if direction[i] == 1:
-                supertrend[i] = lowerband[i]
-            else:
-                supertrend[i] = upperband[i]
-        
-        return pd.Series(supertrend, index=dataframe.index), pd.Series(direction, index=dataframe.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier, initial_direction=0)
     
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """添加技术指标 - 高级版（20个特征）"""
@@ -170,9 +165,16 @@ class SupertrendStrategy_Advanced(IStrategy):
         dataframe['adx_pos'] = ta.PLUS_DI(dataframe, timeperiod=14)
         dataframe['adx_neg'] = ta.MINUS_DI(dataframe, timeperiod=14)
         
-        # A2. 多时间框架趋势（简化版）
-        dataframe['trend_1h'] = np.where(dataframe['ema_slope'] > 0, 1, 0)
-        dataframe['trend_4h'] = np.where(dataframe['ema_200'] > dataframe['ema_200'].shift(10), 1, 0)
+        # A2. 多时间框架趋势：声明了的高周期列用真实数据，其余用简化版
+        if self.informative_source == 'exchange':
+            source = self.dp
+        else:
+            source = self.resampler.provider(dataframe, metadata['pair'])
+        dataframe = self.informative.merge(source, dataframe, metadata['pair'], self.informative_columns)
+        if 'trend_1h' not in dataframe:
+            dataframe['trend_1h'] = np.where(dataframe['ema_slope'] > 0, 1, 0)
+        if 'trend_4h' not in dataframe:
+            dataframe['trend_4h'] = np.where(dataframe['ema_200'] > dataframe['ema_200'].shift(10), 1, 0)
         
         # ==================== B. 资金流向（3个新特征）====================
         
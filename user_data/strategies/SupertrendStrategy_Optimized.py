@@ -1,7 +1,6 @@
 # pragma pylint: disable=missing-docstring, invalid-name, pointless-string-statement
 # isort: skip_file
 # --- Do not remove these libs ---
-import numpy as np
 import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
@@ -11,6 +10,7 @@ from freqtrade.strategy import IStrategy, CategoricalParameter, DecimalParameter
 from technical.util import resample_to_interval, resampled_merge
 from technical.indicators import SSLChannels, vwmacd
 import talib.abstract as ta
+import quantkit.indicators as qi
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
 
@@ -79,33 +79,7 @@ class SupertrendStrategy_Optimized(IStrategy):
         """
         计算 Supertrend 指标
         """
-        hl2 = (dataframe['high'] + dataframe['low']) / 2
-        
-        # ATR
-        atr = ta.ATR(dataframe, timeperiod=period)
-        
-        # 基本带
-        upperband = hl2 + (multiplier * atr)
-        lowerband = hl2 - (multiplier * atr)
-        
-        # 初始化
-        supertrend = np.zeros(len(dataframe))
-        direction = np.zeros(len(dataframe))
-        
-        for i in range(1, len(dataframe)):
-            if dataframe['close'][i] > upperband[i-1]:
-                direction[i] = 1
-            elif dataframe['close'][i] < lowerband[i-1]:
-                direction[i] = -1
-            else:
-                direction[i] = direction[i-1]
-            
-            if direction[i] == 1:
-                supertrend[i] = lowerband[i]
-            else:
-                supertrend[i] = upperband[i]
-        
-        return pd.Series(supertrend, index=dataframe.index), pd.Series(direction, index=dataframe.index)
+        return qi.supertrend(dataframe, period=period, multiplier=multiplier, initial_direction=0)
     
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """添加技术指标"""
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+quantkit - 策略共享工具包
+
+所有策略共用的指标内核放在这里，避免每个策略各自维护一份实现。
+Freqtrade 加载策略时会把 user_data/strategies 加入 sys.path，
+因此策略文件里直接 `import quantkit.indicators as qi` 即可。
+
+注意：本目录是 Python 包（不是策略），Freqtrade 不会把它当策略扫描。
+"""
+
+from .indicators import supertrend, supertrend_arrays, rolling_linreg, rolling_slope
+from .streaming import SupertrendStream, is_live
+from .batch import PeriodBank, PeriodBanks, SupertrendBank, is_hyperopt
+from .snapshot import CandleSnapshot, SnapshotCache
+from .factors import FactorStream, RollingCorr, RollingRank
+from .incremental import TAStream
+from .signals import TailSignals
+from .conditions import ConditionSet, col
+from .informative import InformativeCache, InformativeSet, merge_asof
+from .resample import Resampler, resample_ohlcv
+from .regime import RegimeService, shared_service
+from .features import FeatureStore
+from .ohlcv import OHLCVStore
+from .compact import compact_frame, signal_mismatch
+from .memory import check_peak, indicator_peak, peak_allocation
+from .registry import IndicatorRegistry, exported_columns, plot_columns, prune_columns, required_columns
+
+__all__ = [
+    'supertrend',
+    'supertrend_arrays',
+    'rolling_linreg',
+    'rolling_slope',
+    'SupertrendStream',
+    'is_live',
+    'SupertrendBank',
+    'PeriodBank',
+    'PeriodBanks',
+    'is_hyperopt',
+    'CandleSnapshot',
+    'SnapshotCache',
+    'FactorStream',
+    'RollingRank',
+    'RollingCorr',
+    'TAStream',
+    'TailSignals',
+    'ConditionSet',
+    'col',
+    'InformativeCache',
+    'InformativeSet',
+    'merge_asof',
+    'Resampler',
+    'resample_ohlcv',
+    'RegimeService',
+    'shared_service',
+    'FeatureStore',
+    'OHLCVStore',
+    'compact_frame',
+    'signal_mismatch',
+    'check_peak',
+    'indicator_peak',
+    'peak_allocation',
+    'IndicatorRegistry',
+    'exported_columns',
+    'plot_columns',
+    'prune_columns',
+    'required_columns',
+]
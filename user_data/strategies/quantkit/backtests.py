@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+回测结果缓存（按内容哈希去重）
+
+同一个策略、同样的参数和数据反复回测，每次都会重新跑一遍并多存一个 zip。
+这里按以下内容算一个哈希作为缓存键：
+
+    策略源码（策略文件、父类和导入的本地策略模块、同名参数 JSON、quantkit 共享代码）
+    配置（去掉 API / Telegram / 密钥等与回测结果无关的部分）
+    命令行的其他参数、timerange
+    K线数据文件内容（按静态交易对白名单筛选，白名单含正则或使用动态 pairlist 时取整个
+    数据目录；文件摘要按 (路径, 大小, mtime) 缓存）
+
+键已存在时直接返回已有结果（并把 .last_result.json 指向它），不再调用 freqtrade；
+否则回测到单独的目录，把这次运行产生的结果移入结果目录并记录。没有产生结果时
+（如 --export none）报错，不写缓存。缓存表和结果索引（quantkit.results）在同一个
+catalog.sqlite 里。
+
+    cache = BacktestCache('../backtest_results')
+    result = cache.backtest(['../config.json'], 'SupertrendFuturesStrategyV8_1', '20250222-20260222')
+    cache.deduplicate(remove=True)      # 删除重复的结果文件（相同 run_id 与回测区间）
+
+命令行（在 user_data/strategies 目录下）：
+    python -m quantkit.backtests --config ../config.json --strategy SupertrendFuturesStrategyV8_1 \\
+        --timerange 20250222-20260222 [其他 freqtrade backtesting 参数]
+
+在本机通过 docker 调用时，--userdir 给容器内路径；配置文件和结果目录须在 user_data 下，
+传给 freqtrade 时自动换成容器内的对应路径：
+    python -m quantkit.backtests --freqtrade 'docker compose run --rm freqtrade-futures' \\
+        --userdir /freqtrade/user_data --config ../config_futures.json --strategy SupertrendFuturesStrategyV8_1 \\
+        --timerange 20250222-20260222
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shlex
+import shutil
+import subprocess
+import time
+
+from .results import ResultCatalog
+
+# 与回测结果无关的配置项
+_SKIP_CONFIG = (
+    'api_server', 'telegram', 'webhook', 'discord', 'db_url', 'bot_name', 'initial_state',
+    'internals', 'force_entry_enable', 'user_data_dir', 'datadir', 'export', 'exportfilename',
+)
+_SKIP_EXCHANGE = ('key', 'secret', 'password', 'uid', 'walletAddress', 'privateKey',
+                  'ccxt_config', 'ccxt_sync_config', 'ccxt_async_config')
+
+_CLASS = re.compile(r'^class\s+(\w+)\s*\(\s*([\w.]+)\s*\)\s*:', re.M)
+_IMPORT = re.compile(r'^\s*(?:from\s+(\w+)\s+import|import\s+(\w+))', re.M)
+# 交易对白名单里出现这些字符时是正则（如 .*/USDT:USDT）
+_REGEX_CHARS = set('.*+?[]()|^$\\')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backtest_cache (
+    key TEXT PRIMARY KEY,
+    result_file TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    created INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_digests (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def _sha1_file(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_config(paths) -> dict:
+    """按顺序合并多个配置文件（后面的覆盖前面的，与 freqtrade 一致）"""
+    config = {}
+    for path in paths:
+        with open(path) as handle:
+            _merge(config, json.load(handle))
+    return config
+
+
+def _merge(base: dict, override: dict) -> None:
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+
+
+def config_subset(config: dict) -> dict:
+    """影响回测结果的配置部分"""
+    subset = {k: v for k, v in config.items() if k not in _SKIP_CONFIG}
+    if isinstance(subset.get('exchange'), dict):
+        subset['exchange'] = {k: v for k, v in subset['exchange'].items() if k not in _SKIP_EXCHANGE}
+    return subset
+
+
+def find_strategy_file(strategy_dir: str, strategy: str) -> str:
+    """按类名找到策略文件"""
+    pattern = re.compile(rf'^class\s+{re.escape(strategy)}\s*\(', re.M)
+    for path in sorted(glob.glob(os.path.join(strategy_dir, '*.py'))):
+        with open(path, encoding='utf-8') as handle:
+            if pattern.search(handle.read()):
+                return path
+    raise ValueError(f"找不到策略 {strategy}（目录 {strategy_dir}）")
+
+
+def _source_files(strategy_dir: str, path: str, found: list) -> None:
+    """path 及其依赖的本地源码：其他文件里定义的父类、从策略目录导入的模块（递归）"""
+    if path in found:
+        return
+    found.append(path)
+    with open(path, encoding='utf-8') as handle:
+        source = handle.read()
+    defined = {match.group(1) for match in _CLASS.finditer(source)}
+    for match in _CLASS.finditer(source):
+        base = match.group(2).split('.')[-1]
+        if base in defined or base == 'IStrategy':
+            continue
+        try:
+            _source_files(strategy_dir, find_strategy_file(strategy_dir, base), found)
+        except ValueError:
+            pass
+    for match in _IMPORT.finditer(source):
+        module = os.path.join(strategy_dir, f'{match.group(1) or match.group(2)}.py')
+        if os.path.exists(module):
+            _source_files(strategy_dir, module, found)
+
+
+def strategy_files(strategy_dir: str, strategy: str) -> list:
+    """影响回测结果的源码文件：策略文件及其本地依赖（父类、导入的模块）、同名参数 JSON、quantkit 共享代码"""
+    path = find_strategy_file(strategy_dir, strategy)
+    files = []
+    _source_files(strategy_dir, path, files)
+    params = os.path.join(os.path.dirname(path), f'{strategy}.json')
+    if os.path.exists(params):
+        files.append(params)
+    files.extend(sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))))
+    return files
+
+
+def static_pairs(config: dict):
+    """静态白名单中的交易对；白名单含正则或使用动态 pairlist 时返回 None（无法确定用到哪些数据）"""
+    pairs = config.get('exchange', {}).get('pair_whitelist', [])
+    methods = [item.get('method') for item in config.get('pairlists', [{'method': 'StaticPairList'}])]
+    if any(method != 'StaticPairList' for method in methods[:1]):
+        return None
+    if any(_REGEX_CHARS & set(pair) for pair in pairs):
+        return None
+    return pairs
+
+
+def data_files(datadir: str, pairs=()) -> list:
+    """K线数据文件；给出交易对时只取这些交易对的文件（文件名形如 DOGE_USDT_USDT-30m-futures.feather）"""
+    prefixes = tuple(pair.replace('/', '_').replace(':', '_') + '-' for pair in pairs)
+    files = []
+    for root, _, names in os.walk(datadir):
+        for name in names:
+            if not prefixes or name.startswith(prefixes):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+class BacktestCache:
+    """
+    按内容哈希缓存回测结果
+
+    results_dir:   回测结果目录（user_data/backtest_results）
+    strategy_dir:  策略目录，默认 quantkit 所在目录
+    command:       调用 freqtrade 的命令（如 'docker compose run --rm freqtrade-futures'）
+    userdir:       传给 freqtrade 的 --userdir，默认为 results_dir 的上级目录；
+                   通过 docker 调用时传容器内路径（如 /freqtrade/user_data），
+                   传给 freqtrade 的配置文件和结果目录随之换成容器内路径（须位于 user_data 下）
+    export_flag:   指定结果目录的 freqtrade 参数（新版本为 --backtest-directory）
+    """
+
+    def __init__(self, results_dir: str, strategy_dir: str = None, command: str = 'freqtrade',
+                 userdir: str = None, export_flag: str = '--export-filename'):
+        self.results_dir = results_dir
+        self.strategy_dir = strategy_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.command = shlex.split(command)
+        self.user_data_dir = os.path.dirname(os.path.abspath(results_dir))
+        self.userdir = userdir or self.user_data_dir
+        self.export_flag = export_flag
+        self.catalog = ResultCatalog(results_dir)
+        self.db = self.catalog.db
+        self.db.executescript(_SCHEMA)
+
+    def digest(self, path: str) -> str:
+        """文件内容摘要（大小和 mtime 未变时直接用缓存）"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        row = self.db.execute('SELECT size, mtime_ns, digest FROM file_digests WHERE path = ?', (key,)).fetchone()
+        if row is not None and (row['size'], row['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return row['digest']
+        digest = _sha1_file(path)
+        self.db.execute('INSERT OR REPLACE INTO file_digests VALUES (?, ?, ?, ?)',
+                        (key, stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def key(self, config: dict, strategy: str, timerange: str, args=(), datadir: str = None) -> str:
+        """缓存键：策略源码 + 配置 + 参数 + 数据内容 + timerange 的哈希"""
+        pairs = static_pairs(config)
+        if datadir is None:
+            datadir = config.get('datadir') or os.path.join(
+                self.user_data_dir, 'data', config.get('exchange', {}).get('name', ''))
+        sources = {os.path.basename(p): self.digest(p) for p in strategy_files(self.strategy_dir, strategy)}
+        data = {os.path.relpath(p, datadir): self.digest(p) for p in data_files(datadir, pairs or ())}
+        payload = {
+            'strategy': strategy, 'sources': sources, 'config': config_subset(config),
+            'args': list(args), 'data': data, 'timerange': timerange,
+        }
+        text = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def lookup(self, key: str):
+        """已缓存的结果文件名（不含扩展名），没有或文件已不存在时返回 None"""
+        row = self.db.execute('SELECT result_file FROM backtest_cache WHERE key = ?', (key,)).fetchone()
+        if row is None or not os.path.exists(os.path.join(self.results_dir, row['result_file'] + '.zip')):
+            return None
+        return row['result_file']
+
+    def store(self, key: str, result_file: str, strategy: str) -> None:
+        self.db.execute('INSERT OR REPLACE INTO backtest_cache VALUES (?, ?, ?, strftime(\'%s\', \'now\'))',
+                        (key, result_file, strategy))
+        self.db.commit()
+
+    def backtest(self, config_files, strategy: str, timerange: str, args=(), datadir: str = None) -> dict:
+        """
+        回测（命中缓存时直接返回已有结果）
+
+        返回 {'result_file': 结果文件名, 'cached': 是否命中, 'key': 缓存键}。
+        """
+        config = load_config(config_files)
+        key = self.key(config, strategy, timerange, args, datadir)
+        self.db.commit()
+        found = self.lookup(key)
+        if found is not None:
+            self._set_last_result(found)
+            return {'result_file': found, 'cached': True, 'key': key}
+
+        # 结果写到本次运行独占的目录：不会误取其他同时进行的回测（或上一次）的结果
+        directory = os.path.join(self.results_dir, '.runs', f'{os.getpid()}-{time.time_ns()}')
+        command, export = self.freqtrade_command(config_files, directory)
+        os.makedirs(directory)
+        command += ['--strategy', strategy, '--timerange', timerange] + export + list(args)
+        try:
+            subprocess.run(command, check=True)
+            result_file = self.collect(directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        if result_file is None:
+            raise RuntimeError(f"回测完成但没有导出结果（--export none？），不写缓存：{' '.join(command)}")
+        self.store(key, result_file, strategy)
+        self._set_last_result(result_file)
+        self.catalog.update()
+        return {'result_file': result_file, 'cached': False, 'key': key}
+
+    def command_path(self, path: str) -> str:
+        """
+        freqtrade 看到的路径：userdir 与本机 user_data 目录不同（docker）时，
+        user_data 下的路径换成 userdir 下的同名路径；不在 user_data 下的路径容器内不可见，报错
+        """
+        if self.userdir == self.user_data_dir:
+            return path
+        relative = os.path.relpath(os.path.abspath(path), self.user_data_dir)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            raise ValueError(f"{path} 不在 {self.user_data_dir} 下，freqtrade（--userdir {self.userdir}）看不到")
+        if relative == os.curdir:
+            return self.userdir
+        return posixpath.join(self.userdir, *relative.split(os.sep))
+
+    def freqtrade_command(self, config_files, directory: str) -> tuple:
+        """backtesting 命令的公共部分：--userdir、--config 和结果目录（路径已换成 freqtrade 看到的）"""
+        command = list(self.command) + ['backtesting', '--userdir', self.userdir]
+        for path in config_files:
+            command += ['--config', self.command_path(path)]
+        return command, [self.export_flag, self.command_path(directory)]
+
+    def collect(self, directory: str):
+        """把 freqtrade 导出到 directory 的结果移到结果目录（重名时加序号），返回结果文件名；没有结果时返回 None"""
+        name = self._last_result(directory)
+        if name is None:
+            return None
+        target, n = name, 1
+        while os.path.exists(os.path.join(self.results_dir, f'{target}.zip')):
+            target = f'{name}-{n}'
+            n += 1
+        for suffix in ('.zip', '.meta.json'):
+            source = os.path.join(directory, name + suffix)
+            if os.path.exists(source):
+                shutil.move(source, os.path.join(self.results_dir, target + suffix))
+        return target
+
+    def _last_result(self, directory: str = None):
+        try:
+            with open(os.path.join(directory or self.results_dir, '.last_result.json')) as handle:
+                name = json.load(handle)['latest_backtest']
+        except (OSError, ValueError, KeyError):
+            return None
+        return name[:-len('.zip')] if name.endswith('.zip') else name[:-len('.json')]
+
+    def _set_last_result(self, result_file: str) -> None:
+        """让 backtesting-show 等命令显示命中的结果"""
+        path = os.path.join(self.results_dir, '.last_result.json')
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as handle:
+            json.dump({'latest_backtest': f'{result_file}.zip'}, handle)
+        os.replace(tmp, path)
+
+    def duplicates(self) -> dict:
+        """{重复的结果文件: 保留的结果文件}：run_id、策略和回测区间都相同的结果只保留最早一份"""
+        self.catalog.update()
+        groups = {}
+        for row in self.db.execute(
+                'SELECT result_file, strategy, run_id, backtest_start_ts, backtest_end_ts FROM runs '
+                'WHERE run_id IS NOT NULL ORDER BY result_file'):
+            group = (row['strategy'], row['run_id'], row['backtest_start_ts'], row['backtest_end_ts'])
+            groups.setdefault(group, []).append(row['result_file'])
+        # 一个结果文件可能含多个策略，只有其中每个策略都重复时才算重复
+        keep_for = {}
+        needed = set()
+        for files in groups.values():
+            needed.add(files[0])
+            for duplicate in files[1:]:
+                keep_for.setdefault(duplicate, files[0])
+        return {f: k for f, k in keep_for.items() if f not in needed}
+
+    def deduplicate(self, remove: bool = False) -> dict:
+        """
+        重复结果；remove=True 时删除重复的 zip / meta 文件并把缓存指向保留的那份
+
+        .last_result.json 指向的结果不删除。
+        """
+        duplicates = self.duplicates()
+        if not remove:
+            return duplicates
+        latest = self._last_result()
+        removed = {}
+        for duplicate, kept in duplicates.items():
+            if duplicate == latest:
+                continue
+            for suffix in ('.zip', '.meta.json'):
+                path = os.path.join(self.results_dir, duplicate + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+            self.db.execute('UPDATE backtest_cache SET result_file = ? WHERE result_file = ?', (kept, duplicate))
+            self.db.execute('DELETE FROM runs WHERE result_file = ?', (duplicate,))
+            self.db.execute('DELETE FROM files WHERE meta_file = ?', (duplicate + '.meta.json',))
+            removed[duplicate] = kept
+        self.db.commit()
+        return removed
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='带内容哈希缓存的 freqtrade 回测')
+    parser.add_argument('--config', action='append', required=True)
+    parser.add_argument('--strategy', required=True)
+    parser.add_argument('--timerange', required=True)
+    parser.add_argument('--results-dir', default='../backtest_results')
+    parser.add_argument('--datadir')
+    parser.add_argument('--freqtrade', default='freqtrade', help="调用 freqtrade 的命令")
+    parser.add_argument('--userdir', help="freqtrade 看到的 user_data 路径（通过 docker 调用时）")
+    parser.add_argument('--export-flag', default='--export-filename')
+    args, extra = parser.parse_known_args(argv)
+
+    cache = BacktestCache(args.results_dir, command=args.freqtrade, userdir=args.userdir,
+                          export_flag=args.export_flag)
+    result = cache.backtest(args.config, args.strategy, args.timerange, extra, args.datadir)
+    state = '命中缓存' if result['cached'] else '新回测'
+    print(f"{state}: {result['result_file']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+批量多参数 Supertrend（Hyperopt 用）
+
+Hyperopt 每个 epoch 都用新的 (atr_period, atr_multiplier) 重算 ATR 和方向递推。
+同一份K线数据上：每个 period 的 ATR 只算一次，每组参数的结果按参数值缓存（按字节数
+上限淘汰）。Hyperopt 每个 epoch 只取一组参数，逐组计算；事先知道要比较的多组参数时
+用 SupertrendBank.compute 一次传入，同一 period 的多个 multiplier 以二维数组
+（multiplier × K线）一次算完方向。DecimalParameter 的取值网格（如 2.0~5.0 三位小数
+约 3000 个）太大，不做整网格预计算。
+
+EMA / SMA / RSI / ADX 同理：PeriodBank 把参数范围内每个整数周期一次算完，
+存成二维数组（周期 × K线，过大时放在临时文件的内存映射里），epoch 只按周期取行。
+"""
+
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+import talib
+
+from .indicators import column
+
+
+def is_hyperopt(dp) -> bool:
+    """是否 Hyperopt 模式"""
+    return dp is not None and dp.runmode.value == 'hyperopt'
+
+
+def supertrend_direction_2d(close: np.ndarray, upperband: np.ndarray, lowerband: np.ndarray,
+                            initial_direction: int = 1) -> np.ndarray:
+    """
+    二维方向递推：upperband / lowerband 形状为 (参数组数, K线数)
+    逻辑与 indicators.supertrend_direction 相同，每行沿 K线方向前向填充
+    """
+    k, n = upperband.shape
+    signal = np.zeros((k, n), dtype=np.int64)
+    if n == 0:
+        return signal
+    signal[:, 0] = initial_direction
+    if n > 1:
+        c = close[None, 1:]
+        signal[:, 1:] = np.where(c > upperband[:, :-1], 1, np.where(c < lowerband[:, :-1], -1, 0))
+    last = np.where(signal != 0, np.arange(n)[None, :], 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    return np.take_along_axis(signal, last, axis=1)
+
+
+# 单个 SupertrendBank 缓存结果的字节数上限
+RESULT_BYTES = 64 * 1024 * 1024
+
+
+class SupertrendBank:
+    """
+    一份K线数据上的多组 (period, multiplier) Supertrend 结果
+
+    max_bytes 限制缓存结果的总字节数（按最近使用淘汰），避免 Hyperopt 长跑内存上涨。
+    每组结果是独立的一维数组，淘汰后即可释放。
+    """
+
+    def __init__(self, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                 initial_direction: int = 1, max_bytes: int = RESULT_BYTES):
+        self.high = high
+        self.low = low
+        self.close = close
+        self.hl2 = (high + low) / 2
+        self.initial_direction = initial_direction
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._atr = {}
+        self._results = OrderedDict()
+
+    def atr(self, period: int) -> np.ndarray:
+        """每个 period 只算一次 ATR"""
+        period = int(period)
+        if period not in self._atr:
+            self._atr[period] = talib.ATR(self.high, self.low, self.close, timeperiod=period)
+            self.nbytes += self._atr[period].nbytes
+        return self._atr[period]
+
+    def compute(self, params) -> None:
+        """批量计算 [(period, multiplier), ...]，同一 period 的 multiplier 合并为一次二维计算"""
+        by_period = {}
+        for period, multiplier in params:
+            key = (int(period), float(multiplier))
+            if key not in self._results:
+                by_period.setdefault(key[0], []).append(key[1])
+
+        for period, multipliers in by_period.items():
+            # 每行一个 multiplier，行内连续，取结果时是零拷贝视图
+            atr = self.atr(period)[None, :]
+            m = np.asarray(sorted(set(multipliers)))[:, None]
+            upperband = self.hl2[None, :] + (m * atr)
+            lowerband = self.hl2[None, :] - (m * atr)
+            direction = supertrend_direction_2d(self.close, upperband, lowerband, self.initial_direction)
+            st = np.where(direction == 1, lowerband, upperband)
+            if st.shape[1] > 0:
+                st[:, 0] = 0.0
+            for j, multiplier in enumerate(m[:, 0]):
+                # 复制成独立数组：淘汰单组结果时不会因为其他行仍引用二维数组而无法释放
+                self._store((period, float(multiplier)), (st[j].copy(), direction[j].copy()))
+
+    def get(self, period: int, multiplier: float):
+        """按参数值查表，返回 (supertrend, direction) 数组"""
+        key = (int(period), float(multiplier))
+        if key not in self._results:
+            self.compute([key])
+        self._results.move_to_end(key)
+        return self._results[key]
+
+    def _store(self, key, value) -> None:
+        old = self._results.pop(key, None)
+        if old is not None:
+            self.nbytes -= sum(a.nbytes for a in old)
+        self._results[key] = value
+        self.nbytes += sum(a.nbytes for a in value)
+        # 至少保留刚算出的一组
+        while self.nbytes > self.max_bytes and len(self._results) > 1:
+            _, evicted = self._results.popitem(last=False)
+            self.nbytes -= sum(a.nbytes for a in evicted)
+
+
+_banks = OrderedDict()
+_MAX_BANKS = 32
+# 所有 SupertrendBank 合计的字节数上限（超过时淘汰最久未用的交易对数据）
+BANK_BYTES = 256 * 1024 * 1024
+
+
+def _data_key(dataframe: DataFrame) -> tuple:
+    """(K线数, 首尾时间)：识别同一份K线数据，只读首尾两个时间，不转换整列"""
+    n = len(dataframe)
+    if n == 0:
+        return (0, 0, 0)
+    ends = np.asarray(dataframe['date'].values[[0, -1]]).astype('datetime64[ns]').view(np.int64)
+    return (n, int(ends[0]), int(ends[1]))
+
+
+def supertrend_bank(dataframe: DataFrame, pair: str, timeframe: str,
+                    initial_direction: int = 1) -> SupertrendBank:
+    """
+    取（或创建）该交易对当前K线数据的 SupertrendBank
+
+    以 (pair, timeframe, K线数, 首尾时间) 识别同一份数据；
+    Hyperopt worker 进程内跨 epoch 复用。
+    """
+    key = (pair, timeframe, initial_direction) + _data_key(dataframe)
+    bank = _banks.get(key)
+    if bank is None:
+        bank = SupertrendBank(column(dataframe, 'high'), column(dataframe, 'low'),
+                              column(dataframe, 'close'), initial_direction)
+        _banks[key] = bank
+        while len(_banks) > _MAX_BANKS:
+            _banks.popitem(last=False)
+    _banks.move_to_end(key)
+    return bank
+
+
+def _trim_banks() -> None:
+    """所有 SupertrendBank 合计超过 BANK_BYTES 时淘汰最久未用的（至少保留当前一个）"""
+    total = sum(bank.nbytes for bank in _banks.values())
+    while total > BANK_BYTES and len(_banks) > 1:
+        _, evicted = _banks.popitem(last=False)
+        total -= evicted.nbytes
+
+
+def supertrend(dataframe: DataFrame, pair: str, timeframe: str,
+               period: int = 14, multiplier: float = 3, initial_direction: int = 1):
+    """与 indicators.supertrend 相同的返回值，结果来自 SupertrendBank"""
+    st, direction = supertrend_bank(dataframe, pair, timeframe, initial_direction).get(period, multiplier)
+    _trim_banks()
+    return pd.Series(st, index=dataframe.index), pd.Series(direction, index=dataframe.index)
+
+
+# 按周期预计算的指标及其输入列
+_PERIOD_FUNCTIONS = {
+    'EMA': ('close',),
+    'SMA': ('close',),
+    'RSI': ('close',),
+    'ADX': ('high', 'low', 'close'),
+}
+
+# 超过这个大小（字节）的指标表放到临时文件的内存映射中
+MEMMAP_BYTES = 256 * 1024 * 1024
+
+
+class PeriodBank:
+    """
+    一个指标在 [low, high] 内所有整数周期上的结果
+
+    values 形状为 (周期数, K线数)，每行一个周期、行内连续。
+    """
+
+    def __init__(self, function: str, inputs, low: int, high: int,
+                 memmap_bytes: int = MEMMAP_BYTES, directory: str = None):
+        if function not in _PERIOD_FUNCTIONS:
+            raise ValueError(f"不支持的指标: {function}")
+        self.function = function
+        self.low = int(low)
+        self.high = int(high)
+        n = len(inputs[0])
+        shape = (self.high - self.low + 1, n)
+        self._file = None
+        if shape[0] * n * 8 > memmap_bytes:
+            # 临时文件关闭（本对象回收）时自动删除
+            self._file = tempfile.TemporaryFile(prefix='quantkit_bank_', dir=directory)
+            self.values = np.memmap(self._file, dtype=np.float64, mode='w+', shape=shape)
+        else:
+            self.values = np.empty(shape, dtype=np.float64)
+        func = getattr(talib, function)
+        for i, period in enumerate(range(self.low, self.high + 1)):
+            self.values[i] = func(*inputs, timeperiod=period)
+
+    def __contains__(self, period: int) -> bool:
+        return self.low <= int(period) <= self.high
+
+    def get(self, period: int) -> np.ndarray:
+        """某个周期的结果（只读视图）"""
+        if period not in self:
+            raise KeyError(f"{self.function} 周期 {period} 不在 [{self.low}, {self.high}] 内")
+        row = self.values[int(period) - self.low]
+        row.flags.writeable = False
+        return row
+
+
+_period_banks = OrderedDict()
+
+
+def period_bank(dataframe: DataFrame, pair: str, timeframe: str, function: str,
+                low: int, high: int) -> PeriodBank:
+    """取（或创建）该交易对当前K线数据上 function 在 [low, high] 的 PeriodBank"""
+    key = (pair, timeframe, function, int(low), int(high)) + _data_key(dataframe)
+    bank = _period_banks.get(key)
+    if bank is None:
+        inputs = [column(dataframe, name) for name in _PERIOD_FUNCTIONS[function]]
+        bank = PeriodBank(function, inputs, low, high)
+        _period_banks[key] = bank
+        while len(_period_banks) > _MAX_BANKS:
+            _period_banks.popitem(last=False)
+    _period_banks.move_to_end(key)
+    return bank
+
+
+def period_indicator(dataframe: DataFrame, pair: str, timeframe: str, function: str,
+                     period: int, low: int, high: int) -> pd.Series:
+    """与 ta.<function>(dataframe, timeperiod=period) 相同的结果，来自 [low, high] 的 PeriodBank"""
+    row = period_bank(dataframe, pair, timeframe, function, low, high).get(period)
+    return pd.Series(np.array(row), index=dataframe.index)
+
+
+class PeriodBanks:
+    """
+    IndicatorRegistry 的 stream 接口（Hyperopt 用）
+
+    ranges: {函数名: (最小周期, 最大周期)}，通常取自 IntParameter 的 low / high；
+    范围内的 timeperiod 从 PeriodBank 取，其余照常由 TA-Lib 计算。
+    """
+
+    def __init__(self, ranges: dict):
+        self.ranges = {name: (int(low), int(high)) for name, (low, high) in ranges.items()}
+
+    def supports(self, function: str, params: dict) -> bool:
+        bounds = self.ranges.get(function)
+        if bounds is None or set(params) != {'timeperiod'}:
+            return False
+        return bounds[0] <= int(params['timeperiod']) <= bounds[1]
+
+    def talib(self, dataframe: DataFrame, pair: str, timeframe: str, function: str,
+              timeperiod: int) -> pd.Series:
+        low, high = self.ranges[function]
+        return period_indicator(dataframe, pair, timeframe, function, timeperiod, low, high)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+分析后 dataframe 的紧凑类型（可选）
+
+分析后的 dataframe 有几十个 float64 指标列，方向/市场环境这类小整数列是 int64，
+布尔辅助列有时是 object。白名单很大时（MultiPairFuturesStrategy）每个交易对都要常驻一份：
+
+    指标列（float64）        -> float32（数值在 float32 范围内时）
+    方向/环境（小整数）      -> int8（float64 列全是 -128..127 的整数且无 NaN 时也转换）
+    布尔辅助列（object/bool）-> bool（每个值 1 字节）
+
+OHLCV 与 date 保持原样，价格比较不受影响。float32 只有约 7 位有效数字，
+指标与阈值非常接近时信号可能翻转，启用前用 signal_mismatch 检查：
+
+    mismatch = qcompact.signal_mismatch(strategy, dataframe, {'pair': 'DOGE/USDT:USDT'}, tolerance=0.001)
+"""
+
+import numpy as np
+from pandas import DataFrame
+
+KEEP_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+SIGNAL_COLUMNS = ('enter_long', 'enter_short', 'exit_long', 'exit_short')
+
+_FLOAT32 = np.finfo(np.float32)
+_INTEGERS = (np.int8, np.int16, np.int32)
+
+
+def compact_values(values: np.ndarray):
+    """单列的紧凑版本，不需要（或不能）转换时返回 None"""
+    kind = values.dtype.kind
+    if kind == 'O':
+        if len(values) and all(isinstance(v, (bool, np.bool_)) for v in values):
+            return values.astype(bool)
+        return None
+    if kind in 'iu':
+        if len(values) == 0:
+            return None
+        low, high = values.min(), values.max()
+        for dtype in _INTEGERS:
+            info = np.iinfo(dtype)
+            if np.dtype(dtype).itemsize < values.dtype.itemsize and info.min <= low and high <= info.max:
+                return values.astype(dtype)
+        return None
+    if kind != 'f' or values.dtype.itemsize <= 4:
+        return None
+    finite = values[np.isfinite(values)]
+    if len(finite) == len(values) and len(values) and np.array_equal(finite, np.round(finite)):
+        info = np.iinfo(np.int8)
+        if info.min <= finite.min() and finite.max() <= info.max:
+            return values.astype(np.int8)
+    if len(finite):
+        magnitude = np.abs(finite)
+        nonzero = magnitude[magnitude > 0]
+        if magnitude.max() > _FLOAT32.max or (len(nonzero) and nonzero.min() < _FLOAT32.tiny):
+            return None
+    return values.astype(np.float32)
+
+
+def compact_frame(dataframe: DataFrame, keep=KEEP_COLUMNS) -> DataFrame:
+    """返回紧凑类型的新 dataframe（keep 中的列原样保留，列顺序不变）"""
+    columns = {}
+    for name in dataframe.columns:
+        values = dataframe[name].to_numpy()
+        converted = None if name in keep else compact_values(values)
+        columns[name] = dataframe[name] if converted is None else converted
+    return DataFrame(columns, index=dataframe.index)
+
+
+def signal_mismatch(strategy, dataframe: DataFrame, metadata: dict, tolerance: float = 0.0,
+                    attribute: str = 'compact_dataframe', columns=SIGNAL_COLUMNS) -> dict:
+    """
+    float64 与紧凑模式下的信号差异（等价性检查）
+
+    在 dataframe 的副本上分别以 attribute=False / True 跑完整的指标、入场、出场，
+    返回 {信号列: 不一致K线比例}；任一列超过 tolerance 时抛出 ValueError。
+    """
+    frames = {}
+    had_attribute = attribute in vars(strategy)
+    previous = getattr(strategy, attribute, None)
+    try:
+        for flag in (False, True):
+            setattr(strategy, attribute, flag)
+            frame = strategy.populate_indicators(dataframe.copy(), dict(metadata))
+            frame = strategy.populate_entry_trend(frame, dict(metadata))
+            frames[flag] = strategy.populate_exit_trend(frame, dict(metadata))
+    finally:
+        if had_attribute:
+            setattr(strategy, attribute, previous)
+        else:
+            delattr(strategy, attribute)
+
+    n = max(len(dataframe), 1)
+    mismatch = {}
+    for name in columns:
+        if name not in frames[False] and name not in frames[True]:
+            continue
+        expected = frames[False].get(name)
+        actual = frames[True].get(name)
+        if expected is None or actual is None:
+            mismatch[name] = 1.0
+            continue
+        differs = expected.fillna(0).to_numpy(dtype=np.float64) != actual.fillna(0).to_numpy(dtype=np.float64)
+        mismatch[name] = float(differs.sum()) / n
+    worse = {name: ratio for name, ratio in mismatch.items() if ratio > tolerance}
+    if worse:
+        details = ', '.join(f'{name} {ratio:.4%}' for name, ratio in worse.items())
+        raise ValueError(f"{type(strategy).__name__} 紧凑模式信号与 float64 不一致（容差 {tolerance:.4%}）：{details}")
+    return mismatch
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+信号条件表达式
+
+策略里的入场条件通常写成布尔 Series 列表再 reduce(&)，每个条件都整列计算一次、
+分配一个整列临时 Series。这里把条件写成惰性表达式：
+
+    c = qc.col
+    conditions = qc.ConditionSet([
+        c('st_dir') == 1,
+        c('ema_fast') > c('ema_slow'),
+        (c('rsi') > 35) & (c('rsi') < 80),
+        c('volume') > c('volume_ma') * 1.1,
+        c('is_uptrend'),
+    ])
+    mask = conditions.evaluate(dataframe)
+
+求值时直接读底层 NumPy 数组，按顺序逐个条件过滤：后面的条件只在前面都满足的K线上计算
+（短路），不生成中间 Series。conditions.pass_counts 记录每个条件之后仍满足的K线数。
+"""
+
+import operator
+
+import numpy as np
+from pandas import DataFrame
+
+
+class _Context:
+    """一次求值的列数组缓存（同一列只从 dataframe 取一次）"""
+
+    __slots__ = ('dataframe', 'arrays', 'n')
+
+    def __init__(self, dataframe: DataFrame):
+        self.dataframe = dataframe
+        self.arrays = {}
+        self.n = len(dataframe)
+
+    def array(self, name: str) -> np.ndarray:
+        values = self.arrays.get(name)
+        if values is None:
+            values = self.dataframe[name].to_numpy()
+            if values.dtype == object:
+                values = values.astype(np.float64)
+            self.arrays[name] = values
+        return values
+
+
+def _wrap(value):
+    return value if isinstance(value, Expr) else Const(value)
+
+
+class Expr:
+    """表达式基类：eval(ctx, rows) 返回 rows 指定K线上的值（rows 为 None 表示全部）"""
+
+    __slots__ = ()
+    __hash__ = None
+
+    def eval(self, ctx: _Context, rows):
+        raise NotImplementedError
+
+    def _binary(self, op, other, reflected=False):
+        other = _wrap(other)
+        return BinOp(op, other, self) if reflected else BinOp(op, self, other)
+
+    def __gt__(self, other): return self._binary(operator.gt, other)
+    def __ge__(self, other): return self._binary(operator.ge, other)
+    def __lt__(self, other): return self._binary(operator.lt, other)
+    def __le__(self, other): return self._binary(operator.le, other)
+    def __eq__(self, other): return self._binary(operator.eq, other)
+    def __ne__(self, other): return self._binary(operator.ne, other)
+    def __and__(self, other): return And(self, _wrap(other))
+    def __or__(self, other): return self._binary(np.logical_or, other)
+    def __invert__(self): return Unary(np.logical_not, self)
+    def __add__(self, other): return self._binary(operator.add, other)
+    def __radd__(self, other): return self._binary(operator.add, other, True)
+    def __sub__(self, other): return self._binary(operator.sub, other)
+    def __rsub__(self, other): return self._binary(operator.sub, other, True)
+    def __mul__(self, other): return self._binary(operator.mul, other)
+    def __rmul__(self, other): return self._binary(operator.mul, other, True)
+    def __truediv__(self, other): return self._binary(operator.truediv, other)
+    def __rtruediv__(self, other): return self._binary(operator.truediv, other, True)
+    def __neg__(self): return Unary(operator.neg, self)
+    def __abs__(self): return Unary(np.abs, self)
+
+
+class Const(Expr):
+    """常量（阈值、参数值）"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def eval(self, ctx, rows):
+        return self.value
+
+    def __repr__(self):
+        return repr(self.value)
+
+
+class Col(Expr):
+    """dataframe 列，shift(n) 与 Series.shift 相同（前 n 根为 NaN）"""
+
+    __slots__ = ('name', 'periods')
+
+    def __init__(self, name: str, periods: int = 0):
+        self.name = name
+        self.periods = periods
+
+    def shift(self, periods: int = 1) -> 'Col':
+        return Col(self.name, self.periods + periods)
+
+    def eval(self, ctx, rows):
+        values = ctx.array(self.name)
+        p = self.periods
+        if p == 0:
+            return values if rows is None else values[rows]
+        if rows is None:
+            rows = np.arange(ctx.n)
+        src = rows - p
+        inside = (src >= 0) & (src < ctx.n)
+        out = np.full(len(rows), np.nan)
+        out[inside] = values[src[inside]]
+        return out
+
+    def __repr__(self):
+        return f"col({self.name!r})" + (f".shift({self.periods})" if self.periods else '')
+
+
+class BinOp(Expr):
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left: Expr, right: Expr):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def eval(self, ctx, rows):
+        return self.op(self.left.eval(ctx, rows), self.right.eval(ctx, rows))
+
+    def __repr__(self):
+        return f"({self.left!r} {getattr(self.op, '__name__', self.op)} {self.right!r})"
+
+
+class Unary(Expr):
+    __slots__ = ('op', 'operand')
+
+    def __init__(self, op, operand: Expr):
+        self.op = op
+        self.operand = operand
+
+    def eval(self, ctx, rows):
+        return self.op(self.operand.eval(ctx, rows))
+
+    def __repr__(self):
+        return f"{getattr(self.op, '__name__', self.op)}({self.operand!r})"
+
+
+class And(Expr):
+    """a & b：右侧只在左侧满足的K线上求值"""
+
+    __slots__ = ('left', 'right')
+
+    def __init__(self, left: Expr, right: Expr):
+        self.left = left
+        self.right = right
+
+    def eval(self, ctx, rows):
+        mask = _as_bool(self.left.eval(ctx, rows))
+        if mask.ndim == 0:
+            return _as_bool(self.right.eval(ctx, rows)) if mask else mask
+        sub = np.flatnonzero(mask)
+        if rows is not None:
+            sub_rows = rows[sub]
+        else:
+            sub_rows = sub
+        mask[sub] = _as_bool(self.right.eval(ctx, sub_rows))
+        return mask
+
+    def __repr__(self):
+        return f"({self.left!r} & {self.right!r})"
+
+
+class Mask(Expr):
+    """已经算好的布尔 Series / 数组（兼容旧写法）"""
+
+    __slots__ = ('values',)
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=bool)
+
+    def eval(self, ctx, rows):
+        return self.values if rows is None else self.values[rows]
+
+
+def _as_bool(values) -> np.ndarray:
+    """条件结果转布尔：数值列非 0 且非 NaN 为 True（与 pandas 布尔列用法一致）"""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values.copy()
+    return (values != 0) & ~np.isnan(values.astype(np.float64, copy=False))
+
+
+def col(name: str) -> Col:
+    """引用 dataframe 列"""
+    return Col(name)
+
+
+class ConditionSet:
+    """
+    条件列表（按 & 合并）
+
+    evaluate() 逐个条件短路求值，返回布尔数组；
+    pass_counts 为每个条件之后仍满足的K线数（漏斗统计，便于查看哪个条件过滤最多）。
+    """
+
+    def __init__(self, conditions, labels=None):
+        self.conditions = [c if isinstance(c, Expr) else Mask(c) for c in conditions]
+        self.labels = list(labels) if labels is not None else [repr(c) for c in self.conditions]
+        self.pass_counts = [0] * len(self.conditions)
+
+    def evaluate(self, dataframe: DataFrame) -> np.ndarray:
+        """返回所有条件都满足的K线（布尔数组，长度与 dataframe 相同）"""
+        ctx = _Context(dataframe)
+        n = ctx.n
+        if not self.conditions:
+            return np.zeros(n, dtype=bool)
+        rows = None
+        for i, condition in enumerate(self.conditions):
+            passed = _as_bool(condition.eval(ctx, rows))
+            if passed.ndim == 0:
+                passed = np.full(n if rows is None else len(rows), bool(passed))
+            rows = np.flatnonzero(passed) if rows is None else rows[passed]
+            self.pass_counts[i] = len(rows)
+            if len(rows) == 0:
+                for j in range(i + 1, len(self.conditions)):
+                    self.pass_counts[j] = 0
+                break
+        mask = np.zeros(n, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def report(self) -> str:
+        """每个条件之后剩余的K线数"""
+        return '\n'.join(f'{count:>8}  {label}' for label, count in zip(self.labels, self.pass_counts))
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Alpha 因子内核（WorldQuant 风格）
+
+- ts_rank:     滚动百分位排名（与 pandas rolling(w).rank(pct=True) 一致）
+- correlation: 滚动 Pearson 相关系数（与 pandas rolling(w).corr 一致）
+
+每个因子都有批量版（回测/Hyperopt，一次向量化算完）和增量版（实盘，
+有序窗口 / 滑动协矩，每根新K线 O(log w) / O(1)）。
+FactorStream 按 (pair, timeframe, 因子, 参数) 保存增量状态，新K线只推进新增部分。
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+import math
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .indicators import column, rolling_sum
+from .streaming import KernelStream
+
+# 方差小于 (Σx² · _VAR_EPS) 视为常数窗口，相关系数为 NaN（与 pandas 相同）
+_VAR_EPS = 1e-12
+
+
+def rolling_rank(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    滚动百分位排名（批量版）
+
+    当前值在最近 window 个值中的排名 / window，相同值取平均排名；
+    窗口内有 NaN 或不足 window 根时为 NaN。
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    if window < 1 or n < window:
+        return out
+    win = sliding_window_view(x, window)
+    last = win[:, -1:]
+    less = (win < last).sum(axis=1)
+    equal = (win == last).sum(axis=1)
+    rank = (less + (equal + 1) / 2) / window
+    rank[np.isnan(win).any(axis=1)] = np.nan
+    out[window - 1:] = rank
+    return out
+
+
+def rolling_corr(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """
+    滚动 Pearson 相关系数（批量版，滑动和计算协矩）
+
+    任一窗口方差为 0 或窗口内有 NaN 时为 NaN。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = x.shape[0]
+    if window < 2 or n < window:
+        return np.full(n, np.nan)
+    # 减去基准值，避免价格/成交量水平远大于窗口内波动时丢失精度
+    x = x - _base(x)
+    y = y - _base(y)
+    w = float(window)
+    sx = rolling_sum(x, window)
+    sy = rolling_sum(y, window)
+    sxx = rolling_sum(x * x, window)
+    syy = rolling_sum(y * y, window)
+    sxy = rolling_sum(x * y, window)
+    cov = sxy - sx * sy / w
+    var_x = sxx - sx * sx / w
+    var_y = syy - sy * sy / w
+    valid = (var_x > sxx * _VAR_EPS) & (var_y > syy * _VAR_EPS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.where(valid, cov / np.sqrt(var_x * var_y), np.nan)
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _base(values: np.ndarray) -> float:
+    finite = values[np.isfinite(values)]
+    return float(finite[0]) if finite.shape[0] else 0.0
+
+
+class RollingRank:
+    """
+    滚动百分位排名（增量版）
+
+    维护窗口的有序列表（order statistics），每次 update 二分查找排名。
+    """
+
+    __slots__ = ('window', 'values', 'ordered', 'nans')
+
+    ready = True
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.ordered = []
+        self.nans = 0
+
+    def seed(self, values: np.ndarray) -> np.ndarray:
+        """批量计算历史，并用最近 window 个值初始化窗口"""
+        for value in values[-self.window:]:
+            self.update(value)
+        return rolling_rank(values, self.window)
+
+    def update(self, value: float) -> float:
+        """加入新值，返回它在当前窗口中的百分位排名"""
+        value = float(value)
+        self.values.append(value)
+        if math.isnan(value):
+            self.nans += 1
+        else:
+            insort(self.ordered, value)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if math.isnan(old):
+                self.nans -= 1
+            else:
+                del self.ordered[bisect_left(self.ordered, old)]
+        if len(self.values) < self.window or self.nans:
+            return np.nan
+        less = bisect_left(self.ordered, value)
+        equal = bisect_right(self.ordered, value) - less
+        return (less + (equal + 1) / 2) / self.window
+
+
+class RollingCorr:
+    """
+    滚动 Pearson 相关系数（增量版）
+
+    维护窗口内 Σx, Σy, Σx², Σy², Σxy（以首个值为基准），每次 update O(1)；
+    每 refresh 次从窗口重算一次，避免长时间运行累积舍入误差。
+    """
+
+    __slots__ = ('window', 'refresh', 'pairs', 'base_x', 'base_y', 'sums', 'nans', 'count')
+
+    ready = True
+
+    def __init__(self, window: int, refresh: int = 1000):
+        self.window = window
+        self.refresh = refresh
+        self.pairs = deque()
+        self.base_x = None
+        self.base_y = None
+        self.sums = [0.0] * 5
+        self.nans = 0
+        self.count = 0
+
+    def seed(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """批量计算历史，并用最近 window 对值初始化窗口"""
+        for a, b in zip(x[-self.window:], y[-self.window:]):
+            self.update(a, b)
+        return rolling_corr(x, y, self.window)
+
+    def update(self, x: float, y: float) -> float:
+        """加入新的一对值，返回当前窗口的相关系数"""
+        x, y = float(x), float(y)
+        if self.base_x is None and not (math.isnan(x) or math.isnan(y)):
+            self.base_x, self.base_y = x, y
+        self._push(x, y, 1.0)
+        if len(self.pairs) > self.window:
+            self._push(*self.pairs.popleft(), -1.0, append=False)
+        self.count += 1
+        if self.count % self.refresh == 0:
+            self._recompute()
+        if len(self.pairs) < self.window or self.nans:
+            return np.nan
+
+        w = float(self.window)
+        sx, sy, sxx, syy, sxy = self.sums
+        cov = sxy - sx * sy / w
+        var_x = sxx - sx * sx / w
+        var_y = syy - sy * sy / w
+        if var_x <= sxx * _VAR_EPS or var_y <= syy * _VAR_EPS:
+            return np.nan
+        return min(1.0, max(-1.0, cov / math.sqrt(var_x * var_y)))
+
+    def _push(self, x: float, y: float, sign: float, append: bool = True) -> None:
+        if append:
+            self.pairs.append((x, y))
+        if math.isnan(x) or math.isnan(y):
+            self.nans += int(sign)
+            return
+        dx, dy = x - self.base_x, y - self.base_y
+        s = self.sums
+        s[0] += sign * dx
+        s[1] += sign * dy
+        s[2] += sign * dx * dx
+        s[3] += sign * dy * dy
+        s[4] += sign * dx * dy
+
+    def _recompute(self) -> None:
+        pairs = list(self.pairs)
+        self.pairs.clear()
+        self.sums = [0.0] * 5
+        self.nans = 0
+        for x, y in pairs:
+            self._push(x, y, 1.0)
+
+
+def ts_rank(dataframe: DataFrame, name: str, window: int) -> pd.Series:
+    """Ts_Rank(列, window)，批量版"""
+    return pd.Series(rolling_rank(column(dataframe, name), window), index=dataframe.index)
+
+
+def correlation(dataframe: DataFrame, x: str, y: str, window: int) -> pd.Series:
+    """correlation(列x, 列y, window)，批量版"""
+    return pd.Series(rolling_corr(column(dataframe, x), column(dataframe, y), window),
+                     index=dataframe.index)
+
+
+class FactorStream(KernelStream):
+    """
+    因子增量引擎（实盘/模拟盘）
+
+    按 (pair, timeframe, 因子, 参数) 保存状态；新K线只把新增的几根喂给增量内核，
+    缺K线或首次调用时批量计算并重新播种内核。
+    """
+
+    def ts_rank(self, dataframe: DataFrame, pair: str, timeframe: str,
+                name: str, window: int) -> pd.Series:
+        """增量版 Ts_Rank，结果与 factors.ts_rank 相同"""
+        window = int(window)
+        key = (pair, timeframe, 'ts_rank', name, window)
+        values, = self._update(key, dataframe, (name,), lambda: RollingRank(window))
+        return pd.Series(values, index=dataframe.index)
+
+    def correlation(self, dataframe: DataFrame, pair: str, timeframe: str,
+                    x: str, y: str, window: int) -> pd.Series:
+        """增量版 correlation，结果与 factors.correlation 相同"""
+        window = int(window)
+        key = (pair, timeframe, 'correlation', x, y, window)
+        values, = self._update(key, dataframe, (x, y), lambda: RollingCorr(window))
+        return pd.Series(values, index=dataframe.index)
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+磁盘指标特征库（回测 / Hyperopt 用）
+
+同一段 DOGE/XRP/ETH 历史被几百次回测、每个 Hyperopt worker 反复计算 ATR/EMA/ADX/RSI。
+这里把算好的指标列存到磁盘，按 (pair, timeframe, 指标, 参数, 起始K线) 分目录，
+每列一个定宽二进制文件（float64），读取时用 np.memmap 零拷贝映射：
+
+    user_data/feature_store/DOGE_USDT_USDT/30m/ADX-<参数哈希>-<起始时间>/
+        meta.json        名称、参数、行数、列名
+        dates.i8         K线时间（int64 纳秒）
+        fingerprint.u8   每根K线 OHLCV 的指纹，用于校验数据内容是否一致
+        <列名>.f64       指标值
+
+meta.json 里记有全部K线指纹的摘要（数据内容哈希），行数与摘要都相同时直接命中，
+不必逐行比较；新K线到来时只在文件尾部写入新行（不截断）；数据内容不一致（K线被修正、
+数据重新下载）时写一组新文件（文件名带代数，如 ADX.2.f64），再原子替换 meta.json 切换过去，
+旧文件随后删除——其他进程已映射的旧文件在解除映射前仍然有效，不会因截断收到 SIGBUS。
+递推类指标（EMA/ADX）与起始K线有关，因此起始时间是键的一部分，只复用同一起点的结果。
+实盘的滑动窗口每根新K线起点都会后移、每次都落到新目录，命中不了也不该用它（实盘走增量计算）；
+同一指标+参数只保留最近 max_starts 个起点的目录，更旧的在写入新起点时删除，避免目录无限增长。
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import talib.abstract as ta
+from pandas import DataFrame
+
+from .indicators import dates_ns
+
+_OHLCV = ('open', 'high', 'low', 'close', 'volume')
+_ROTATE = (0, 13, 26, 39, 52)
+
+
+def fingerprint(dataframe: DataFrame) -> np.ndarray:
+    """每根K线 OHLCV 的 64 位指纹（按位旋转后异或，向量化）"""
+    result = np.zeros(len(dataframe), dtype=np.uint64)
+    for name, shift in zip(_OHLCV, _ROTATE):
+        bits = np.ascontiguousarray(dataframe[name].to_numpy(dtype=np.float64)).view(np.uint64)
+        if shift:
+            bits = (bits << np.uint64(shift)) | (bits >> np.uint64(64 - shift))
+        result ^= bits
+    return result
+
+
+def _digest(prints: np.ndarray) -> str:
+    return hashlib.sha1(np.ascontiguousarray(prints).tobytes()).hexdigest()
+
+
+class _Data:
+    """一个 dataframe 的 K线时间、指纹和摘要（同一 dataframe 上的多个指标共用）"""
+
+    __slots__ = ('dates', 'prints', 'digest')
+
+    def __init__(self, dataframe: DataFrame):
+        self.dates = dates_ns(dataframe)
+        self.prints = fingerprint(dataframe)
+        self.digest = _digest(self.prints)
+
+
+def _safe(name: str) -> str:
+    return ''.join(c if c.isalnum() or c in '-.' else '_' for c in name)
+
+
+def _params_hash(params: dict) -> str:
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+@contextmanager
+def _locked(directory: str):
+    """目录级写锁（多个 Hyperopt worker / 机器人进程同时写同一条目）"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'w') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _generation_file(filename: str, generation: int) -> str:
+    """第 generation 代的文件名（第 0 代不带代数，兼容旧条目）"""
+    if not generation:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{generation}{ext}'
+
+
+class _Entry:
+    """一个条目的元数据与内存映射（只读）"""
+
+    __slots__ = ('path', 'length', 'columns', 'digest', 'generation')
+
+    def __init__(self, path: str, meta: dict):
+        self.path = path
+        self.length = int(meta['length'])
+        self.columns = tuple(meta['columns'])
+        self.digest = meta.get('digest')
+        self.generation = int(meta.get('generation', 0))
+
+    def files(self) -> list:
+        return [_generation_file(f, self.generation)
+                for f in ('dates.i8', 'fingerprint.u8') + tuple(_safe(c) + '.f64' for c in self.columns)]
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._map('dates.i8', np.int64)
+
+    @property
+    def fingerprint(self) -> np.ndarray:
+        return self._map('fingerprint.u8', np.uint64)
+
+    def matches(self, data: _Data) -> bool:
+        """条目的前 len(data) 行是否就是这份数据"""
+        n = len(data.dates)
+        if self.length == n and self.digest is not None:
+            return self.digest == data.digest
+        return (self.length >= n and np.array_equal(self.dates[:n], data.dates)
+                and np.array_equal(self.fingerprint[:n], data.prints))
+
+    def _map(self, filename: str, dtype) -> np.ndarray:
+        if self.length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, _generation_file(filename, self.generation)),
+                         dtype=dtype, mode='r', shape=(self.length,))
+
+    def column(self, name: str) -> np.ndarray:
+        return self._map(_safe(name) + '.f64', np.float64)
+
+
+class FeatureStore:
+    """
+    磁盘指标特征库
+
+    root: 存储目录（通常为 user_data/feature_store）
+    max_starts: 同一 (pair, timeframe, 指标, 参数) 最多保留几个起点的条目
+    """
+
+    def __init__(self, root: str, max_starts: int = 8):
+        self.root = root
+        self.max_starts = max_starts
+        self._data = None
+
+    def _data_of(self, dataframe: DataFrame) -> _Data:
+        """同一个 dataframe 上连续读写多个指标时，时间/指纹/摘要只算一次"""
+        cached = self._data
+        if cached is None or cached[0]() is not dataframe or cached[1] != len(dataframe):
+            cached = self._data = (weakref.ref(dataframe), len(dataframe), _Data(dataframe))
+        return cached[2]
+
+    @classmethod
+    def from_config(cls, config: dict, name: str = 'feature_store', **kwargs) -> 'FeatureStore':
+        """按 freqtrade 配置的 user_data_dir 定位存储目录"""
+        return cls(os.path.join(str(config.get('user_data_dir', 'user_data')), name), **kwargs)
+
+    def _path(self, pair: str, timeframe: str, name: str, params: dict, start: int) -> str:
+        return os.path.join(self.root, _safe(pair), _safe(timeframe),
+                            f'{_safe(name)}-{_params_hash(params)}-{start}')
+
+    def _open(self, path: str):
+        try:
+            with open(os.path.join(path, 'meta.json')) as handle:
+                return _Entry(path, json.load(handle))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, dataframe: DataFrame, pair: str, timeframe: str, name: str, params: dict):
+        """
+        读取与 dataframe 逐行对齐的指标列 {列名: 只读 memmap}，未命中返回 None
+
+        要求存储的条目从同一根K线开始、至少覆盖 dataframe 的全部K线且 OHLCV 指纹一致。
+        """
+        if len(dataframe) == 0:
+            return None
+        data = self._data_of(dataframe)
+        try:
+            entry = self._open(self._path(pair, timeframe, name, params, int(data.dates[0])))
+            if entry is None or not entry.matches(data):
+                return None
+            n = len(data.dates)
+            return {column: entry.column(column)[:n] for column in entry.columns}
+        except (OSError, ValueError):
+            # 其他进程正在重写该条目
+            return None
+
+    def put(self, dataframe: DataFrame, pair: str, timeframe: str, name: str, params: dict,
+            values: dict) -> None:
+        """
+        写入指标列 {列名: 数组}（长度与 dataframe 相同）
+
+        已有条目是 dataframe 的前缀时只在原文件尾部写入新行，否则写新一代文件后切换。
+        """
+        if len(dataframe) == 0:
+            return
+        data = self._data_of(dataframe)
+        dates, prints = data.dates, data.prints
+        path = self._path(pair, timeframe, name, params, int(dates[0]))
+        columns = tuple(values)
+        created = not os.path.isdir(path)
+        with _locked(path):
+            entry = self._open(path)
+            start = 0
+            if entry is not None and entry.columns == columns and entry.length <= len(dates):
+                m = entry.length
+                if np.array_equal(entry.dates, dates[:m]) and np.array_equal(entry.fingerprint, prints[:m]):
+                    start = m
+            if start == len(dates):
+                return
+            # 追加写在当前一代文件的 start 行处；重写用新一代文件，读者映射的旧文件保持不变
+            generation = entry.generation if start else (entry.generation + 1 if entry is not None else 0)
+            self._write(path, _generation_file('dates.i8', generation), dates[start:], np.int64, start)
+            self._write(path, _generation_file('fingerprint.u8', generation), prints[start:], np.uint64, start)
+            for column, array in values.items():
+                self._write(path, _generation_file(_safe(column) + '.f64', generation),
+                            np.asarray(array)[start:], np.float64, start)
+            meta = {'name': name, 'params': params, 'pair': pair, 'timeframe': timeframe,
+                    'length': len(dates), 'digest': data.digest, 'columns': list(columns),
+                    'generation': generation}
+            tmp = os.path.join(path, 'meta.json.tmp')
+            with open(tmp, 'w') as handle:
+                json.dump(meta, handle, default=str)
+            os.replace(tmp, os.path.join(path, 'meta.json'))
+            if entry is not None and entry.generation != generation:
+                # 旧一代文件只解除目录项；已映射的进程在解除映射前仍可读取
+                for filename in entry.files():
+                    try:
+                        os.remove(os.path.join(path, filename))
+                    except OSError:
+                        pass
+        if created:
+            self.prune(pair, timeframe, name, params)
+
+    def prune(self, pair: str, timeframe: str, name: str, params: dict) -> None:
+        """同一指标+参数只保留最近写入的 max_starts 个起点目录（按 meta.json 修改时间）"""
+        parent = os.path.join(self.root, _safe(pair), _safe(timeframe))
+        prefix = f'{_safe(name)}-{_params_hash(params)}-'
+        try:
+            names = [n for n in os.listdir(parent) if n.startswith(prefix) and n[len(prefix):].lstrip('-').isdigit()]
+        except OSError:
+            return
+
+        def mtime(n):
+            try:
+                return os.path.getmtime(os.path.join(parent, n, 'meta.json'))
+            except OSError:
+                return 0.0
+
+        names.sort(key=mtime, reverse=True)
+        for stale in names[self.max_starts:]:
+            shutil.rmtree(os.path.join(parent, stale), ignore_errors=True)
+
+    @staticmethod
+    def _write(path: str, filename: str, array: np.ndarray, dtype, start: int) -> None:
+        """从第 start 行起写入（不截断文件；start 为 0 时文件应是新一代、尚未被映射）"""
+        filename = os.path.join(path, filename)
+        with open(filename, 'r+b' if start and os.path.exists(filename) else 'wb') as handle:
+            handle.seek(start * np.dtype(dtype).itemsize)
+            np.ascontiguousarray(array, dtype=dtype).tofile(handle)
+
+    def cached(self, dataframe: DataFrame, pair: str, timeframe: str, name: str, func, **params) -> dict:
+        """先查库，未命中时 func(dataframe, **params) -> {列名: 数组} 计算并写入"""
+        found = self.get(dataframe, pair, timeframe, name, params)
+        if found is not None:
+            return found
+        values = {column: np.asarray(array, dtype=np.float64) for column, array in func(dataframe, **params).items()}
+        self.put(dataframe, pair, timeframe, name, params, values)
+        return values
+
+    # IndicatorRegistry 的 stream 接口：所有 TA-Lib 函数都先查库
+
+    @staticmethod
+    def supports(function: str, params: dict) -> bool:
+        return hasattr(ta, function)
+
+    def talib(self, dataframe: DataFrame, pair: str, timeframe: str, function: str, **params):
+        """与 talib.abstract.<function>(dataframe, **params) 返回值相同，结果来自特征库"""
+        def compute(df, **kw):
+            result = getattr(ta, function)(df, **kw)
+            if isinstance(result, DataFrame):
+                return {column: result[column].to_numpy() for column in result.columns}
+            return {function: np.asarray(result)}
+
+        values = self.cached(dataframe, pair, timeframe, function, compute, **params)
+        # 复制一份再交给 dataframe：memmap 只读，且不应让 dataframe 持有存储文件的映射
+        if len(values) == 1 and function in values:
+            return pd.Series(np.array(values[function]), index=dataframe.index)
+        return DataFrame({column: np.array(array) for column, array in values.items()}, index=dataframe.index)
+
+    def clear(self, pair: str = None) -> None:
+        """删除存储（可只删某个交易对）"""
+        path = self.root if pair is None else os.path.join(self.root, _safe(pair))
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+增量 TA 指标（EMA / RSI / ATR / ADX+DI / BBANDS）
+
+实盘/模拟盘每根新K线都对整个窗口重新调用 talib。这里每个指标是一个状态机：
+首次用 TA-Lib 全量计算历史（输出与 TA-Lib 完全一致），同时按 TA-Lib 的递推方式
+记下内部状态（Wilder 平滑值、EMA 前值、滑动和），之后每根新K线 O(1) 推进。
+预热完成后的增量结果与 TA-Lib 全量结果一致（仅有浮点舍入差异，相对误差约 1e-12）。
+
+TAStream 按 (pair, timeframe, 指标, 参数) 管理状态，接口与 talib.abstract 相同：
+    ta_stream.talib(dataframe, pair, timeframe, 'ADX', timeperiod=14)
+"""
+
+from collections import deque
+import math
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+import talib
+
+from .streaming import KernelStream
+
+# TA-Lib 的 TA_IS_ZERO 阈值
+_ZERO = 1e-14
+
+
+def _is_zero(value: float) -> bool:
+    return -_ZERO < value < _ZERO
+
+
+def _true_range(high: float, low: float, prev_close: float) -> float:
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class EMAKernel:
+    """EMA（首值为前 period 根的 SMA，与 TA-Lib 默认兼容模式一致）"""
+
+    __slots__ = ('period', 'k', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.value = np.nan
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    def seed(self, values: np.ndarray) -> np.ndarray:
+        out = talib.EMA(values, timeperiod=self.period)
+        self.value = float(out[-1]) if len(out) else np.nan
+        return out
+
+    def update(self, value: float) -> float:
+        self.value = (value - self.value) * self.k + self.value
+        return self.value
+
+
+class RSIKernel:
+    """RSI（Wilder 平滑的平均涨幅/跌幅）"""
+
+    __slots__ = ('period', 'gain', 'loss', 'prev')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.gain = np.nan
+        self.loss = np.nan
+        self.prev = np.nan
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.gain)
+
+    def seed(self, values: np.ndarray) -> np.ndarray:
+        out = talib.RSI(values, timeperiod=self.period)
+        p = self.period
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) == 0 or len(values) - valid[0] <= p:
+            return out
+        x = values[valid[0]:]
+        diff = np.diff(x)
+        # 与 TA-Lib 相同：前 period 个差值取简单平均，之后逐根 Wilder 平滑
+        gain = float(np.sum(diff[:p][diff[:p] > 0]))
+        loss = float(-np.sum(diff[:p][diff[:p] < 0]))
+        gain /= p
+        loss /= p
+        for d in diff[p:].tolist():
+            gain *= p - 1
+            loss *= p - 1
+            if d < 0:
+                loss -= d
+            else:
+                gain += d
+            gain /= p
+            loss /= p
+        self.gain, self.loss, self.prev = gain, loss, float(x[-1])
+        return out
+
+    def update(self, value: float) -> float:
+        p = self.period
+        d = value - self.prev
+        self.prev = value
+        self.gain *= p - 1
+        self.loss *= p - 1
+        if d < 0:
+            self.loss -= d
+        else:
+            self.gain += d
+        self.gain /= p
+        self.loss /= p
+        total = self.gain + self.loss
+        return 100.0 * (self.gain / total) if not _is_zero(total) else 0.0
+
+
+class ATRKernel:
+    """ATR（Wilder 平滑的真实波幅）"""
+
+    __slots__ = ('period', 'value', 'close')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.value = np.nan
+        self.close = np.nan
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    def seed(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        out = talib.ATR(high, low, close, timeperiod=self.period)
+        if len(out):
+            self.value = float(out[-1])
+            self.close = float(close[-1])
+        return out
+
+    def update(self, high: float, low: float, close: float) -> float:
+        tr = _true_range(high, low, self.close)
+        self.close = close
+        self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+
+class DMIKernel:
+    """
+    ADX / PLUS_DI / MINUS_DI（同一组 Wilder 平滑的 +DM、-DM、TR，一次推进三个输出）
+
+    输出顺序 (adx, plus_di, minus_di)。
+    """
+
+    __slots__ = ('period', 'plus_dm', 'minus_dm', 'tr', 'adx', 'high', 'low', 'close')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.adx = np.nan
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.adx)
+
+    def seed(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> tuple:
+        p = self.period
+        outputs = (talib.ADX(high, low, close, timeperiod=p),
+                   talib.PLUS_DI(high, low, close, timeperiod=p),
+                   talib.MINUS_DI(high, low, close, timeperiod=p))
+        valid = np.flatnonzero(~(np.isnan(high) | np.isnan(low) | np.isnan(close)))
+        if len(valid) == 0 or len(high) - valid[0] < 2 * p:
+            return outputs
+
+        h = high[valid[0]:].tolist()
+        lo = low[valid[0]:].tolist()
+        c = close[valid[0]:].tolist()
+        self.high, self.low, self.close = h[0], lo[0], c[0]
+        self.plus_dm = self.minus_dm = self.tr = 0.0
+        # 与 TA-Lib 相同：前 period-1 根累加，之后 Wilder 平滑；前 period 个 DX 的均值为首个 ADX
+        for k in range(1, p):
+            plus, minus, tr = self._movement(h[k], lo[k], c[k])
+            self.plus_dm += plus
+            self.minus_dm += minus
+            self.tr += tr
+        dx_sum = 0.0
+        for k in range(p, 2 * p):
+            dx = self._smooth(h[k], lo[k], c[k])
+            if dx is not None:
+                dx_sum += dx
+        self.adx = dx_sum / p
+        for k in range(2 * p, len(h)):
+            self.update(h[k], lo[k], c[k])
+        return outputs
+
+    def update(self, high: float, low: float, close: float) -> tuple:
+        p = self.period
+        dx = self._smooth(high, low, close)
+        if dx is not None:
+            self.adx = (self.adx * (p - 1) + dx) / p
+        return self.adx, self._di(self.plus_dm), self._di(self.minus_dm)
+
+    def _movement(self, high: float, low: float, close: float) -> tuple:
+        """当根 +DM、-DM、TR，并记下本根价格"""
+        diff_p = high - self.high
+        diff_m = self.low - low
+        plus = diff_p if diff_p > 0 and diff_p > diff_m else 0.0
+        minus = diff_m if diff_m > 0 and diff_m > diff_p else 0.0
+        tr = _true_range(high, low, self.close)
+        self.high, self.low, self.close = high, low, close
+        return plus, minus, tr
+
+    def _smooth(self, high: float, low: float, close: float):
+        """Wilder 平滑推进一根，返回当根 DX（TR 或 DI 之和为 0 时返回 None）"""
+        p = self.period
+        plus, minus, tr = self._movement(high, low, close)
+        self.plus_dm = self.plus_dm - self.plus_dm / p + plus
+        self.minus_dm = self.minus_dm - self.minus_dm / p + minus
+        self.tr = self.tr - self.tr / p + tr
+        if _is_zero(self.tr):
+            return None
+        plus_di = 100.0 * (self.plus_dm / self.tr)
+        minus_di = 100.0 * (self.minus_dm / self.tr)
+        total = plus_di + minus_di
+        if _is_zero(total):
+            return None
+        return 100.0 * (abs(minus_di - plus_di) / total)
+
+    def _di(self, dm: float) -> float:
+        return 100.0 * (dm / self.tr) if not _is_zero(self.tr) else 0.0
+
+
+class BBandsKernel:
+    """
+    布林带（SMA 中轨 + 总体标准差，与 TA-Lib BBANDS matype=0 一致）
+
+    输出顺序 (upperband, middleband, lowerband)。维护窗口滑动和与平方和，
+    每 refresh 根从窗口重算一次，避免长时间运行累积舍入误差。
+    """
+
+    __slots__ = ('period', 'nbdevup', 'nbdevdn', 'refresh', 'window', 'total', 'total2', 'count')
+
+    def __init__(self, period: int, nbdevup: float = 2.0, nbdevdn: float = 2.0, refresh: int = 1000):
+        self.period = period
+        self.nbdevup = nbdevup
+        self.nbdevdn = nbdevdn
+        self.refresh = refresh
+        self.window = deque()
+        self.total = self.total2 = 0.0
+        self.count = 0
+
+    @property
+    def ready(self) -> bool:
+        return len(self.window) == self.period and not math.isnan(self.total)
+
+    def seed(self, values: np.ndarray) -> tuple:
+        outputs = talib.BBANDS(values, timeperiod=self.period,
+                               nbdevup=self.nbdevup, nbdevdn=self.nbdevdn, matype=0)
+        self.window = deque(values[-self.period:].tolist())
+        self._recompute()
+        return outputs
+
+    def update(self, value: float) -> tuple:
+        old = self.window.popleft()
+        self.window.append(value)
+        self.total += value - old
+        self.total2 += value * value - old * old
+        self.count += 1
+        if self.count % self.refresh == 0:
+            self._recompute()
+        p = self.period
+        middle = self.total / p
+        var = self.total2 / p - middle * middle
+        std = math.sqrt(var) if var > 0 else 0.0
+        return middle + self.nbdevup * std, middle, middle - self.nbdevdn * std
+
+    def _recompute(self) -> None:
+        self.total = math.fsum(self.window)
+        self.total2 = math.fsum(x * x for x in self.window)
+
+
+# talib.abstract 函数名 -> (内核, 输入列, 输出名, 支持的参数及默认值)
+_FUNCTIONS = {
+    'EMA': ('EMA', ('price',), None, {'timeperiod': 30}),
+    'RSI': ('RSI', ('price',), None, {'timeperiod': 14}),
+    'ATR': ('ATR', ('high', 'low', 'close'), None, {'timeperiod': 14}),
+    'ADX': ('DMI', ('high', 'low', 'close'), 0, {'timeperiod': 14}),
+    'PLUS_DI': ('DMI', ('high', 'low', 'close'), 1, {'timeperiod': 14}),
+    'MINUS_DI': ('DMI', ('high', 'low', 'close'), 2, {'timeperiod': 14}),
+    'BBANDS': ('BBANDS', ('price',), ('upperband', 'middleband', 'lowerband'),
+               {'timeperiod': 5, 'nbdevup': 2.0, 'nbdevdn': 2.0, 'matype': 0}),
+}
+
+
+class TAStream(KernelStream):
+    """
+    增量 TA 指标引擎（实盘/模拟盘）
+
+    ADX / PLUS_DI / MINUS_DI 共用同一个 DMIKernel，同周期只推进一次。
+    """
+
+    def ema(self, dataframe: DataFrame, pair: str, timeframe: str,
+            timeperiod: int = 30, price: str = 'close') -> pd.Series:
+        return self.talib(dataframe, pair, timeframe, 'EMA', timeperiod=timeperiod, price=price)
+
+    def rsi(self, dataframe: DataFrame, pair: str, timeframe: str,
+            timeperiod: int = 14, price: str = 'close') -> pd.Series:
+        return self.talib(dataframe, pair, timeframe, 'RSI', timeperiod=timeperiod, price=price)
+
+    def atr(self, dataframe: DataFrame, pair: str, timeframe: str, timeperiod: int = 14) -> pd.Series:
+        return self.talib(dataframe, pair, timeframe, 'ATR', timeperiod=timeperiod)
+
+    def dmi(self, dataframe: DataFrame, pair: str, timeframe: str, timeperiod: int = 14):
+        """返回 (adx, plus_di, minus_di) 三个 Series"""
+        outputs = self._kernel_outputs(dataframe, pair, timeframe, 'DMI',
+                                       ('high', 'low', 'close'), {'timeperiod': timeperiod})
+        return tuple(pd.Series(out, index=dataframe.index) for out in outputs)
+
+    def bbands(self, dataframe: DataFrame, pair: str, timeframe: str, timeperiod: int = 5,
+               nbdevup: float = 2.0, nbdevdn: float = 2.0, price: str = 'close') -> DataFrame:
+        """返回 upperband / middleband / lowerband 三列（与 ta.BBANDS 相同）"""
+        return self.talib(dataframe, pair, timeframe, 'BBANDS', timeperiod=timeperiod,
+                          nbdevup=nbdevup, nbdevdn=nbdevdn, price=price)
+
+    @staticmethod
+    def supports(function: str, params: dict) -> bool:
+        """该 talib 函数 + 参数是否有增量实现"""
+        spec = _FUNCTIONS.get(function)
+        if spec is None:
+            return False
+        allowed = set(spec[3]) | ({'price'} if 'price' in spec[1] else set())
+        return set(params) <= allowed and params.get('matype', 0) == 0
+
+    def talib(self, dataframe: DataFrame, pair: str, timeframe: str, function: str, **params):
+        """与 talib.abstract.<function>(dataframe, **params) 返回值相同的增量版本"""
+        if not self.supports(function, params):
+            raise ValueError(f"不支持增量计算: {function} {params}")
+        kernel, inputs, output, defaults = _FUNCTIONS[function]
+        price = params.pop('price', 'close')
+        inputs = tuple(price if name == 'price' else name for name in inputs)
+        params = {name: params.get(name, default) for name, default in defaults.items()}
+        params.pop('matype', None)
+
+        outputs = self._kernel_outputs(dataframe, pair, timeframe, kernel, inputs, params)
+        if isinstance(output, tuple):
+            return DataFrame(dict(zip(output, outputs)), index=dataframe.index)
+        return pd.Series(outputs[output or 0], index=dataframe.index)
+
+    def _kernel_outputs(self, dataframe: DataFrame, pair: str, timeframe: str,
+                        kernel: str, inputs: tuple, params: dict) -> tuple:
+        period = int(params['timeperiod'])
+        if kernel == 'EMA':
+            factory = lambda: EMAKernel(period)
+        elif kernel == 'RSI':
+            factory = lambda: RSIKernel(period)
+        elif kernel == 'ATR':
+            factory = lambda: ATRKernel(period)
+        elif kernel == 'DMI':
+            factory = lambda: DMIKernel(period)
+        else:
+            nbdevup, nbdevdn = float(params['nbdevup']), float(params['nbdevdn'])
+            factory = lambda: BBandsKernel(period, nbdevup, nbdevdn)
+        key = (pair, timeframe, kernel, inputs, tuple(sorted(params.items())))
+        return self._update(key, dataframe, inputs, factory)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+共享指标内核
+
+所有函数只读取需要的列（零拷贝的 NumPy 视图），不复制整个 dataframe。
+"""
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+import talib
+
+
+def column(dataframe: DataFrame, name: str) -> np.ndarray:
+    """取出一列的 float64 连续数组（已是 float64 时不复制）"""
+    return np.ascontiguousarray(dataframe[name].to_numpy(dtype=np.float64, copy=False))
+
+
+def dates_ns(dataframe: DataFrame) -> np.ndarray:
+    """K线时间（date 列）转为 int64 纳秒时间戳"""
+    return np.asarray(dataframe['date'].values).astype('datetime64[ns]', copy=False).view(np.int64)
+
+
+def supertrend_direction(close: np.ndarray, upperband: np.ndarray, lowerband: np.ndarray,
+                         initial_direction: int = 1) -> np.ndarray:
+    """
+    Supertrend 方向递推（向量化）
+
+    原逻辑逐根K线判断：
+        close[i] > upperband[i-1] -> 1
+        close[i] < lowerband[i-1] -> -1
+        否则沿用 direction[i-1]
+    突破事件本身不依赖上一根的方向，所以等价于“突破信号 + 前向填充”，
+    用 np.maximum.accumulate 一次完成，不需要 Python 循环。
+    """
+    n = close.shape[0]
+    signal = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        return signal
+    signal[0] = initial_direction
+    if n > 1:
+        # 用布尔掩码原地写入，不生成 int64 临时数组；同时满足时上破优先
+        c = close[1:]
+        body = signal[1:]
+        body[c < lowerband[:-1]] = -1
+        body[c > upperband[:-1]] = 1
+    # 最近一次非零信号的位置
+    last = np.arange(n)
+    last[signal == 0] = 0
+    np.maximum.accumulate(last, out=last)
+    return signal[last]
+
+
+def supertrend_arrays(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                      period: int = 14, multiplier: float = 3,
+                      initial_direction: int = 1):
+    """
+    Supertrend（数组版）
+
+    返回 (supertrend, direction) 两个 ndarray。
+    第一根K线的 supertrend 为 0，与原先各策略的实现一致。
+    """
+    # 原地运算：除 TA-Lib 的 ATR 外只分配 hl2 / upperband 两个数组，结果与逐步写法逐位相同
+    band = talib.ATR(high, low, close, timeperiod=period)
+    band *= multiplier
+    hl2 = np.add(high, low)
+    hl2 /= 2
+    upperband = np.add(hl2, band)
+    lowerband = np.subtract(hl2, band, out=hl2)
+    del band
+
+    direction = supertrend_direction(close, upperband, lowerband, initial_direction)
+    # supertrend：上涨取下轨，否则取上轨（直接写在 lowerband 上）
+    st = lowerband
+    np.copyto(st, upperband, where=direction != 1)
+    if st.shape[0] > 0:
+        st[0] = 0.0
+    return st, direction
+
+
+def supertrend(dataframe: DataFrame, period: int = 14, multiplier: float = 3,
+               initial_direction: int = 1):
+    """
+    Supertrend 计算
+
+    返回 (supertrend, direction) 两个 Series，索引与 dataframe 对齐。
+    initial_direction: 第一根K线的方向（老版本 np.zeros 写法为 0）
+    """
+    st, direction = supertrend_arrays(
+        column(dataframe, 'high'), column(dataframe, 'low'), column(dataframe, 'close'),
+        period=period, multiplier=multiplier, initial_direction=initial_direction,
+    )
+    return pd.Series(st, index=dataframe.index), pd.Series(direction, index=dataframe.index)
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """滑动窗口求和（pandas 滚动求和为 O(1) 增减 + 补偿求和，窗口内有 NaN 时结果为 NaN）"""
+    return pd.Series(values).rolling(window).sum().to_numpy()
+
+
+def rolling_linreg(values: np.ndarray, window: int = 20):
+    """
+    滚动线性回归（最小二乘，x = 0..window-1）
+
+    返回 (slope, intercept, r2) 三个 ndarray，前 window-1 根为 NaN。
+    与逐窗口 np.polyfit(range(window), x, 1) 结果一致，但用滑动和计算，每个窗口 O(1)：
+        Sxy = Σ(i·y) - 窗口起点 · Σy    （i 为全局下标）
+    intercept 为窗口起点（x=0）处的值，与 TA-Lib LINEARREG_INTERCEPT 相同。
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = y.shape[0]
+    nan = np.full(n, np.nan)
+    if window < 2 or n < window:
+        return nan, nan.copy(), nan.copy()
+
+    # 先减去一个基准值，避免价格水平远大于窗口内波动时 Σy² 相减丢失精度（斜率不受影响）
+    finite = y[np.isfinite(y)]
+    base = finite[0] if finite.shape[0] else 0.0
+    y = y - base
+    idx = np.arange(n, dtype=np.float64)
+
+    w = float(window)
+    sx = w * (w - 1) / 2
+    sxx = (w - 1) * w * (2 * w - 1) / 6
+    denom = w * sxx - sx * sx
+
+    sy = rolling_sum(y, window)
+    syy = rolling_sum(y * y, window)
+    start = idx - (window - 1)
+    sxy = rolling_sum(idx * y, window) - start * sy
+
+    cov = w * sxy - sx * sy
+    slope = cov / denom
+    intercept = (sy - slope * sx) / w + base
+    var_y = w * syy - sy * sy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(var_y > 0, cov * cov / (denom * var_y), 0.0)
+    r2[np.isnan(slope)] = np.nan
+    return slope, intercept, r2
+
+
+def rolling_slope(series: pd.Series, window: int = 20) -> pd.Series:
+    """滚动线性回归斜率（Series 版，索引与输入对齐）"""
+    slope, _, _ = rolling_linreg(series.to_numpy(dtype=np.float64, copy=False), window)
+    return pd.Series(slope, index=series.index)
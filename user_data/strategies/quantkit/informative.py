@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+高周期（informative）指标缓存
+
+低周期策略每根K线都 dp.get_pair_dataframe(pair, '1h') 再全量计算高周期指标，
+而高周期K线要到下一根才会变。这里按 (pair, timeframe, 最后一根高周期K线时间) 缓存
+高周期指标，只有出现新的高周期K线才重算；结果用向后 as-of 对齐合并到低周期 dataframe
+（与 freqtrade merge_informative_pair(ffill=True) 相同：高周期K线收盘后才可见）。
+不会修改 DataProvider 里的原始 dataframe。
+
+InformativeSet 在此之上按需声明：策略声明可用的高周期列，运行时只获取、缓存和刷新
+信号真正用到的列所在的 (pair, timeframe)，informative_pairs 也只返回这些。
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from .indicators import dates_ns
+
+_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def timeframe_to_ns(timeframe: str) -> int:
+    """'15m' / '1h' / '4h' / '1d' / '1w' 转为纳秒"""
+    match = re.fullmatch(r'(\d+)([mhdw])', timeframe)
+    if match is None:
+        raise ValueError(f"不支持的时间周期: {timeframe}")
+    return int(match.group(1)) * _UNITS[match.group(2)] * 1_000_000_000
+
+
+def asof_indexer(base_dates: np.ndarray, inf_dates: np.ndarray,
+                 base_timeframe: str, inf_timeframe: str) -> np.ndarray:
+    """
+    低周期每根K线对应的高周期K线下标（-1 表示还没有已收盘的高周期K线）
+
+    高周期K线 date 的数据在 date + 高周期 - 低周期 这根低周期K线上才可用。
+    """
+    available = inf_dates + (timeframe_to_ns(inf_timeframe) - timeframe_to_ns(base_timeframe))
+    return np.searchsorted(available, base_dates, side='right') - 1
+
+
+def merge_asof(dataframe: DataFrame, informative: DataFrame, base_timeframe: str,
+               inf_timeframe: str, columns=None, suffix: str = None, fill: dict = None) -> DataFrame:
+    """
+    把高周期列按向后 as-of 对齐写入低周期 dataframe
+
+    列名为 {列}_{suffix}，suffix 默认为高周期（如 ema_50_1h）；suffix='' 时沿用原列名。
+    还没有已收盘高周期K线的行为 NaN（整数列因此变为 float）；fill 指定 {列: 填充值}
+    的列改用填充值，保持原 dtype（如 0/1 趋势列）。
+    """
+    fill = fill or {}
+    if suffix is None:
+        suffix = inf_timeframe
+    columns = [c for c in (columns or informative.columns) if c != 'date']
+    idx = asof_indexer(dates_ns(dataframe), dates_ns(informative), base_timeframe, inf_timeframe)
+    missing = idx < 0
+    take = np.where(missing, 0, idx)
+    for name in columns:
+        values = informative[name].to_numpy()
+        if len(values) == 0:
+            merged = np.full(len(idx), np.nan)
+        else:
+            merged = values[take]
+            if missing.any() and name in fill:
+                merged = merged.copy()
+                merged[missing] = fill[name]
+            elif missing.any():
+                merged = merged.astype(np.float64) if merged.dtype.kind in 'biu' else merged.copy()
+                merged[missing] = np.nan
+        dataframe[f'{name}_{suffix}' if suffix else name] = merged
+    return dataframe
+
+
+class InformativeCache:
+    """
+    高周期指标缓存
+
+    indicators(informative) -> {列名: 值} 或 DataFrame，参数为 DataProvider 的高周期 dataframe
+    （只读，不要在其上写列）。
+    """
+
+    def __init__(self, timeframe: str, indicators, base_timeframe: str, fill: dict = None):
+        self.timeframe = timeframe
+        self.base_timeframe = base_timeframe
+        self.indicators = indicators
+        self.fill = dict(fill or {})
+        self._cache = {}
+
+    def get(self, dp, pair: str):
+        """高周期指标（含 date 列）；没有数据时返回 None"""
+        informative = dp.get_pair_dataframe(pair=pair, timeframe=self.timeframe)
+        if informative is None or len(informative) == 0:
+            return None
+        dates = informative['date']
+        stamp = (len(informative), pd.Timestamp(dates.iloc[0]), pd.Timestamp(dates.iloc[-1]))
+        cached = self._cache.get(pair)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        result = DataFrame({'date': informative['date'].to_numpy()})
+        for name, values in dict(self.indicators(informative)).items():
+            result[name] = np.asarray(values)
+        self._cache[pair] = (stamp, result)
+        return result
+
+    def merge(self, dp, dataframe: DataFrame, pair: str, suffix: str = None) -> DataFrame:
+        """取（或计算）高周期指标并 as-of 合并到 dataframe；没有高周期数据时原样返回"""
+        informative = self.get(dp, pair)
+        if informative is None:
+            return dataframe
+        return merge_asof(dataframe, informative, self.base_timeframe, self.timeframe, suffix=suffix,
+                          fill=self.fill)
+
+    def invalidate(self, pair: str = None) -> None:
+        """清除缓存（可只清某个交易对）"""
+        if pair is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(pair, None)
+
+
+class InformativeSet:
+    """
+    按需的高周期列集合
+
+        informative = InformativeSet('15m')
+        informative.add('1h', 'trend', lambda inf: ...)    # 列名 trend_1h
+        informative.add('4h', 'trend', lambda inf: ...)    # 列名 trend_4h
+
+        informative.pairs(whitelist, ('trend_4h',))        # [(pair, '4h'), ...]
+        informative.merge(dp, dataframe, pair, ('trend_4h',))
+
+    没有被引用的列不会下载也不会计算；每个高周期各自缓存，只在该周期出现新K线时重算。
+    """
+
+    def __init__(self, base_timeframe: str):
+        self.base_timeframe = base_timeframe
+        self._specs = {}
+        self._caches = {}
+
+    def add(self, timeframe: str, name: str, func, fill=None) -> str:
+        """
+        声明高周期列 func(informative) -> 值，返回合并后的列名 {name}_{timeframe}
+
+        fill: 还没有已收盘高周期K线的行的取值（None 时为 NaN）
+        """
+        column = f'{name}_{timeframe}'
+        if column in self._specs:
+            raise ValueError(f"高周期列重复声明: {column}")
+        self._specs[column] = (timeframe, name, func, fill)
+        return column
+
+    def timeframes(self, columns) -> tuple:
+        """columns 中用到的高周期（未声明的列忽略）"""
+        found = []
+        for column in columns:
+            spec = self._specs.get(column)
+            if spec is not None and spec[0] not in found:
+                found.append(spec[0])
+        return tuple(found)
+
+    def pairs(self, pairs, columns) -> list:
+        """informative_pairs 用：只返回 columns 需要的 (pair, timeframe)"""
+        return [(pair, timeframe) for timeframe in self.timeframes(columns) for pair in pairs]
+
+    def merge(self, dp, dataframe: DataFrame, pair: str, columns) -> DataFrame:
+        """获取并合并 columns 中的高周期列（没有高周期数据时不写这些列）"""
+        for timeframe in self.timeframes(columns):
+            names = tuple(self._specs[c][1] for c in columns
+                          if c in self._specs and self._specs[c][0] == timeframe)
+            cache = self._caches.get((timeframe, names))
+            if cache is None:
+                specs = {name: self._specs[f'{name}_{timeframe}'] for name in names}
+                funcs = {name: spec[2] for name, spec in specs.items()}
+                cache = InformativeCache(
+                    timeframe,
+                    lambda informative, funcs=funcs: {n: f(informative) for n, f in funcs.items()},
+                    self.base_timeframe,
+                    fill={name: spec[3] for name, spec in specs.items() if spec[3] is not None},
+                )
+                self._caches[(timeframe, names)] = cache
+            dataframe = cache.merge(dp, dataframe, pair)
+        return dataframe
+
+    def invalidate(self, pair: str = None) -> None:
+        """清除所有高周期缓存（可只清某个交易对）"""
+        for cache in self._caches.values():
+            cache.invalidate(pair)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+内存统计
+
+检查 populate_indicators 的峰值分配是否在输入 dataframe 大小的若干倍以内，
+用于发现整表复制（dataframe.copy()）或大块临时数组。5m 周期回测几个月的数据时
+这类分配会按交易对数成倍放大：
+
+    peak, ratio = qmem.indicator_peak(strategy, dataframe, {'pair': 'DOGE/USDT:USDT'})
+    qmem.check_peak(strategy, dataframe, {'pair': 'DOGE/USDT:USDT'}, max_ratio=8)
+
+统计基于 tracemalloc（NumPy / pandas 的数组分配都会被记录），结果包括新增的指标列本身。
+"""
+
+import tracemalloc
+
+from pandas import DataFrame
+
+
+def frame_nbytes(dataframe: DataFrame) -> int:
+    """dataframe 各列数据占用的字节数（不含 object 列指向的对象）"""
+    return int(dataframe.memory_usage(index=True, deep=False).sum())
+
+
+def peak_allocation(func, *args, **kwargs):
+    """执行 func(*args, **kwargs)，返回 (结果, 执行期间相对开始时的峰值新增分配字节数)"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        if started:
+            tracemalloc.stop()
+    return result, peak
+
+
+def indicator_peak(strategy, dataframe: DataFrame, metadata: dict):
+    """
+    populate_indicators 的峰值分配，返回 (峰值字节数, 峰值 / 输入大小)
+
+    在 dataframe 的副本上执行（副本在统计开始前生成，不计入峰值），不改动输入。
+    """
+    frame = dataframe.copy()
+    size = frame_nbytes(frame)
+    _, peak = peak_allocation(strategy.populate_indicators, frame, metadata)
+    return peak, peak / size if size else 0.0
+
+
+def check_peak(strategy, dataframe: DataFrame, metadata: dict, max_ratio: float) -> float:
+    """峰值分配超过输入大小的 max_ratio 倍时抛出 MemoryError，否则返回倍数"""
+    peak, ratio = indicator_peak(strategy, dataframe, metadata)
+    if ratio > max_ratio:
+        raise MemoryError(
+            f"{type(strategy).__name__}.populate_indicators 峰值分配 {peak / 1024 / 1024:.1f} MB，"
+            f"为输入的 {ratio:.1f} 倍（上限 {max_ratio} 倍）"
+        )
+    return ratio
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+内存映射 OHLCV 存储
+
+离线分析（研究脚本、预筛、多个分析进程读同一段历史）用：把每个 (pair, timeframe)
+的K线存成定宽列文件（date 为 int64 纳秒，其余为 float64），np.memmap 映射后
+把只读视图交给指标内核，多个进程读同一份文件时数据在页缓存里只有一份：
+
+    user_data/ohlcv_store/DOGE_USDT_USDT/30m/
+        meta.json     行数
+        date.i8  open.f64  high.f64  low.f64  close.f64  volume.f64
+
+    store = OHLCVStore('user_data/ohlcv_store')
+    store.sync(dataframe, pair, '30m')                       # 写入（一次性导入或批量更新）
+    arrays = store.view(dataframe, pair, '30m')              # 与 dataframe 逐行对齐，找不到时 None
+    st, direction = qi.supertrend_arrays(arrays['high'], arrays['low'], arrays['close'])
+
+新K线在原文件上就地追加；已有K线被修正时从第一处不一致的行开始覆盖写（不截断文件）。
+读取不加锁：另一个进程正在 sync 时可能读到写了一半的修正行，因此写入和读取应分开进行。
+不用于实盘策略：freqtrade 本身已持有 pandas K线，qi.column 取到的已是零拷贝视图，
+每根K线写盘只会增加 I/O。
+"""
+
+import json
+import os
+
+import numpy as np
+from pandas import DataFrame
+
+from .features import _locked, _safe
+from .indicators import dates_ns
+
+_COLUMNS = (('date', np.int64, 'i8'), ('open', np.float64, 'f64'), ('high', np.float64, 'f64'),
+            ('low', np.float64, 'f64'), ('close', np.float64, 'f64'), ('volume', np.float64, 'f64'))
+
+
+class OHLCVStore:
+    """
+    内存映射K线存储
+
+    root: 存储目录（通常为 user_data/ohlcv_store）
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._maps = {}
+
+    @classmethod
+    def from_config(cls, config: dict, name: str = 'ohlcv_store') -> 'OHLCVStore':
+        """按 freqtrade 配置的 user_data_dir 定位存储目录"""
+        return cls(os.path.join(str(config.get('user_data_dir', 'user_data')), name))
+
+    def _path(self, pair: str, timeframe: str) -> str:
+        return os.path.join(self.root, _safe(pair), _safe(timeframe))
+
+    @staticmethod
+    def _length(path: str) -> int:
+        try:
+            with open(os.path.join(path, 'meta.json')) as handle:
+                return int(json.load(handle)['length'])
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def arrays(self, pair: str, timeframe: str) -> dict:
+        """全部已存K线 {列名: 只读 memmap}（没有数据时为空数组）"""
+        path = self._path(pair, timeframe)
+        length = self._length(path)
+        cached = self._maps.get((pair, timeframe))
+        if cached is not None and cached[0] == length:
+            return cached[1]
+        arrays = {}
+        for name, dtype, suffix in _COLUMNS:
+            if length == 0:
+                arrays[name] = np.empty(0, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(os.path.join(path, f'{name}.{suffix}'), dtype=dtype,
+                                         mode='r', shape=(length,))
+        self._maps[(pair, timeframe)] = (length, arrays)
+        return arrays
+
+    def sync(self, dataframe: DataFrame, pair: str, timeframe: str) -> None:
+        """把 dataframe 里的新K线（及被修正的K线）写入存储"""
+        if len(dataframe) == 0:
+            return
+        dates = dates_ns(dataframe)
+        stored = self.arrays(pair, timeframe)
+        old = stored['date']
+        if len(old) and dates[-1] <= old[-1]:
+            # 没有新K线：只在最后一根不一致时才需要写
+            pos = int(np.searchsorted(old, dates[-1]))
+            if pos < len(old) and old[pos] == dates[-1] and stored['close'][pos] == dataframe['close'].iat[-1]:
+                return
+
+        path = self._path(pair, timeframe)
+        with _locked(path):
+            self._maps.pop((pair, timeframe), None)
+            stored = self.arrays(pair, timeframe)
+            old = stored['date']
+            if len(old) == 0 or dates[0] < old[0]:
+                start, offset = 0, 0
+            else:
+                # dataframe 第 offset 行写到存储第 start 行：先跳过内容一致的重叠部分
+                start = int(np.searchsorted(old, dates[0]))
+                offset = 0
+                overlap = min(len(old) - start, len(dates))
+                if overlap > 0:
+                    same = old[start:start + overlap] == dates[:overlap]
+                    for name, _, _ in _COLUMNS[1:]:
+                        same &= stored[name][start:start + overlap] == dataframe[name].to_numpy(dtype=np.float64)[:overlap]
+                    offset = overlap if same.all() else int(np.argmin(same))
+                    start += offset
+            if offset == len(dates):
+                return
+            for name, dtype, suffix in _COLUMNS:
+                values = dates if name == 'date' else dataframe[name].to_numpy(dtype=np.float64)
+                self._write(os.path.join(path, f'{name}.{suffix}'), start, values[offset:], dtype)
+            length = start + len(dates) - offset
+            tmp = os.path.join(path, 'meta.json.tmp')
+            with open(tmp, 'w') as handle:
+                json.dump({'pair': pair, 'timeframe': timeframe, 'length': length}, handle)
+            os.replace(tmp, os.path.join(path, 'meta.json'))
+            self._maps.pop((pair, timeframe), None)
+
+    @staticmethod
+    def _write(filename: str, row: int, values: np.ndarray, dtype) -> None:
+        """从第 row 行开始覆盖写（文件不存在时创建）"""
+        mode = 'r+b' if os.path.exists(filename) else 'wb'
+        with open(filename, mode) as handle:
+            handle.seek(row * np.dtype(dtype).itemsize)
+            np.ascontiguousarray(values, dtype=dtype).tofile(handle)
+
+    def view(self, dataframe: DataFrame, pair: str, timeframe: str, sync: bool = False):
+        """
+        与 dataframe 逐行对齐的只读 OHLCV 视图 {列名: memmap 切片}
+
+        sync=True 时先写入新K线；存储里找不到完全对应的K线或读取失败时返回 None。
+        """
+        if sync:
+            self.sync(dataframe, pair, timeframe)
+        try:
+            arrays = self.arrays(pair, timeframe)
+        except (OSError, ValueError):
+            return None
+        dates = dates_ns(dataframe)
+        n = len(dates)
+        if n == 0:
+            return None
+        start = int(np.searchsorted(arrays['date'], dates[0]))
+        if start + n > len(arrays['date']) or not np.array_equal(arrays['date'][start:start + n], dates):
+            return None
+        return {name: values[start:start + n] for name, values in arrays.items()}
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+信号级近似回测（hyperopt 候选预筛）
+
+出场完全由信号 + minimal_roi / stoploss / 追踪止损决定的策略（V8 系列、BreakoutStrategyV2、
+MomentumStrategy、MACDTrendStrategy 等），可以只用 enter_* / exit_* 列和这些静态风控参数
+近似回测。按K线逐根推进，每一步对全部参数组同时做 NumPy 运算，几千组参数一次跑完：
+
+    params = qpre.RiskParams.grid(strategy, stoploss=[-0.02, -0.03, -0.05],
+                                  trailing_stop_positive=[0.01, 0.02, 0.03])
+    sim = qpre.simulate(dataframe, params, timeframe='30m', fee=0.0005, leverage=3)
+    best = np.argsort(sim.summary()['profit_sum'])[::-1][:20]     # 只把前 20 组交给完整回测
+    sim.trades(best[0])                                            # 交易明细
+    sim.equity(best[0])                                            # 每根K线的权益曲线
+
+撮合规则（与 freqtrade 回测一致的部分）：上一根K线的信号在当根开盘价成交；同一根K线内
+先看止损（最低/最高价触及止损价），再看 ROI（按持仓时长取 minimal_roi 档位）；
+追踪止损用已收盘K线的极值更新，从下一根K线起生效。
+未模拟：仓位上限 max_open_trades、custom_stoploss / custom_exit、资金费率、强平。
+
+与完整回测的一致性（按开仓时间匹配交易）：
+
+    report = qpre.agreement(sim.trades(0), '../backtest_results/backtest-result-xxx.zip',
+                            strategy='SupertrendFuturesStrategyV8_1', pair='DOGE/USDT:USDT')
+"""
+
+import itertools
+
+import numpy as np
+from pandas import DataFrame, DatetimeIndex
+
+from .informative import timeframe_to_ns
+from .results import read_trades
+
+EXIT_REASONS = ('exit_signal', 'stop_loss', 'trailing_stop_loss', 'roi', 'force_exit')
+_EXIT_SIGNAL, _STOP_LOSS, _TRAILING, _ROI, _FORCE = range(len(EXIT_REASONS))
+
+_RISK_FIELDS = ('stoploss', 'trailing_stop', 'trailing_stop_positive',
+                'trailing_stop_positive_offset', 'trailing_only_offset_is_reached')
+
+
+class RiskParams:
+    """
+    一批静态风控参数（每个属性是长度为参数组数的数组）
+
+    minimal_roi 是 {分钟: 收益率} 字典的列表（与 freqtrade 写法相同，键可以是字符串）。
+    """
+
+    __slots__ = ('minimal_roi',) + _RISK_FIELDS
+
+    def __init__(self, minimal_roi, stoploss, trailing_stop=False, trailing_stop_positive=None,
+                 trailing_stop_positive_offset=0.0, trailing_only_offset_is_reached=False):
+        stoploss = np.atleast_1d(np.asarray(stoploss, dtype=np.float64))
+        if isinstance(minimal_roi, dict):
+            minimal_roi = [minimal_roi]
+        size = max(len(stoploss), len(minimal_roi))
+        self.minimal_roi = list(minimal_roi) * size if len(minimal_roi) == 1 else list(minimal_roi)
+        self.stoploss = np.broadcast_to(stoploss, size).copy()
+        self.trailing_stop = np.broadcast_to(np.asarray(trailing_stop, dtype=bool), size).copy()
+        # trailing_stop_positive 为 None 时沿用 stoploss 距离追踪（freqtrade 的行为）
+        positive = np.asarray(np.nan if trailing_stop_positive is None else trailing_stop_positive,
+                              dtype=np.float64)
+        self.trailing_stop_positive = np.broadcast_to(positive, size).copy()
+        self.trailing_stop_positive_offset = np.broadcast_to(
+            np.asarray(trailing_stop_positive_offset, dtype=np.float64), size).copy()
+        self.trailing_only_offset_is_reached = np.broadcast_to(
+            np.asarray(trailing_only_offset_is_reached, dtype=bool), size).copy()
+        if len(self.minimal_roi) != size:
+            raise ValueError(f"minimal_roi 有 {len(self.minimal_roi)} 组，其余参数有 {size} 组")
+
+    def __len__(self) -> int:
+        return len(self.stoploss)
+
+    @classmethod
+    def from_strategy(cls, strategy) -> 'RiskParams':
+        """策略（类或实例）当前的风控参数，单组"""
+        return cls(dict(getattr(strategy, 'minimal_roi', None) or {'0': np.inf}),
+                   getattr(strategy, 'stoploss'),
+                   getattr(strategy, 'trailing_stop', False),
+                   getattr(strategy, 'trailing_stop_positive', None),
+                   getattr(strategy, 'trailing_stop_positive_offset', 0.0) or 0.0,
+                   getattr(strategy, 'trailing_only_offset_is_reached', False))
+
+    @classmethod
+    def grid(cls, strategy, **values) -> 'RiskParams':
+        """以策略参数为基准，对给定字段的取值做笛卡尔积（minimal_roi 的取值是字典）"""
+        base = cls.from_strategy(strategy)
+        fields = ('minimal_roi',) + _RISK_FIELDS
+        unknown = set(values) - set(fields)
+        if unknown:
+            raise ValueError(f"未知的风控参数: {', '.join(sorted(unknown))}")
+        default = {'minimal_roi': base.minimal_roi[0]}
+        default.update({name: getattr(base, name)[0] for name in _RISK_FIELDS})
+        choices = [values.get(name, [default[name]]) for name in fields]
+        combos = list(itertools.product(*choices))
+        columns = {name: [combo[i] for combo in combos] for i, name in enumerate(fields)}
+        return cls(**columns)
+
+    def roi_table(self, timeframe_minutes: float) -> np.ndarray:
+        """
+        每组参数按持仓K线数的 ROI 阈值表 (参数组数, 档位数)
+
+        持仓超过最后一档时用最后一列；没有适用档位时阈值为 inf（不触发）。
+        """
+        steps = [sorted((float(minutes), float(ratio)) for minutes, ratio in roi.items())
+                 for roi in self.minimal_roi]
+        last = max((s[-1][0] for s in steps if s), default=0.0)
+        width = int(np.ceil(last / timeframe_minutes)) + 1
+        elapsed = np.arange(width) * timeframe_minutes
+        table = np.full((len(steps), width), np.inf)
+        for row, step in enumerate(steps):
+            for minutes, ratio in step:
+                table[row, elapsed >= minutes] = ratio
+        return table
+
+
+def _signal(values, size: int, length: int) -> np.ndarray:
+    """信号列统一为 (1, K线数) 或 (参数组数, K线数) 的布尔数组"""
+    if values is None:
+        return np.zeros((1, length), dtype=bool)
+    values = np.asarray(values)
+    if values.dtype != bool:
+        values = np.nan_to_num(values.astype(np.float64)) > 0
+    values = values.reshape(1, length) if values.ndim == 1 else values
+    if values.shape not in ((1, length), (size, length)):
+        raise ValueError(f"信号形状 {values.shape} 与 ({size}, {length}) 不匹配")
+    return values
+
+
+class Simulation:
+    """simulate() 的结果：全部参数组的交易（平铺存放，set_index 标记所属参数组）"""
+
+    __slots__ = ('params', 'dates', 'close', 'fee', 'leverage',
+                 'set_index', 'open_index', 'close_index', 'is_short',
+                 'open_rate', 'close_rate', 'reason', 'profit_ratio')
+
+    def __init__(self, params, dates, close, fee, leverage, set_index, open_index, close_index,
+                 is_short, open_rate, close_rate, reason):
+        order = np.lexsort((open_index, set_index))
+        self.params = params
+        self.dates = dates
+        self.close = close
+        self.fee = fee
+        self.leverage = leverage
+        self.set_index = set_index[order]
+        self.open_index = open_index[order]
+        self.close_index = close_index[order]
+        self.is_short = is_short[order]
+        self.open_rate = open_rate[order]
+        self.close_rate = close_rate[order]
+        self.reason = reason[order]
+        # 与 freqtrade 相同：开平仓各收一次手续费，收益率按保证金（乘杠杆）
+        lev = leverage[self.set_index]
+        long_profit = self.close_rate * (1 - fee) / (self.open_rate * (1 + fee)) - 1
+        short_profit = 1 - self.close_rate * (1 + fee) / (self.open_rate * (1 - fee))
+        self.profit_ratio = np.where(self.is_short, short_profit, long_profit) * lev
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    def _rows(self, index: int) -> slice:
+        start, stop = np.searchsorted(self.set_index, [index, index + 1])
+        return slice(start, stop)
+
+    def trades(self, index: int) -> DataFrame:
+        """第 index 组参数的交易明细（列名与 freqtrade 结果一致）"""
+        rows = self._rows(index)
+        return DataFrame({
+            'open_date': self.dates[self.open_index[rows]],
+            'close_date': self.dates[self.close_index[rows]],
+            'is_short': self.is_short[rows],
+            'open_rate': self.open_rate[rows],
+            'close_rate': self.close_rate[rows],
+            'profit_ratio': self.profit_ratio[rows],
+            'exit_reason': np.asarray(EXIT_REASONS, dtype=object)[self.reason[rows]],
+        })
+
+    def equity(self, index: int, stake: float = 1.0) -> np.ndarray:
+        """
+        第 index 组参数每根K线收盘时的权益（初始为 1，每笔投入 stake，不复利）
+
+        持仓中的交易按当根收盘价计入浮动盈亏。
+        """
+        rows = self._rows(index)
+        length = len(self.close)
+        realized = np.zeros(length)
+        np.add.at(realized, self.close_index[rows], self.profit_ratio[rows] * stake)
+        curve = 1.0 + np.cumsum(realized)
+        lev = self.leverage[index]
+        for start, stop, short, rate in zip(self.open_index[rows], self.close_index[rows],
+                                            self.is_short[rows], self.open_rate[rows]):
+            if stop <= start:
+                continue
+            price = self.close[start:stop]
+            if short:
+                floating = 1 - price * (1 + self.fee) / (rate * (1 - self.fee))
+            else:
+                floating = price * (1 - self.fee) / (rate * (1 + self.fee)) - 1
+            curve[start:stop] += floating * lev * stake
+        return curve
+
+    def summary(self) -> dict:
+        """每组参数的汇总指标 {指标: 长度为参数组数的数组}（收益率按每笔全仓、不复利累加）"""
+        size = len(self.params)
+        count = np.bincount(self.set_index, minlength=size)
+        profit = np.bincount(self.set_index, weights=self.profit_ratio, minlength=size)
+        wins = np.bincount(self.set_index, weights=self.profit_ratio > 0, minlength=size)
+        # 逐笔累计收益的最大回撤：组内累加后减去组内历史高点
+        cumulative = np.cumsum(self.profit_ratio)
+        starts = np.searchsorted(self.set_index, np.arange(size))
+        offset = np.concatenate(([0.0], cumulative))[starts]
+        running = cumulative - offset[self.set_index]
+        drawdown = np.zeros(size)
+        if len(running):
+            boundaries = np.r_[0, np.flatnonzero(np.diff(self.set_index)) + 1]
+            peak = np.maximum(running, 0.0)
+            for start, stop in zip(boundaries, np.r_[boundaries[1:], len(running)]):
+                peak[start:stop] = np.maximum.accumulate(peak[start:stop])
+            np.maximum.at(drawdown, self.set_index, peak - running)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'trades': count,
+                'profit_sum': profit,
+                'profit_mean': np.where(count > 0, profit / np.maximum(count, 1), 0.0),
+                'winrate': np.where(count > 0, wins / np.maximum(count, 1), 0.0),
+                'max_drawdown': drawdown,
+            }
+
+
+def simulate(dataframe: DataFrame, params: RiskParams, timeframe: str, fee: float = 0.0,
+             leverage=1.0, enter_long=None, exit_long=None, enter_short=None, exit_short=None,
+             use_exit_signal: bool = True) -> Simulation:
+    """
+    近似回测一个交易对，每组参数同时只持有一笔仓位
+
+    信号默认取 dataframe 的 enter_long / exit_long / enter_short / exit_short 列；
+    也可以直接传入 (K线数,) 或 (参数组数, K线数) 的数组（每组参数信号不同时，
+    例如 hyperopt 的入场参数也在搜索范围内）。leverage 可以是标量或每组一个值。
+    """
+    length, size = len(dataframe), len(params)
+    dates = DatetimeIndex(dataframe['date'])
+    open_ = dataframe['open'].to_numpy(dtype=np.float64)
+    high = dataframe['high'].to_numpy(dtype=np.float64)
+    low = dataframe['low'].to_numpy(dtype=np.float64)
+    close = dataframe['close'].to_numpy(dtype=np.float64)
+
+    def column(values, name):
+        if values is None and name in dataframe:
+            values = dataframe[name].to_numpy()
+        return _signal(values, size, length)
+
+    signals = [column(enter_long, 'enter_long'), column(enter_short, 'enter_short'),
+               column(exit_long, 'exit_long') if use_exit_signal else _signal(None, size, length),
+               column(exit_short, 'exit_short') if use_exit_signal else _signal(None, size, length)]
+    any_entry = signals[0].any(axis=0) | signals[1].any(axis=0)
+
+    lev = np.broadcast_to(np.asarray(leverage, dtype=np.float64), size).copy()
+    stop_distance = -params.stoploss / lev
+    roi = params.roi_table(timeframe_to_ns(timeframe) / 60e9)
+    roi_last = roi.shape[1] - 1
+    rows = np.arange(size)
+    trailing = params.trailing_stop
+    positive = np.where(np.isnan(params.trailing_stop_positive), np.nan,
+                        params.trailing_stop_positive / lev)
+    offset = params.trailing_stop_positive_offset
+    only_offset = params.trailing_only_offset_is_reached
+    # freqtrade 的 ROI 出场价让扣费后的收益恰好等于阈值
+    fee_open, fee_close = 1 + fee, 1 - fee
+
+    side = np.zeros(size, dtype=np.int8)           # 0 空仓 / 1 多 / -1 空
+    entry_rate = np.zeros(size)
+    entry_index = np.zeros(size, dtype=np.int64)
+    extreme = np.zeros(size)                       # 多单持仓以来最高价 / 空单最低价
+    stop_rate = np.zeros(size)
+    trailed = np.zeros(size, dtype=bool)
+    events = []
+
+    def close_out(mask, index, rate, reason):
+        chosen = np.flatnonzero(mask)
+        if len(chosen) == 0:
+            return
+        rate = np.broadcast_to(rate, size)[chosen]
+        events.append((chosen, entry_index[chosen], np.full(len(chosen), index), side[chosen] < 0,
+                       entry_rate[chosen], rate,
+                       reason[chosen] if isinstance(reason, np.ndarray) else np.full(len(chosen), reason)))
+        side[chosen] = 0
+
+    for i in range(1, length):
+        holding = side != 0
+        if not any_entry[i - 1] and not holding.any():
+            continue
+        o, h, l = open_[i], high[i], low[i]
+
+        # 上一根K线的出场信号：当根开盘价平仓（同一根再出现入场信号时可以再开）
+        if holding.any():
+            prev_exit = (side > 0) & signals[2][:, i - 1] | (side < 0) & signals[3][:, i - 1]
+            close_out(prev_exit, i, o, _EXIT_SIGNAL)
+
+        # 上一根K线的入场信号：当根开盘价开仓
+        flat = side == 0
+        go_long = flat & signals[0][:, i - 1]
+        go_short = flat & ~go_long & signals[1][:, i - 1]
+        opened = go_long | go_short
+        if opened.any():
+            side[go_long] = 1
+            side[go_short] = -1
+            entry_rate[opened] = o
+            entry_index[opened] = i
+            extreme[opened] = o
+            trailed[opened] = False
+            stop_rate[go_long] = o * (1 - stop_distance[go_long])
+            stop_rate[go_short] = o * (1 + stop_distance[go_short])
+
+        long_side, short_side = side > 0, side < 0
+        if not (long_side.any() or short_side.any()):
+            continue
+
+        # 止损：跳空越过止损价时按开盘价成交
+        hit_long = long_side & (l <= stop_rate)
+        hit_short = short_side & (h >= stop_rate)
+        stop_fill = np.where(long_side, np.minimum(stop_rate, o), np.maximum(stop_rate, o))
+        close_out(hit_long | hit_short, i, stop_fill, np.where(trailed, _TRAILING, _STOP_LOSS))
+
+        # ROI：按持仓时长取档位
+        long_side, short_side = side > 0, side < 0
+        if long_side.any() or short_side.any():
+            threshold = roi[rows, np.minimum(i - entry_index, roi_last)] / lev
+            long_target = entry_rate * fee_open * (1 + threshold) / fee_close
+            short_target = entry_rate * fee_close * (1 - threshold) / fee_open
+            hit_long = long_side & (h >= long_target)
+            hit_short = short_side & (l <= short_target)
+            roi_fill = np.where(long_side, np.maximum(long_target, o), np.minimum(short_target, o))
+            close_out(hit_long | hit_short, i, roi_fill, _ROI)
+
+        # 追踪止损：用当根极值更新，下一根K线起生效；止损价只朝有利方向移动
+        long_side, short_side = side > 0, side < 0
+        move = trailing & (long_side | short_side)
+        if move.any():
+            extreme = np.where(long_side, np.maximum(extreme, h), np.where(short_side, np.minimum(extreme, l), extreme))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                profit = np.where(long_side, extreme / entry_rate - 1, 1 - extreme / entry_rate) * lev
+            reached = profit > offset
+            distance = np.where(reached & ~np.isnan(positive), positive,
+                                np.where(only_offset, np.nan, stop_distance))
+            candidate = np.where(long_side, extreme * (1 - distance), extreme * (1 + distance))
+            better = move & ~np.isnan(distance) & np.where(long_side, candidate > stop_rate,
+                                                            candidate < stop_rate)
+            stop_rate = np.where(better, candidate, stop_rate)
+            trailed |= better
+
+    # 数据结束时仍持有的仓位按最后收盘价平仓
+    close_out(side != 0, length - 1, close[-1] if length else 0.0, _FORCE)
+
+    if events:
+        fields = [np.concatenate(values) for values in zip(*events)]
+    else:
+        fields = [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                  np.zeros(0, dtype=bool), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64)]
+    return Simulation(params, dates, close, fee, lev, *fields)
+
+
+def agreement(trades: DataFrame, zip_path: str, strategy: str = None, pair: str = None) -> dict:
+    """
+    近似回测与完整回测的一致性（按开仓时间和方向匹配同一笔交易）
+
+    trades 是 Simulation.trades() 的结果，zip_path 是同一时间段、同一组参数的 freqtrade 回测结果。
+    """
+    start = trades['open_date'].min() if len(trades) else None
+    end = trades['close_date'].max() if len(trades) else None
+    actual = read_trades(zip_path, fields=('open_date', 'close_date', 'is_short', 'profit_ratio', 'exit_reason'),
+                         strategy=strategy, pairs=[pair] if pair else None, start=start, end=end)
+    expected = DataFrame({name: actual[name] for name in actual})
+    if len(expected):
+        expected['open_date'] = expected['open_date'].astype('datetime64[ns]')
+        expected['close_date'] = expected['close_date'].astype('datetime64[ns]')
+        expected['is_short'] = expected['is_short'].astype(bool)
+    simulated = trades.copy()
+    for name in ('open_date', 'close_date'):
+        values = simulated[name]
+        if getattr(values.dtype, 'tz', None) is not None:
+            values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+        simulated[name] = values.astype('datetime64[ns]')
+
+    matched = simulated.merge(expected, on=['open_date', 'is_short'], suffixes=('_sim', '_bt'))
+    n_sim, n_bt, n = len(simulated), len(expected), len(matched)
+    report = {
+        'sim_trades': n_sim,
+        'backtest_trades': n_bt,
+        'matched': n,
+        'entry_precision': n / n_sim if n_sim else 1.0,
+        'entry_recall': n / n_bt if n_bt else 1.0,
+        'exit_agreement': float((matched['close_date_sim'] == matched['close_date_bt']).mean()) if n else 0.0,
+        'reason_agreement': float((matched['exit_reason_sim'] == matched['exit_reason_bt']).mean()) if n else 0.0,
+        'profit_sim': float(simulated['profit_ratio'].sum()),
+        'profit_backtest': float(expected['profit_ratio'].sum()) if n_bt else 0.0,
+        'profit_error': float((matched['profit_ratio_sim'] - matched['profit_ratio_bt']).abs().mean()) if n else 0.0,
+    }
+    return report
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+市场环境（regime）服务
+
+原写法在 populate_indicators 里算一遍市场环境，leverage / 入场 / confirm_trade_entry
+再各自从 dataframe 末行重新读取或重新判断。这里把判断逻辑做成可替换的检测器，
+每个 (pair, timeframe) 每根新K线只算一次整列结果并缓存，回调用 current_regime(pair)
+直接取值：
+
+    self.regime = qrg.shared_service(qrg.EMADistanceADX(lookback=100), self.timeframe)
+    dataframe['market_regime'] = self.regime.update(dataframe, pair)    # populate_indicators
+    regime = self.regime.current_regime(pair, current_time)              # leverage 等回调
+
+shared_service 按 (检测器参数, timeframe) 返回同一个服务，同一进程里的多个策略共用。
+缓存按 (K线范围, 检测器参数, 检测器输入列末行的值) 判断是否可复用（与 InformativeCache
+一样只看范围和尾部，不扫整列），共用服务的策略输入列算法不同（或 Hyperopt 换了 EMA 周期）
+时末行的值随之变化，会重新计算。检测器参数可优化时，每次 update
+传入按当前参数构造的检测器：
+
+    detector = qrg.SlopeADX(adx_threshold=self.adx_trend_threshold.value)
+    dataframe['market_state'] = self.regime.update(dataframe, pair, detector)
+"""
+
+import numpy as np
+import pandas as pd
+import talib.abstract as ta
+from pandas import DataFrame
+
+from .indicators import dates_ns
+from .informative import timeframe_to_ns
+
+
+class Detector:
+    """检测器基类：detect(dataframe) 返回整数环境代码数组，labels 为代码到名称的映射"""
+
+    labels = {}
+
+    def key(self) -> tuple:
+        """检测器标识（类型 + 参数），用于共享服务"""
+        return (type(self).__name__,) + tuple(sorted(vars(self).items()))
+
+    def inputs(self) -> tuple:
+        """detect 读取的列"""
+        raise NotImplementedError
+
+    def detect(self, dataframe: DataFrame) -> np.ndarray:
+        raise NotImplementedError
+
+    def label(self, code):
+        return self.labels.get(code, code)
+
+
+class EMADistanceADX(Detector):
+    """
+    价格偏离长期 EMA + ADX（V8.2 原逻辑）
+
+    偏离 > distance% 且 ADX > adx_threshold 为牛市(1)，< -distance% 为熊市(-1)，否则震荡(0)。
+    ema_column 指定时直接用已有的 EMA 列（如高周期 EMA），否则用 close 计算 EMA(lookback)。
+    """
+
+    labels = {1: 'bull', -1: 'bear', 0: 'range'}
+
+    def __init__(self, lookback: int = 100, distance: float = 2.0, adx_threshold: float = 20,
+                 ema_column: str = None, adx_column: str = 'adx'):
+        self.lookback = lookback
+        self.distance = distance
+        self.adx_threshold = adx_threshold
+        self.ema_column = ema_column
+        self.adx_column = adx_column
+
+    def inputs(self) -> tuple:
+        return ('close', self.adx_column) + ((self.ema_column,) if self.ema_column is not None else ())
+
+    def detect(self, dataframe: DataFrame) -> np.ndarray:
+        close = dataframe['close'].to_numpy(dtype=np.float64)
+        if self.ema_column is not None:
+            ema = dataframe[self.ema_column].to_numpy(dtype=np.float64)
+        else:
+            ema = np.asarray(ta.EMA(dataframe['close'], timeperiod=self.lookback), dtype=np.float64)
+        price_position = (close - ema) / ema * 100
+        trending = dataframe[self.adx_column].to_numpy(dtype=np.float64) > self.adx_threshold
+        return np.select(
+            [(price_position > self.distance) & trending, (price_position < -self.distance) & trending],
+            [1, -1], default=0,
+        )
+
+
+class SlopeADX(Detector):
+    """趋势斜率 + ADX：ADX 高于阈值时按斜率正负分为上涨(1)/下跌(-1)趋势，否则震荡(0)"""
+
+    labels = {1: 'trend_up', -1: 'trend_down', 0: 'ranging'}
+
+    def __init__(self, adx_threshold: float = 25, slope_column: str = 'trend_slope',
+                 adx_column: str = 'adx'):
+        self.adx_threshold = adx_threshold
+        self.slope_column = slope_column
+        self.adx_column = adx_column
+
+    def inputs(self) -> tuple:
+        return (self.adx_column, self.slope_column)
+
+    def detect(self, dataframe: DataFrame) -> np.ndarray:
+        trending = dataframe[self.adx_column].to_numpy(dtype=np.float64) > self.adx_threshold
+        rising = dataframe[self.slope_column].to_numpy(dtype=np.float64) > 0
+        return np.where(trending, np.where(rising, 1, -1), 0)
+
+
+class Volatility(Detector):
+    """波动率：column（默认 atr_pct）高于阈值为高波动(2)，否则 0"""
+
+    labels = {2: 'volatile', 0: 'normal'}
+
+    def __init__(self, threshold: float = 3.0, column: str = 'atr_pct'):
+        self.threshold = threshold
+        self.column = column
+
+    def inputs(self) -> tuple:
+        return (self.column,)
+
+    def detect(self, dataframe: DataFrame) -> np.ndarray:
+        return np.where(dataframe[self.column].to_numpy(dtype=np.float64) > self.threshold, 2, 0)
+
+
+class Priority(Detector):
+    """组合检测器：按顺序取第一个非 0 的结果（如高波动优先于趋势判断），都为 0 时用最后一个的 0"""
+
+    def __init__(self, *detectors: Detector):
+        self.detectors = detectors
+        self.labels = {}
+        for detector in detectors:
+            for code, name in detector.labels.items():
+                if code != 0:
+                    self.labels.setdefault(code, name)
+        if detectors and 0 in detectors[-1].labels:
+            self.labels[0] = detectors[-1].labels[0]
+
+    def key(self) -> tuple:
+        return (type(self).__name__,) + tuple(d.key() for d in self.detectors)
+
+    def inputs(self) -> tuple:
+        return tuple(dict.fromkeys(c for d in self.detectors for c in d.inputs()))
+
+    def detect(self, dataframe: DataFrame) -> np.ndarray:
+        result = np.zeros(len(dataframe), dtype=np.int64)
+        for detector in reversed(self.detectors):
+            codes = detector.detect(dataframe)
+            result = np.where(codes != 0, codes, result)
+        return result
+
+
+class _RegimeState:
+    __slots__ = ('stamp', 'dates', 'codes')
+
+
+def _inputs_key(dataframe: DataFrame, columns) -> tuple:
+    """检测器输入列末行的值（按位比较，NaN 也能相等；只读一行，与K线数无关）"""
+    if len(dataframe) == 0:
+        return ()
+    return tuple((name, np.float64(dataframe[name].iat[-1]).tobytes()) for name in columns)
+
+
+class RegimeService:
+    """每个交易对缓存一列市场环境代码，回调按时间取当前环境"""
+
+    def __init__(self, detector: Detector, timeframe: str):
+        self.detector = detector
+        self.timeframe = timeframe
+        self.step = timeframe_to_ns(timeframe)
+        self._states = {}
+
+    def update(self, dataframe: DataFrame, pair: str, detector: Detector = None) -> np.ndarray:
+        """
+        计算（或复用）整列市场环境，返回代码数组
+
+        detector: 按当前（可优化）参数构造的检测器，替换服务的检测器
+        """
+        if detector is not None:
+            self.detector = detector
+        # 只看K线数、首末时间和输入列末行：命中时与K线数无关
+        date = dataframe['date']
+        stamp = (len(date), pd.Timestamp(date.iat[0]).value, pd.Timestamp(date.iat[-1]).value) if len(date) else (0, 0, 0)
+        stamp += (self.detector.key(), _inputs_key(dataframe, self.detector.inputs()))
+        state = self._states.get(pair)
+        if state is not None and state.stamp == stamp:
+            return state.codes
+        state = _RegimeState()
+        state.stamp = stamp
+        state.dates = dates_ns(dataframe)
+        state.codes = np.asarray(self.detector.detect(dataframe))
+        self._states[pair] = state
+        return state.codes
+
+    def series(self, pair: str):
+        """缓存的整列环境代码，没有时返回 None"""
+        state = self._states.get(pair)
+        return None if state is None else state.codes
+
+    def current_regime(self, pair: str, current_time=None, default=None):
+        """
+        当前市场环境代码
+
+        current_time 为空时取最后一根K线；否则取 current_time 前已收盘的最后一根
+        （回测中与 get_analyzed_dataframe 末行一致）。没有数据时返回 default。
+        """
+        state = self._states.get(pair)
+        if state is None or len(state.codes) == 0:
+            return default
+        if current_time is None:
+            return state.codes[-1].item()
+        closed = pd.Timestamp(current_time).value - self.step
+        if closed >= state.dates[-1]:
+            return state.codes[-1].item()
+        idx = int(np.searchsorted(state.dates, closed, side='right')) - 1
+        return state.codes[idx].item() if idx >= 0 else default
+
+    def current_label(self, pair: str, current_time=None, default=None):
+        """当前市场环境名称（如 'bull' / 'trend_up'）"""
+        code = self.current_regime(pair, current_time)
+        return default if code is None else self.detector.label(code)
+
+    def reset(self, pair: str = None) -> None:
+        """清空缓存（可只清某个交易对）"""
+        if pair is None:
+            self._states.clear()
+        else:
+            self._states.pop(pair, None)
+
+
+_SERVICES = {}
+
+
+def shared_service(detector: Detector, timeframe: str) -> RegimeService:
+    """同一进程内按 (检测器参数, timeframe) 共享的服务"""
+    key = (detector.key(), timeframe)
+    service = _SERVICES.get(key)
+    if service is None:
+        service = _SERVICES[key] = RegimeService(detector, timeframe)
+    return service
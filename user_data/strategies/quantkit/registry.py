@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+声明式指标注册表
+
+策略先声明要用的指标（名称、函数、参数、依赖），计算时：
+- 相同函数 + 相同参数只算一次（其他名称作为别名复用结果）
+- 按依赖关系（DAG）排序，每个节点每个 dataframe 只算一次
+- 只计算信号/回调/图表真正引用到的列，未引用的指标直接跳过
+
+用法:
+    reg = IndicatorRegistry()
+    reg.talib('adx', 'ADX', timeperiod=14)
+    reg.talib('atr_14', 'ATR', timeperiod=14, export=False)
+    reg.add('volatility_ratio', lambda v: v['atr_14'] / v['close'], depends=('atr_14',))
+    dataframe = reg.compute(dataframe, ('adx', 'volatility_ratio'))
+"""
+
+import talib.abstract as ta
+from pandas import DataFrame
+
+
+class IndicatorValues:
+    """
+    计算上下文：v['name'] 先取未导出的中间结果，再取 dataframe 列
+    """
+
+    __slots__ = ('dataframe', 'scratch')
+
+    def __init__(self, dataframe: DataFrame):
+        self.dataframe = dataframe
+        self.scratch = {}
+
+    def __getitem__(self, name: str):
+        if name in self.scratch:
+            return self.scratch[name]
+        return self.dataframe[name]
+
+
+class _Node:
+    """一次计算，可产出多列；aliases 为去重后复用同一结果的其他列名"""
+
+    __slots__ = ('key', 'func', 'params', 'outputs', 'depends', 'export', 'aliases')
+
+    def __init__(self, key, func, params, outputs, depends, export):
+        self.key = key
+        self.func = func
+        self.params = params
+        self.outputs = outputs
+        self.depends = depends
+        self.export = export
+        self.aliases = {}
+
+
+def _normalize_outputs(outputs):
+    """outputs 统一成 ((结果键, 列名), ...)；结果键为 None 表示单输出"""
+    if isinstance(outputs, str):
+        return ((None, outputs),)
+    if isinstance(outputs, dict):
+        return tuple(outputs.items())
+    return tuple(enumerate(outputs))
+
+
+class IndicatorRegistry:
+    """指标注册表（每次 populate_indicators 按当前参数重新声明即可，开销很小）"""
+
+    def __init__(self, stream=None, pair: str = None, timeframe: str = None):
+        """
+        stream: 可选的 incremental.TAStream（实盘/模拟盘传入）、batch.PeriodBanks（Hyperopt 传入）
+                或 features.FeatureStore，也可以是它们的列表（按顺序取第一个 supports() 的），
+                支持的 TA-Lib 指标改由它计算，其余照常全量计算
+        """
+        self._nodes = []
+        self._by_key = {}
+        self._by_name = {}
+        self.stream = stream
+        if stream is None:
+            self.streams = ()
+        elif isinstance(stream, (list, tuple)):
+            self.streams = tuple(s for s in stream if s is not None)
+        else:
+            self.streams = (stream,)
+        self.pair = pair
+        self.timeframe = timeframe
+
+    def add(self, outputs, func, depends=(), export: bool = True, **params):
+        """
+        注册任意指标函数 func(values, **params)
+
+        outputs: 单列名；列名元组（按位置取结果）；或 {结果键: 列名}
+        depends: 需要先算好的列名（注册过的指标或原始 OHLCV 列）
+        export:  False 时只作为中间结果，不写入 dataframe
+        """
+        key = (func, tuple(sorted(params.items())), tuple(depends))
+        return self._register(key, func, params, outputs, depends, export)
+
+    def talib(self, outputs, function: str, export: bool = True, **params):
+        """注册 TA-Lib 指标（talib.abstract 接口，按函数名 + 参数去重）"""
+        key = ('talib', function, tuple(sorted(params.items())))
+        stream = next((s for s in self.streams if s.supports(function, params)), None)
+        if stream is not None:
+            pair, timeframe = self.pair, self.timeframe
+            func = lambda v, **kw: stream.talib(v.dataframe, pair, timeframe, function, **kw)
+        else:
+            abstract = getattr(ta, function)
+            func = lambda v, **kw: abstract(v.dataframe, **kw)
+        return self._register(key, func, params, outputs, (), export)
+
+    def _register(self, key, func, params, outputs, depends, export):
+        outputs = _normalize_outputs(outputs)
+        for _, name in outputs:
+            if name in self._by_name:
+                raise ValueError(f"指标重复注册: {name}")
+
+        node = self._by_key.get(key)
+        if node is not None:
+            # 相同计算：新名称作为别名，指向已有结果
+            own = dict(node.outputs)
+            for result_key, name in outputs:
+                node.aliases[name] = own[result_key]
+                self._by_name[name] = node
+            node.export = node.export or export
+            return node
+
+        node = _Node(key, func, params, outputs, tuple(depends), export)
+        self._nodes.append(node)
+        self._by_key[key] = node
+        for _, name in outputs:
+            self._by_name[name] = node
+        return node
+
+    def resolve(self, columns) -> list:
+        """返回计算 columns 所需的节点（依赖在前），未引用的节点不在列表中"""
+        order = []
+        state = {}
+
+        def visit(name):
+            node = self._by_name.get(name)
+            if node is None:
+                return
+            mark = state.get(id(node))
+            if mark == 'done':
+                return
+            if mark == 'visiting':
+                raise ValueError(f"指标依赖存在环: {name}")
+            state[id(node)] = 'visiting'
+            for dep in node.depends:
+                visit(dep)
+            state[id(node)] = 'done'
+            order.append(node)
+
+        for name in columns:
+            visit(name)
+        return order
+
+    def compute(self, dataframe: DataFrame, columns) -> DataFrame:
+        """只计算 columns 及其依赖，导出的结果写入 dataframe"""
+        values = IndicatorValues(dataframe)
+        for node in self.resolve(columns):
+            result = node.func(values, **node.params)
+            computed = {}
+            for result_key, name in node.outputs:
+                computed[name] = result if result_key is None else result[result_key]
+            for alias, name in node.aliases.items():
+                computed[alias] = computed[name]
+            for name, value in computed.items():
+                if node.export:
+                    dataframe[name] = value
+                else:
+                    values.scratch[name] = value
+        return dataframe
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+
+def plot_columns(plot_config: dict) -> tuple:
+    """plot_config 中引用的列名（图表需要的指标）"""
+    if not plot_config:
+        return ()
+    names = list(plot_config.get('main_plot', {}))
+    for plot in plot_config.get('subplots', {}).values():
+        names.extend(plot)
+    return tuple(names)
+
+
+def required_columns(strategy, signal_columns) -> tuple:
+    """
+    本次运行需要的列：信号/回调用到的列，非回测模式下再加上图表列
+
+    回测和 Hyperopt 不画图，跳过只为图表存在的指标。
+    """
+    columns = list(signal_columns)
+    dp = getattr(strategy, 'dp', None)
+    if dp is None or dp.runmode.value not in ('backtest', 'hyperopt'):
+        columns.extend(c for c in plot_columns(getattr(strategy, 'plot_config', None)) if c not in columns)
+    return tuple(columns)
+
+
+# 框架本身需要的列：K线、信号和标签
+FRAMEWORK_COLUMNS = (
+    'date', 'open', 'high', 'low', 'close', 'volume',
+    'enter_long', 'enter_short', 'exit_long', 'exit_short', 'enter_tag', 'exit_tag',
+)
+
+
+def exported_columns(strategy) -> tuple:
+    """
+    返回给框架的列：K线/信号列 + strategy.exported_columns（回调、FreqUI 需要的）
+    + 快照列（strategy.snapshots，回测时回调从分析后的 dataframe 读取）+ 图表列（非回测模式）
+    """
+    declared = tuple(getattr(strategy, 'exported_columns', ()))
+    snapshots = getattr(getattr(strategy, 'snapshots', None), 'columns', ())
+    declared = required_columns(strategy, declared + tuple(c for c in snapshots if c not in declared))
+    return FRAMEWORK_COLUMNS + tuple(c for c in declared if c not in FRAMEWORK_COLUMNS)
+
+
+def prune_columns(strategy, dataframe: DataFrame) -> DataFrame:
+    """
+    去掉未导出的中间列（在最后一个 populate_* 里返回前调用）
+
+    框架按交易对常驻分析后的 dataframe，并通过 API/FreqUI 序列化，只留导出列。
+    Hyperopt 每个 epoch 都会在同一份指标上重跑信号，裁剪只增加开销，原样返回。
+    """
+    dp = getattr(strategy, 'dp', None)
+    if dp is not None and dp.runmode.value == 'hyperopt':
+        return dataframe
+    keep = set(exported_columns(strategy))
+    drop = [c for c in dataframe.columns if c not in keep]
+    return dataframe.drop(columns=drop) if drop else dataframe
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+本地重采样高周期K线
+
+需要 1h/4h/1d 趋势时不必额外下载信息对：直接用内存里已有的本周期 OHLCV 聚合。
+Resampler 按 (pair, timeframe) 缓存已收盘的高周期K线，新的本周期K线到来时
+只更新当前未收盘的高周期K线，收盘后追加一根；不重复聚合整段历史。
+
+    self.resampler = Resampler(self.timeframe)
+    daily = self.resampler.resample(dataframe, pair, '1d')     # 只含已收盘的日线
+    dataframe = qinf.merge_asof(dataframe, daily_indicators, self.timeframe, '1d')
+
+provider(dataframe, pair) 返回与 DataProvider.get_pair_dataframe 接口相同的对象，
+可以直接交给 InformativeCache / InformativeSet 使用。
+"""
+
+import numpy as np
+from pandas import DataFrame, to_datetime
+
+from .indicators import dates_ns
+from .informative import timeframe_to_ns
+
+_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# 周线从周一开始（1970-01-01 是周四）
+_WEEK_OFFSET = 4 * 86400 * 1_000_000_000
+
+
+def _bucket_starts(dates: np.ndarray, timeframe: str) -> np.ndarray:
+    step = timeframe_to_ns(timeframe)
+    offset = _WEEK_OFFSET if timeframe.endswith('w') else 0
+    return dates - (dates - offset) % step
+
+
+def _aggregate(dates, arrays, timeframe):
+    """按高周期分桶聚合，返回 (桶起始时间, {列: 值})，包括未收盘的最后一桶"""
+    buckets = _bucket_starts(dates, timeframe)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:] - 1, len(dates) - 1]
+    values = {
+        'open': arrays['open'][starts],
+        'high': np.maximum.reduceat(arrays['high'], starts),
+        'low': np.minimum.reduceat(arrays['low'], starts),
+        'close': arrays['close'][ends],
+        'volume': np.add.reduceat(arrays['volume'], starts),
+    }
+    return buckets[starts], values
+
+
+def resample_ohlcv(dataframe: DataFrame, timeframe: str, base_timeframe: str) -> DataFrame:
+    """
+    一次性重采样（回测用）：只保留完整的高周期K线
+
+    第一桶如果不是从桶起点开始（数据从桶中间开始）也丢弃，避免用残缺K线算指标。
+    """
+    dates = dates_ns(dataframe)
+    if len(dates) == 0:
+        return DataFrame(columns=('date',) + _COLUMNS)
+    arrays = {name: dataframe[name].to_numpy(dtype=np.float64) for name in _COLUMNS}
+    starts, values = _aggregate(dates, arrays, timeframe)
+    keep = np.ones(len(starts), dtype=bool)
+    keep[0] = dates[0] == starts[0]
+    if dates[-1] + timeframe_to_ns(base_timeframe) < starts[-1] + timeframe_to_ns(timeframe):
+        keep[-1] = False
+    return _frame(starts[keep], {name: v[keep] for name, v in values.items()})
+
+
+def _frame(starts, values) -> DataFrame:
+    frame = DataFrame({'date': to_datetime(starts, utc=True)})
+    for name in _COLUMNS:
+        frame[name] = values[name]
+    return frame
+
+
+class _ResampleState:
+    """单个 (pair, timeframe)：已收盘K线 + 当前未收盘的一桶"""
+
+    __slots__ = ('last_date', 'starts', 'values', 'current', 'frame')
+
+
+class Resampler:
+    """
+    增量重采样缓存
+
+    只保留当前 dataframe 覆盖范围内（及其前一根）的已收盘高周期K线：实盘窗口滑动时
+    更早的K线被丢弃，内存不随运行时间增长；回测一次传入全部数据，不会丢弃任何K线。
+    """
+
+    def __init__(self, base_timeframe: str):
+        self.base_timeframe = base_timeframe
+        self.base_step = timeframe_to_ns(base_timeframe)
+        self._states = {}
+
+    def resample(self, dataframe: DataFrame, pair: str, timeframe: str) -> DataFrame:
+        """已收盘的高周期K线（date 为K线开盘时间）；没有新收盘K线时返回同一个对象"""
+        dates = dates_ns(dataframe)
+        state = self._states.get((pair, timeframe))
+        if state is None or len(dates) == 0 or not self._extend(state, dataframe, dates, timeframe):
+            state = self._build(dataframe, dates, timeframe)
+            self._states[(pair, timeframe)] = state
+        if state.frame is None:
+            state.frame = _frame(state.starts, state.values)
+        return state.frame
+
+    def provider(self, dataframe: DataFrame, pair: str):
+        """与 DataProvider 接口兼容的本地数据源（只能取 pair 本身的高周期）"""
+        return _LocalProvider(self, dataframe, pair)
+
+    def _build(self, dataframe, dates, timeframe) -> _ResampleState:
+        state = _ResampleState()
+        state.last_date = None
+        state.starts = np.empty(0, dtype=np.int64)
+        state.values = {name: np.empty(0) for name in _COLUMNS}
+        state.current = None
+        state.frame = None
+        if len(dates) == 0:
+            return state
+        # 从第一个完整的桶开始
+        first = _bucket_starts(dates[:1], timeframe)[0]
+        begin = 0 if dates[0] == first else int(np.searchsorted(
+            dates, first + timeframe_to_ns(timeframe)))
+        self._append(state, dataframe, dates, begin, timeframe)
+        return state
+
+    def _extend(self, state, dataframe, dates, timeframe) -> bool:
+        """只处理上次之后的新K线；上次的最后一根已不在窗口内（缺口过大）时返回 False"""
+        if state.last_date is None:
+            return False
+        pos = int(np.searchsorted(dates, state.last_date))
+        if pos >= len(dates) or dates[pos] != state.last_date:
+            return False
+        if pos + 1 < len(dates):
+            self._append(state, dataframe, dates, pos + 1, timeframe)
+        return True
+
+    def _append(self, state, dataframe, dates, begin, timeframe) -> None:
+        if begin >= len(dates):
+            return
+        new_dates = dates[begin:]
+        arrays = {name: dataframe[name].to_numpy(dtype=np.float64)[begin:] for name in _COLUMNS}
+        starts, values = _aggregate(new_dates, arrays, timeframe)
+
+        current = state.current
+        if current is not None and current[0] == starts[0]:
+            # 第一桶接上当前未收盘的K线
+            _, o, h, l, _, v = current
+            values['open'][0] = o
+            values['high'][0] = max(h, values['high'][0])
+            values['low'][0] = min(l, values['low'][0])
+            values['volume'][0] += v
+        elif current is not None:
+            # 新数据从后面的桶开始（中间缺K线）：当前那桶不会再有数据，按已收盘输出
+            starts = np.r_[current[0], starts]
+            values = {name: np.r_[value, values[name]] for name, value in zip(_COLUMNS, current[1:])}
+
+        # 最后一桶：本周期最后一根K线收盘即为高周期收盘
+        closed = len(starts)
+        if new_dates[-1] + self.base_step < starts[-1] + timeframe_to_ns(timeframe):
+            closed -= 1
+            state.current = (starts[-1],) + tuple(values[name][-1] for name in _COLUMNS)
+        else:
+            state.current = None
+
+        if closed > 0:
+            # 窗口第一根K线之前只需要一根已收盘的高周期K线
+            oldest = _bucket_starts(dates[:1], timeframe)[0] - timeframe_to_ns(timeframe)
+            all_starts = np.concatenate((state.starts, starts[:closed]))
+            keep = slice(int(np.searchsorted(all_starts, oldest)), None)
+            state.starts = all_starts[keep]
+            state.values = {
+                name: np.concatenate((state.values[name], values[name][:closed]))[keep]
+                for name in _COLUMNS
+            }
+            state.frame = None
+        state.last_date = dates[-1]
+
+    def reset(self, pair: str = None) -> None:
+        """清空缓存（可只清某个交易对）"""
+        if pair is None:
+            self._states.clear()
+        else:
+            for key in [k for k in self._states if k[0] == pair]:
+                del self._states[key]
+
+
+class _LocalProvider:
+    __slots__ = ('resampler', 'dataframe', 'pair')
+
+    def __init__(self, resampler: Resampler, dataframe: DataFrame, pair: str):
+        self.resampler = resampler
+        self.dataframe = dataframe
+        self.pair = pair
+
+    def get_pair_dataframe(self, pair: str, timeframe: str) -> DataFrame:
+        if pair != self.pair:
+            raise ValueError(f"本地重采样只能取 {self.pair} 的高周期数据，不能取 {pair}")
+        if timeframe == self.resampler.base_timeframe:
+            return self.dataframe
+        return self.resampler.resample(self.dataframe, pair, timeframe)
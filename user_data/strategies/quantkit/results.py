@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+回测结果目录索引（SQLite）
+
+user_data/backtest_results 下每次回测一个 .meta.json + 一个 .zip，比较策略版本要逐个解压。
+这里建一个 SQLite 索引（默认 backtest_results/catalog.sqlite），每个 (结果文件, 策略) 一行，
+存 run_id / timeframe / timerange 和主要指标，以及交易明细所在的 zip 与成员名：
+
+    catalog = ResultCatalog('user_data/backtest_results')
+    catalog.update()                                    # 只读取新增的 meta 文件
+    catalog.top('SupertrendFuturesStrategyV8_1', by='profit_total', n=10)
+    catalog.top(by='max_drawdown_account', ascending=True)
+
+新结果只在 update() 时解压一次读取指标，之后的查询都只查 SQLite，不再打开 zip。
+
+交易明细用流式读取：逐个解析 zip 成员里的交易对象，只保留需要的字段，
+按交易对/时间先过滤再存，内存只和选中的交易数、字段数有关：
+
+    trades = read_trades(zip_path, fields=('pair', 'open_date', 'profit_ratio'), pairs=('DOGE/USDT:USDT',))
+    trades['profit_ratio'].mean()
+
+命令行（在 user_data/strategies 目录下）：
+    python -m quantkit.results ../backtest_results --strategy SupertrendFuturesStrategyV8_1 --by profit_total
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import re
+import sqlite3
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# 从结果 JSON 里取出的主要指标（数值列）
+METRICS = (
+    'total_trades', 'wins', 'losses', 'draws', 'winrate',
+    'profit_total', 'profit_total_abs', 'profit_mean', 'profit_factor', 'expectancy',
+    'cagr', 'sharpe', 'sortino', 'calmar', 'sqn',
+    'max_drawdown_account', 'max_relative_drawdown', 'max_drawdown_abs',
+    'starting_balance', 'final_balance', 'market_change', 'backtest_days', 'trades_per_day',
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    meta_file TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    result_file TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    run_id TEXT,
+    timeframe TEXT,
+    timerange TEXT,
+    trading_mode TEXT,
+    stake_currency TEXT,
+    backtest_start_ts INTEGER,
+    backtest_end_ts INTEGER,
+    run_time INTEGER,
+    zip_file TEXT,
+    member TEXT,
+    {', '.join(f'{name} NUMERIC' for name in METRICS)},
+    PRIMARY KEY (result_file, strategy)
+);
+CREATE INDEX IF NOT EXISTS runs_strategy ON runs (strategy, timeframe);
+CREATE INDEX IF NOT EXISTS runs_run_id ON runs (run_id);
+"""
+
+
+_RESULT_MEMBER = re.compile(r'^backtest-result-[0-9_-]+\.json$')
+
+
+def result_member(archive: zipfile.ZipFile, stem: str):
+    """
+    zip 里的主结果 JSON（另有 _config.json 和策略参数 JSON），没有时返回 None
+
+    一般与 zip 同名；结果文件被改名（如批量回测时避免重名）时按 freqtrade 的命名规则查找。
+    """
+    names = archive.namelist()
+    if f'{stem}.json' in names:
+        return f'{stem}.json'
+    return next((name for name in names if _RESULT_MEMBER.match(name)), None)
+
+
+def read_metrics(zip_path: str) -> dict:
+    """解压读取一次结果 JSON，返回 {策略: {指标: 值}}"""
+    stem = os.path.basename(zip_path)[:-len('.zip')]
+    with zipfile.ZipFile(zip_path) as archive:
+        member = result_member(archive, stem)
+        if member is None:
+            return {}
+        with archive.open(member) as handle:
+            payload = json.load(handle)
+    result = {}
+    for strategy, stats in payload.get('strategy', {}).items():
+        row = {name: stats.get(name) for name in METRICS}
+        row.update(timerange=stats.get('timerange'), trading_mode=stats.get('trading_mode'),
+                   stake_currency=stats.get('stake_currency'), member=member)
+        result[strategy] = row
+    return result
+
+
+TRADE_FIELDS = ('pair', 'open_date', 'close_date', 'profit_ratio', 'exit_reason')
+
+# 策略结果的开头："<策略名>": {"trades": [
+_STRATEGY_TRADES = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:\s*\{\s*"trades"\s*:\s*\[')
+_CHUNK = 1 << 16
+_DECODER = json.JSONDecoder()
+# 日期字段优先用同一笔交易里的毫秒时间戳，不用解析字符串
+_TIMESTAMPS = {'open_date': 'open_timestamp', 'close_date': 'close_timestamp'}
+
+
+def _result_stream(zip_path: str):
+    stem = os.path.basename(zip_path)[:-len('.zip')]
+    archive = zipfile.ZipFile(zip_path)
+    member = result_member(archive, stem)
+    if member is None:
+        archive.close()
+        raise ValueError(f"{zip_path} 里没有回测结果 JSON")
+    return archive, io.TextIOWrapper(archive.open(member), encoding='utf-8')
+
+
+def iter_trades(zip_path: str, strategy: str = None):
+    """
+    逐笔读取交易，产出 (策略名, 交易 dict)
+
+    按块读取 zip 成员并逐个解析交易对象，不把整个结果 JSON 读进内存。
+    """
+    archive, stream = _result_stream(zip_path)
+    try:
+        buffer, pos, eof = '', 0, False
+
+        def more():
+            nonlocal buffer, pos, eof
+            chunk = stream.read(_CHUNK)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        while True:
+            # 找下一个策略的 trades 数组
+            match = _STRATEGY_TRADES.search(buffer, pos)
+            while match is None and not eof:
+                # 保留末尾一段，防止开头标记被切在两块之间
+                pos = max(pos, len(buffer) - 1024)
+                more()
+                match = _STRATEGY_TRADES.search(buffer, pos)
+            if match is None:
+                return
+            name = json.loads(f'"{match.group(1)}"')
+            pos = match.end()
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos >= len(buffer):
+                    if eof:
+                        raise ValueError(f"{zip_path} 的交易数组不完整")
+                    more()
+                    continue
+                if buffer[pos] == ']':
+                    pos += 1
+                    break
+                try:
+                    trade, end = _DECODER.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    more()
+                    continue
+                pos = end
+                if strategy is None or name == strategy:
+                    yield name, trade
+                if pos > _CHUNK:
+                    buffer, pos = buffer[pos:], 0
+    finally:
+        stream.close()
+        archive.close()
+
+
+def _date_values(values: list) -> np.ndarray:
+    if values and isinstance(values[0], (int, float)):
+        return np.asarray(values, dtype='int64').astype('datetime64[ms]').astype('datetime64[ns]')
+    return pd.to_datetime(pd.Series(values, dtype=object), utc=True).to_numpy(dtype='datetime64[ns]')
+
+
+def read_trades(zip_path: str, fields=TRADE_FIELDS, strategy: str = None, pairs=None,
+                start=None, end=None) -> dict:
+    """
+    读取交易的部分字段，返回 {字段: NumPy 数组}
+
+    pairs:      只要这些交易对
+    start/end:  只要开仓时间在 [start, end) 内的交易
+    日期字段为 datetime64[ns]（UTC），数值字段为 float64，其他为 object。
+    """
+    pairs = None if pairs is None else set(pairs)
+    start_ms = None if start is None else pd.Timestamp(start).value // 1_000_000
+    end_ms = None if end is None else pd.Timestamp(end).value // 1_000_000
+    columns = {name: [] for name in fields}
+    for _, trade in iter_trades(zip_path, strategy):
+        if pairs is not None and trade.get('pair') not in pairs:
+            continue
+        if start_ms is not None or end_ms is not None:
+            opened = trade.get('open_timestamp')
+            if opened is None:
+                opened = pd.Timestamp(trade['open_date']).value // 1_000_000
+            if (start_ms is not None and opened < start_ms) or (end_ms is not None and opened >= end_ms):
+                continue
+        for name in fields:
+            stamp = _TIMESTAMPS.get(name)
+            columns[name].append(trade[stamp] if stamp in trade else trade.get(name))
+
+    result = {}
+    for name, values in columns.items():
+        if name.endswith('_date'):
+            result[name] = _date_values(values)
+        elif values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            result[name] = np.asarray(values, dtype=np.float64)
+        else:
+            result[name] = np.asarray(values, dtype=object)
+    return result
+
+
+class ResultCatalog:
+    """
+    回测结果索引
+
+    results_dir: 回测结果目录（user_data/backtest_results）
+    path:        索引文件，默认 results_dir/catalog.sqlite
+    """
+
+    def __init__(self, results_dir: str, path: str = None):
+        self.results_dir = results_dir
+        self.path = path or os.path.join(results_dir, 'catalog.sqlite')
+        self._db = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            self._db.row_factory = sqlite3.Row
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def update(self) -> int:
+        """扫描新增或变化的 meta 文件并写入索引，返回新增的行数"""
+        known = {row['meta_file']: (row['mtime_ns'], row['size'])
+                 for row in self.db.execute('SELECT meta_file, mtime_ns, size FROM files')}
+        added = 0
+        for meta_path in sorted(glob.glob(os.path.join(self.results_dir, '*.meta.json'))):
+            name = os.path.basename(meta_path)
+            stat = os.stat(meta_path)
+            if known.get(name) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            added += self.add(meta_path)
+            self.db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)',
+                            (name, stat.st_mtime_ns, stat.st_size))
+        self.db.commit()
+        return added
+
+    def add(self, meta_path: str) -> int:
+        """索引一次回测（meta 文件 + 同名 zip），返回写入的行数"""
+        stem = os.path.basename(meta_path)[:-len('.meta.json')]
+        with open(meta_path) as handle:
+            meta = json.load(handle)
+        zip_name = f'{stem}.zip'
+        zip_path = os.path.join(self.results_dir, zip_name)
+        try:
+            metrics = read_metrics(zip_path) if os.path.exists(zip_path) else {}
+        except (OSError, ValueError, zipfile.BadZipFile):
+            metrics = {}
+        rows = 0
+        for strategy, info in meta.items():
+            row = {name: None for name in METRICS}
+            row.update(metrics.get(strategy, {}))
+            row.update(
+                result_file=stem, strategy=strategy, run_id=info.get('run_id'),
+                timeframe=info.get('timeframe'), backtest_start_ts=info.get('backtest_start_ts'),
+                backtest_end_ts=info.get('backtest_end_ts'), run_time=info.get('backtest_start_time'),
+                zip_file=zip_name if os.path.exists(zip_path) else None,
+            )
+            columns = list(row)
+            self.db.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [row[c] for c in columns],
+            )
+            rows += 1
+        return rows
+
+    def top(self, strategy: str = None, by: str = 'profit_total', n: int = 10,
+            ascending: bool = False, timeframe: str = None) -> list:
+        """按某个指标排序的前 n 次回测（可按策略 / timeframe 过滤），不打开 zip"""
+        if by not in METRICS and by not in ('run_time', 'backtest_start_ts', 'backtest_end_ts'):
+            raise ValueError(f"不支持的排序指标: {by}")
+        where, params = [], []
+        if strategy is not None:
+            where.append('strategy = ?')
+            params.append(strategy)
+        if timeframe is not None:
+            where.append('timeframe = ?')
+            params.append(timeframe)
+        sql = 'SELECT * FROM runs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f" ORDER BY {by} IS NULL, {by} {'ASC' if ascending else 'DESC'} LIMIT ?"
+        params.append(int(n))
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def strategies(self) -> list:
+        """已索引的策略及回测次数"""
+        return [dict(row) for row in self.db.execute(
+            'SELECT strategy, COUNT(*) AS runs, MAX(profit_total) AS best_profit '
+            'FROM runs GROUP BY strategy ORDER BY strategy')]
+
+    def trades(self, result_file: str, strategy: str = None, **kwargs) -> dict:
+        """某次回测的交易（参数同 read_trades）"""
+        return read_trades(os.path.join(self.results_dir, f'{result_file}.zip'), strategy=strategy, **kwargs)
+
+    def query(self, sql: str, params=()) -> list:
+        """直接执行只读 SQL（表 runs）"""
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='回测结果索引：更新并查询前 N 名')
+    parser.add_argument('results_dir', nargs='?', default='../backtest_results')
+    parser.add_argument('--strategy')
+    parser.add_argument('--timeframe')
+    parser.add_argument('--by', default='profit_total')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--ascending', action='store_true')
+    args = parser.parse_args(argv)
+
+    catalog = ResultCatalog(args.results_dir)
+    added = catalog.update()
+    rows = catalog.top(args.strategy, by=args.by, n=args.top, ascending=args.ascending,
+                       timeframe=args.timeframe)
+    print(f'新增索引 {added} 行')
+    for row in rows:
+        print(f"{row['result_file']}  {row['strategy']:<36} {row['timeframe'] or '':>4} "
+              f"{row['timerange'] or '':<18} trades={row['total_trades']} "
+              f"profit={row['profit_total']} drawdown={row['max_drawdown_account']}")
+    catalog.close()
+
+
+if __name__ == '__main__':
+    main()
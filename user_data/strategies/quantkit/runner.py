@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+多策略批量回测
+
+逐个策略调用 freqtrade 时，每次都要重新加载 K 线、重新计算共用指标。这里把策略
+按 (交易模式, timeframe) 分组，每组切成若干块，每块用一次 freqtrade backtesting
+--strategy-list：同一块里的策略共用一次加载的数据（K线文件只读，块之间走页缓存），
+各块交给进程池并行执行：
+
+    runner = BatchRunner('../backtest_results', workers=8)
+    batch = runner.run(discover('.'), {'spot': ['../config_spot.json'],
+                                       'futures': ['../config_futures.json']}, '20250222-20260222')
+    runner.summary(batch)          # 每个策略一行：状态、结果文件、主要指标
+
+结果文件移回 backtest_results 并写入索引（quantkit.results），本批次的所有行记在
+batch_runs 表里；缓存键（quantkit.backtests）命中的策略直接复用已有结果，不再回测。
+
+命令行（在 user_data/strategies 目录下，freqtrade 可用的环境里，如容器内）：
+    python -m quantkit.runner --spot-config ../config_spot.json --futures-config ../config_futures.json \\
+        --timerange 20250222-20260222 --workers 8
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .backtests import BacktestCache, load_config
+
+_CLASS = re.compile(r'^class\s+(\w+)\s*\(\s*([\w.]+)\s*\)\s*:', re.M)
+_TIMEFRAME = re.compile(r'^\s+timeframe\s*=\s*[\'"](\w+)[\'"]', re.M)
+_CAN_SHORT = re.compile(r'^\s+can_short\s*(?::\s*bool\s*)?=\s*True', re.M)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_runs (
+    batch_id TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    trading_mode TEXT,
+    timeframe TEXT,
+    status TEXT NOT NULL,
+    cached INTEGER NOT NULL,
+    result_file TEXT,
+    seconds REAL,
+    PRIMARY KEY (batch_id, strategy)
+);
+"""
+
+
+def discover(strategy_dir: str) -> dict:
+    """
+    策略目录里的全部策略 {类名: {'timeframe': ..., 'trading_mode': 'spot' / 'futures'}}
+
+    只读源码不导入；子类（如 V4_5x 继承 V4）沿用父类的 timeframe 和 can_short。
+    """
+    found = {}
+    for name in sorted(os.listdir(strategy_dir)):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(strategy_dir, name), encoding='utf-8') as handle:
+            source = handle.read()
+        classes = list(_CLASS.finditer(source))
+        for i, match in enumerate(classes):
+            body = source[match.end():classes[i + 1].start() if i + 1 < len(classes) else len(source)]
+            timeframe = _TIMEFRAME.search(body)
+            found[match.group(1)] = {
+                'base': match.group(2).split('.')[-1],
+                'timeframe': timeframe.group(1) if timeframe else None,
+                'can_short': True if _CAN_SHORT.search(body) else None,
+            }
+
+    def resolve(name, key, seen=()):
+        info = found.get(name)
+        if info is None or name in seen:
+            return None
+        if info[key] is not None:
+            return info[key]
+        return resolve(info['base'], key, seen + (name,))
+
+    def is_strategy(name, seen=()):
+        info = found.get(name)
+        if info is None or name in seen:
+            return False
+        return info['base'] == 'IStrategy' or is_strategy(info['base'], seen + (name,))
+
+    return {
+        name: {'timeframe': resolve(name, 'timeframe'),
+               'trading_mode': 'futures' if resolve(name, 'can_short') else 'spot'}
+        for name in found if is_strategy(name)
+    }
+
+
+class _Job:
+    """一次 freqtrade 调用：同一交易模式、同一 timeframe 的一块策略"""
+
+    __slots__ = ('strategies', 'trading_mode', 'timeframe', 'configs', 'keys', 'directory')
+
+    def __init__(self, strategies, trading_mode, timeframe, configs, keys, directory):
+        self.strategies = strategies
+        self.trading_mode = trading_mode
+        self.timeframe = timeframe
+        self.configs = configs
+        self.keys = keys
+        self.directory = directory
+
+
+class BatchRunner:
+    """
+    批量回测
+
+    results_dir: 回测结果目录（user_data/backtest_results）
+    workers:     同时运行的 freqtrade 进程数，默认 CPU 核数
+    export_flag: 指定结果目录的 freqtrade 参数（新版本为 --backtest-directory）
+    """
+
+    def __init__(self, results_dir: str, strategy_dir: str = None, command: str = 'freqtrade',
+                 workers: int = None, userdir: str = None, export_flag: str = '--export-filename'):
+        self.cache = BacktestCache(results_dir, strategy_dir, command, userdir, export_flag)
+        self.results_dir = results_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.db = self.cache.db
+        self.db.executescript(_SCHEMA)
+
+    def plan(self, batch_id: str, strategies: dict, configs, timerange: str, args=()) -> list:
+        """
+        分组切块，返回待运行的 _Job 列表；缓存命中的策略直接记为完成
+
+        strategies: discover() 的结果（或其中一部分）
+        configs:    配置文件列表（所有策略共用），或 {'spot': [...], 'futures': [...]}
+        """
+        groups = {}
+        for name, info in strategies.items():
+            mode, timeframe = info['trading_mode'], info['timeframe']
+            files = configs.get(mode) if isinstance(configs, dict) else configs
+            if not files:
+                self._record(batch_id, name, mode, timeframe, 'skipped', False, None, None)
+                continue
+            job_args = (['--timeframe', timeframe] if timeframe else []) + list(args)
+            key = self.cache.key(load_config(files), name, timerange, job_args)
+            found = self.cache.lookup(key)
+            if found is not None:
+                self._record(batch_id, name, mode, timeframe, 'done', True, found, 0.0)
+                continue
+            groups.setdefault((mode, timeframe, tuple(files)), []).append((name, key))
+        self.db.commit()
+
+        # 按总策略数切块：每个进程分到的策略数大致相同，同组的策略尽量在一块里共用数据
+        total = sum(len(members) for members in groups.values())
+        size = max(1, -(-total // self.workers))
+        jobs = []
+        for (mode, timeframe, files), members in groups.items():
+            for start in range(0, len(members), size):
+                chunk = members[start:start + size]
+                directory = os.path.join(self.results_dir, '.batch', batch_id, str(len(jobs)))
+                jobs.append(_Job([n for n, _ in chunk], mode, timeframe, list(files),
+                                 {n: k for n, k in chunk}, directory))
+        return jobs
+
+    def run(self, strategies: dict, configs, timerange: str, args=()) -> str:
+        """运行一批回测，返回批次号"""
+        batch_id = time.strftime('batch-%Y%m%d-%H%M%S')
+        jobs = self.plan(batch_id, strategies, configs, timerange, args)
+        # 先生成全部命令：路径无法换成 freqtrade 看到的路径时（docker）一个都不启动
+        commands = [self._command(job, timerange, args) for job in jobs]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # 线程只负责等待 freqtrade 子进程，回测本身在各自的进程里并行
+            outcomes = list(pool.map(self._execute, jobs, commands))
+        for job, (returncode, seconds) in zip(jobs, outcomes):
+            result_file = self.cache.collect(job.directory) if returncode == 0 else None
+            status = 'done' if result_file else 'failed'
+            for name in job.strategies:
+                if result_file:
+                    self.cache.store(job.keys[name], result_file, name)
+                self._record(batch_id, name, job.trading_mode, job.timeframe, status, False,
+                             result_file, seconds)
+        self.db.commit()
+        self.cache.catalog.update()
+        shutil.rmtree(os.path.join(self.results_dir, '.batch', batch_id), ignore_errors=True)
+        return batch_id
+
+    def _command(self, job: _Job, timerange: str, args) -> list:
+        command, export = self.cache.freqtrade_command(job.configs, job.directory)
+        command += ['--strategy-list'] + job.strategies + ['--timerange', timerange]
+        if job.timeframe:
+            command += ['--timeframe', job.timeframe]
+        return command + export + list(args)
+
+    def _execute(self, job: _Job, command: list):
+        os.makedirs(job.directory, exist_ok=True)
+        started = time.perf_counter()
+        with open(os.path.join(job.directory, 'freqtrade.log'), 'w') as log:
+            returncode = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT).returncode
+        return returncode, time.perf_counter() - started
+
+    def _record(self, batch_id, strategy, trading_mode, timeframe, status, cached, result_file, seconds):
+        self.db.execute('INSERT OR REPLACE INTO batch_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (batch_id, strategy, trading_mode, timeframe, status, int(cached), result_file, seconds))
+
+    def summary(self, batch_id: str) -> list:
+        """本批次每个策略一行（带结果索引里的主要指标）"""
+        return [dict(row) for row in self.db.execute(
+            'SELECT b.strategy, b.trading_mode, b.timeframe, b.status, b.cached, b.result_file, b.seconds, '
+            'r.total_trades, r.profit_total, r.max_drawdown_account, r.sharpe '
+            'FROM batch_runs b LEFT JOIN runs r ON r.result_file = b.result_file AND r.strategy = b.strategy '
+            'WHERE b.batch_id = ? ORDER BY r.profit_total DESC', (batch_id,))]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='多策略批量回测（共用数据加载 + 进程池）')
+    parser.add_argument('--spot-config', action='append', default=[])
+    parser.add_argument('--futures-config', action='append', default=[])
+    parser.add_argument('--timerange', required=True)
+    parser.add_argument('--strategies', nargs='*', help="只跑这些策略（默认策略目录下全部）")
+    parser.add_argument('--strategy-dir', default='.')
+    parser.add_argument('--results-dir', default='../backtest_results')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--freqtrade', default='freqtrade', help="调用 freqtrade 的命令")
+    parser.add_argument('--userdir', help="freqtrade 看到的 user_data 路径（通过 docker 调用时）")
+    parser.add_argument('--export-flag', default='--export-filename')
+    args, extra = parser.parse_known_args(argv)
+
+    strategies = discover(args.strategy_dir)
+    if args.strategies:
+        strategies = {name: strategies[name] for name in args.strategies}
+    runner = BatchRunner(args.results_dir, args.strategy_dir, args.freqtrade, args.workers,
+                         args.userdir, args.export_flag)
+    batch = runner.run(strategies, {'spot': args.spot_config, 'futures': args.futures_config},
+                       args.timerange, extra)
+    print(batch)
+    for row in runner.summary(batch):
+        print(f"{row['strategy']:<36} {row['timeframe'] or '':>4} {row['status']:<7} "
+              f"{'cached' if row['cached'] else '':<6} trades={row['total_trades']} "
+              f"profit={row['profit_total']} drawdown={row['max_drawdown_account']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+实盘尾部信号求值
+
+populate_entry_trend / populate_exit_trend 每个循环都对整个 dataframe 构造布尔 Series
+再 reduce(&)。实盘只有最后一根（已收盘）K线有意义：这里缓存上次的信号列，
+新K线到来时条件只在最后几根K线上求值，之前的K线沿用缓存结果。
+回测/Hyperopt 照常整列计算。
+
+用法:
+    df = self.signals.frame(self.dp, dataframe, pair, ('enter_long',))
+    conditions = [df['st_dir'] == 1, ...]
+    self.signals.assign(self.dp, dataframe, pair, 'enter_long', conditions)
+"""
+
+from functools import reduce
+
+import numpy as np
+from pandas import DataFrame
+
+from .indicators import dates_ns
+from .streaming import align_window, is_live
+
+
+class _SignalState:
+    """单个 (pair, 信号列) 的缓存，与上次的 dataframe 对齐"""
+
+    __slots__ = ('dates', 'step', 'values')
+
+
+class TailSignals:
+    """
+    信号列缓存
+
+    lookback: 条件里用到的最大 shift 根数（如 crossed_above 为 1），
+              尾部求值时多取这么多根作为上下文，这几根本身的结果不采用。
+    """
+
+    def __init__(self, lookback: int = 0):
+        self.lookback = lookback
+        self._states = {}
+
+    def frame(self, dp, dataframe: DataFrame, pair: str, columns) -> DataFrame:
+        """
+        返回用于求值条件的 dataframe
+
+        实盘且所有信号列都有衔接的缓存时，只返回新K线 + lookback 根；
+        否则（回测、首次调用、缺K线）返回完整 dataframe。
+        """
+        if not is_live(dp):
+            return dataframe
+        dates = dates_ns(dataframe)
+        rows = 1
+        for name in columns:
+            state = self._states.get((pair, name))
+            aligned = align_window(state.dates, dates, state.step) if state is not None else None
+            if aligned is None:
+                return dataframe
+            rows = max(rows, len(dates) - 1 - aligned[1])
+        return dataframe.iloc[-(rows + self.lookback):]
+
+    def assign(self, dp, dataframe: DataFrame, pair: str, name: str, conditions) -> DataFrame:
+        """
+        把条件写入信号列（满足为 1，否则为 0）
+
+        conditions: 条件列表（按 & 合并，空列表表示没有信号）或一个布尔 Series，
+                    长度可以是完整 dataframe，也可以是 frame() 返回的尾部。
+        """
+        n = len(dataframe)
+        if isinstance(conditions, (list, tuple)):
+            mask = reduce(lambda x, y: x & y, conditions) if conditions else None
+        else:
+            mask = conditions
+        signal = np.zeros(n, dtype=np.int64)
+
+        live = is_live(dp)
+        if mask is not None:
+            values = np.asarray(mask, dtype=bool)
+            if len(values) == n:
+                signal[values] = 1
+            else:
+                # 尾部求值：前面的K线沿用缓存，尾部 lookback 根上下文不采用
+                dates = dates_ns(dataframe)
+                state = self._states.get((pair, name))
+                aligned = align_window(state.dates, dates, state.step) if state is not None else None
+                if aligned is not None:
+                    start, pos = aligned
+                    signal[:pos + 1] = state.values[start:]
+                k = len(values) - self.lookback
+                signal[n - k:] = values[-k:]
+
+        dataframe[name] = signal
+        if live:
+            dates = dates_ns(dataframe)
+            state = _SignalState()
+            state.dates = dates.copy()
+            state.step = int(dates[-1] - dates[-2]) if n > 1 else 0
+            state.values = signal
+            self._states[(pair, name)] = state
+        return dataframe
+
+    def reset(self, pair: str = None) -> None:
+        """清空缓存（可只清某个交易对）"""
+        if pair is None:
+            self._states.clear()
+        else:
+            for key in [k for k in self._states if k[0] == pair]:
+                del self._states[key]
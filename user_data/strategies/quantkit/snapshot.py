@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+最后一根K线快照
+
+leverage / confirm_trade_entry / custom_stoploss / custom_exit / custom_stake_amount
+每笔交易、每个循环都会调用，原写法每次都 get_analyzed_dataframe + iloc[-1] 构造一行 Series。
+这里在分析新K线时把回调要用的列存成 __slots__ 小对象，按 (pair, K线时间) 缓存，
+新K线分析后自动替换；回测时逐根K线数据不同，直接从 dataframe 末行读取。
+"""
+
+import numpy as np
+from pandas import DataFrame
+
+from .indicators import dates_ns
+from .streaming import is_live
+
+
+class CandleSnapshot:
+    """快照基类，具体列由 SnapshotCache 生成的子类声明"""
+
+    __slots__ = ('pair', 'date')
+
+    def __getitem__(self, name: str):
+        """支持 last_candle['rsi'] 写法"""
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name: str, default=None):
+        """与 Series.get 相同的用法"""
+        return getattr(self, name, default)
+
+    def __repr__(self):
+        fields = ', '.join(f'{k}={getattr(self, k, None)!r}' for k in self.__slots__)
+        return f'{type(self).__name__}(pair={self.pair!r}, date={self.date!r}, {fields})'
+
+
+class SnapshotCache:
+    """
+    回调用的最后一根K线快照缓存
+
+    columns: 回调要读的列名
+    extras:  额外派生值 {名称: 函数(dataframe) -> 值}，在生成快照时算一次
+    """
+
+    def __init__(self, columns, extras: dict = None):
+        self.columns = tuple(columns)
+        self.extras = dict(extras or {})
+        self.record = type('CandleSnapshot', (CandleSnapshot,),
+                           {'__slots__': self.columns + tuple(self.extras)})
+        self._records = {}
+
+    def capture(self, dp, dataframe: DataFrame, pair: str) -> None:
+        """populate_indicators 末尾调用：实盘/模拟盘缓存新K线快照，回测不做任何事"""
+        if is_live(dp):
+            self.update(dataframe, pair)
+
+    def update(self, dataframe: DataFrame, pair: str):
+        """用 dataframe 末行替换该交易对的快照"""
+        record = self.from_frame(dataframe, pair)
+        if record is None:
+            self._records.pop(pair, None)
+        else:
+            self._records[pair] = record
+        return record
+
+    def from_frame(self, dataframe: DataFrame, pair: str):
+        """从 dataframe 末行生成快照，只读需要的列（缺列时抛出 KeyError，不留空字段）"""
+        if len(dataframe) < 1:
+            return None
+        missing = [name for name in self.columns if name not in dataframe.columns]
+        if missing:
+            raise KeyError(f"分析后的 dataframe 缺少快照列: {', '.join(missing)}")
+        record = self.record()
+        record.pair = pair
+        record.date = int(dates_ns(dataframe)[-1]) if 'date' in dataframe.columns else None
+        for name in self.columns:
+            value = dataframe[name].to_numpy()[-1]
+            setattr(record, name, value.item() if isinstance(value, np.generic) else value)
+        for name, func in self.extras.items():
+            setattr(record, name, func(dataframe))
+        return record
+
+    def last(self, dp, pair: str, timeframe: str):
+        """
+        取最后一根K线快照，没有数据时返回 None
+
+        实盘/模拟盘直接返回缓存；回测或缓存缺失时读 get_analyzed_dataframe 末行。
+        """
+        if is_live(dp):
+            record = self._records.get(pair)
+            if record is not None:
+                return record
+        dataframe, _ = dp.get_analyzed_dataframe(pair, timeframe)
+        if is_live(dp):
+            return self.update(dataframe, pair)
+        return self.from_frame(dataframe, pair)
+
+    def invalidate(self, pair: str = None) -> None:
+        """清除快照（可只清某个交易对）"""
+        if pair is None:
+            self._records.clear()
+        else:
+            self._records.pop(pair, None)
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+增量（流式）指标
+
+实盘/模拟盘每根新K线都会把整个窗口（startup_candle_count 200+）重新算一遍。
+这里按 (pair, timeframe, period, multiplier) 保存上一根K线的 ATR、上下轨和方向，
+新K线到来时只推进一步（O(1)），缺K线或参数变化时自动回退为全量重算。
+
+KernelStream 是通用的增量引擎基类（factors / incremental 模块的引擎都基于它）。
+"""
+
+import weakref
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+import talib
+
+from .indicators import column, dates_ns, supertrend_direction
+
+
+def is_live(dp) -> bool:
+    """是否实盘/模拟盘（回测和 Hyperopt 走全量向量化路径）"""
+    return dp is not None and dp.runmode.value in ('live', 'dry_run')
+
+
+def align_window(prev_dates: np.ndarray, dates: np.ndarray, step: int):
+    """
+    新窗口与上次窗口的衔接位置
+
+    返回 (start, pos)：新窗口起点在上次窗口中的下标、上次最后一根K线在新窗口中的下标。
+    只有新窗口起点落在上次窗口内、重叠部分一致、新增K线间隔连续时才可增量推进，
+    否则返回 None。
+    """
+    n = len(dates)
+    if n == 0 or len(prev_dates) == 0 or step <= 0:
+        return None
+    last = prev_dates[-1]
+    pos = int(np.searchsorted(dates, last))
+    if pos >= n or dates[pos] != last:
+        return None
+    start = int(np.searchsorted(prev_dates, dates[0]))
+    if start >= len(prev_dates) or prev_dates[start] != dates[0] or len(prev_dates) - start != pos + 1:
+        return None
+    if pos + 1 < n and (np.diff(dates[pos:]) != step).any():
+        return None
+    return start, pos
+
+
+class SupertrendState:
+    """
+    单个 (pair, timeframe, period, multiplier) 的 Supertrend 状态
+
+    supertrend / direction / signal 三个数组与最近一次传入的 dataframe 对齐，
+    signal 为未延续的突破信号（1 / -1 / 0）。
+    """
+
+    __slots__ = (
+        'period', 'multiplier', 'initial_direction',
+        'atr', 'close', 'upperband', 'lowerband', 'dir', 'step',
+        'dates', 'supertrend', 'direction', 'signal',
+    )
+
+    def __init__(self, period: int, multiplier: float, initial_direction: int = 1):
+        self.period = period
+        self.multiplier = multiplier
+        self.initial_direction = initial_direction
+
+    def seed(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, dates: np.ndarray) -> None:
+        """全量计算并记录最后一根K线的状态"""
+        atr = talib.ATR(high, low, close, timeperiod=self.period)
+        hl2 = (high + low) / 2
+        upperband = hl2 + (self.multiplier * atr)
+        lowerband = hl2 - (self.multiplier * atr)
+
+        direction = supertrend_direction(close, upperband, lowerband, self.initial_direction)
+        st = np.where(direction == 1, lowerband, upperband)
+        signal = np.zeros(len(close), dtype=np.int64)
+        if len(close) > 0:
+            st[0] = 0.0
+            signal[1:] = np.where(close[1:] > upperband[:-1], 1,
+                                  np.where(close[1:] < lowerband[:-1], -1, 0))
+
+        self.dates = dates.copy()
+        self.supertrend = st
+        self.direction = direction
+        self.signal = signal
+        self.step = int(dates[-1] - dates[-2]) if len(dates) > 1 else 0
+        if len(close) > 0:
+            self.atr = float(atr[-1])
+            self.close = float(close[-1])
+            self.upperband = float(upperband[-1])
+            self.lowerband = float(lowerband[-1])
+            self.dir = int(direction[-1])
+        else:
+            self.atr = np.nan
+
+    def extend(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, dates: np.ndarray) -> bool:
+        """
+        用新K线推进状态
+
+        只有当新窗口与上次窗口首尾衔接、且新增K线间隔连续时才增量推进，
+        否则返回 False 由调用方全量重算。
+        """
+        if np.isnan(self.atr):
+            return False
+        aligned = align_window(self.dates, dates, self.step)
+        if aligned is None:
+            return False
+        start, pos = aligned
+
+        added = len(dates) - 1 - pos
+        st = np.empty(added)
+        direction = np.empty(added, dtype=np.int64)
+        signal = np.empty(added, dtype=np.int64)
+        for j in range(added):
+            k = pos + 1 + j
+            st[j], direction[j], signal[j] = self._advance(float(high[k]), float(low[k]), float(close[k]))
+
+        self.dates = dates.copy()
+        self.supertrend = np.concatenate((self.supertrend[start:], st))
+        self.direction = np.concatenate((self.direction[start:], direction))
+        self.signal = np.concatenate((self.signal[start:], signal))
+        return True
+
+    def _advance(self, high: float, low: float, close: float):
+        """推进一根K线（Wilder ATR，与 TA-Lib 递推一致）"""
+        prev_close = self.close
+        tr = max(high - low, abs(prev_close - high), abs(prev_close - low))
+        self.atr = (self.atr * (self.period - 1) + tr) / self.period
+
+        if close > self.upperband:
+            signal = 1
+        elif close < self.lowerband:
+            signal = -1
+        else:
+            signal = 0
+        if signal != 0:
+            self.dir = signal
+
+        hl2 = (high + low) / 2
+        self.upperband = hl2 + (self.multiplier * self.atr)
+        self.lowerband = hl2 - (self.multiplier * self.atr)
+        self.close = close
+        st = self.lowerband if self.dir == 1 else self.upperband
+        return st, self.dir, signal
+
+
+class SupertrendStream:
+    """
+    Supertrend 增量引擎
+
+    按 (pair, timeframe, period, multiplier) 保存状态，参数变化时自然落到新键上全量计算。
+    """
+
+    def __init__(self):
+        self._states = {}
+
+    def update(self, dataframe: DataFrame, pair: str, timeframe: str,
+               period: int, multiplier: float, initial_direction: int = 1) -> SupertrendState:
+        """推进到 dataframe 的最后一根K线，返回对齐后的状态"""
+        key = (pair, timeframe, int(period), float(multiplier))
+        high = column(dataframe, 'high')
+        low = column(dataframe, 'low')
+        close = column(dataframe, 'close')
+        dates = dates_ns(dataframe)
+
+        state = self._states.get(key)
+        if state is None or state.initial_direction != initial_direction \
+                or not state.extend(high, low, close, dates):
+            state = SupertrendState(int(period), float(multiplier), initial_direction)
+            state.seed(high, low, close, dates)
+            self._states[key] = state
+        return state
+
+    def supertrend(self, dataframe: DataFrame, pair: str, timeframe: str,
+                   period: int = 14, multiplier: float = 3, initial_direction: int = 1):
+        """与 indicators.supertrend 相同的返回值：(supertrend, direction)"""
+        state = self.update(dataframe, pair, timeframe, period, multiplier, initial_direction)
+        return (pd.Series(state.supertrend, index=dataframe.index),
+                pd.Series(state.direction, index=dataframe.index))
+
+    def reset(self, pair: str = None) -> None:
+        """清空状态（可只清某个交易对）"""
+        if pair is None:
+            self._states.clear()
+        else:
+            for key in [k for k in self._states if k[0] == pair]:
+                del self._states[key]
+
+
+_OHLCV = frozenset(('open', 'high', 'low', 'close', 'volume'))
+
+
+class _KernelState:
+    """单个增量内核的状态：outputs 与最近一次传入的 dataframe 对齐"""
+
+    __slots__ = ('dates', 'step', 'outputs', 'kernel')
+
+
+class KernelStream:
+    """
+    通用增量引擎基类
+
+    内核约定：
+        kernel.seed(*输入数组) -> 输出数组（或输出数组元组），全量计算并记录状态
+        kernel.update(*单根K线输入) -> 输出值（或输出值元组），推进一根K线
+        kernel.ready -> 是否可以增量推进（预热不足时为 False，下次全量重算）
+    按 (pair, timeframe, 指标, 参数) 保存状态，新K线只把新增的几根交给 update。
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._frame = None
+
+    def _arrays(self, dataframe: DataFrame, names) -> list:
+        """
+        取 date 与输入列的 NumPy 数组
+
+        同一个 dataframe 上连续计算多个指标时，OHLCV 列只提取一次（不会被策略改写）。
+        """
+        frame = self._frame
+        if frame is None or frame[0]() is not dataframe or frame[1] != len(dataframe):
+            frame = self._frame = (weakref.ref(dataframe), len(dataframe), {'date': dates_ns(dataframe)})
+        cache = frame[2]
+        arrays = [cache['date']]
+        for name in names:
+            values = cache.get(name)
+            if values is None:
+                values = column(dataframe, name)
+                if name in _OHLCV:
+                    cache[name] = values
+            arrays.append(values)
+        return arrays
+
+    def _update(self, key, dataframe: DataFrame, names, factory) -> tuple:
+        """推进到 dataframe 的最后一根K线，返回对齐后的输出数组元组"""
+        dates, *inputs = self._arrays(dataframe, names)
+        n = len(dates)
+
+        state = self._states.get(key)
+        aligned = None
+        if state is not None and state.kernel.ready:
+            aligned = align_window(state.dates, dates, state.step)
+        if aligned is not None:
+            start, pos = aligned
+            rows = [state.kernel.update(*(a[k] for a in inputs)) for k in range(pos + 1, n)]
+            added = np.array(rows, dtype=np.float64).reshape(len(rows), len(state.outputs))
+            state.outputs = tuple(np.concatenate((out[start:], added[:, j]))
+                                  for j, out in enumerate(state.outputs))
+            state.dates = dates.copy()
+            return state.outputs
+
+        state = _KernelState()
+        state.kernel = factory()
+        outputs = state.kernel.seed(*inputs)
+        state.outputs = outputs if isinstance(outputs, tuple) else (outputs,)
+        state.dates = dates.copy()
+        state.step = int(dates[-1] - dates[-2]) if n > 1 else 0
+        self._states[key] = state
+        return state.outputs
+
+    def reset(self, pair: str = None) -> None:
+        """清空状态（可只清某个交易对）"""
+        if pair is None:
+            self._states.clear()
+        else:
+            for key in [k for k in self._states if k[0] == pair]:
+                del self._states[key]